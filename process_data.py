@@ -4,42 +4,37 @@ import pandas as pd
 from datetime import datetime
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "src")))
-from src.configs.config_mongo import MongoDBConfig
+from src.configs.config_schema import bar_doc
 from src.configs.config_variable import DATA_CRAWL_CONFIG
-from tvDatafeed import TvDatafeed, Interval
+from src.quality.quarantine import Quarantine
+from src.quality.validator import BarValidator
+from src.storage.factory import build_sink
+from src.upstream.tradingview_client import TradingViewClient
+from tvDatafeed import Interval
 
 CSV_PATH = DATA_CRAWL_CONFIG.get("historical_csv") or "btcd_daily_data.csv"
 
 
-def row_to_doc(dt: datetime, row) -> dict:
-    return {
-        "datetime": dt.strftime("%Y-%m-%d %H:%M:%S"),
-        "timestamp_ms": int(dt.timestamp() * 1000),
-        "open": (
-            float(row.get("open", row.get("Open", None)))
-            if pd.notnull(row.get("open", row.get("Open", None)))
-            else None
-        ),
-        "high": (
-            float(row.get("high", row.get("High", None)))
-            if pd.notnull(row.get("high", row.get("High", None)))
-            else None
-        ),
-        "low": (
-            float(row.get("low", row.get("Low", None)))
-            if pd.notnull(row.get("low", row.get("Low", None)))
-            else None
-        ),
-        "close": (
-            float(row.get("close", row.get("Close", None)))
-            if pd.notnull(row.get("close", row.get("Close", None)))
-            else None
-        ),
-    }
-
-
-def upsert_dataframe_to_mongo(df: pd.DataFrame, collection):
+def row_to_doc(dt: datetime, row, symbol: str) -> dict:
+    def value(name):
+        raw = row.get(name, row.get(name.capitalize(), None))
+        return float(raw) if pd.notnull(raw) else None
+
+    return bar_doc(
+        symbol,
+        "1d",
+        int(dt.timestamp() * 1000),
+        value("open"),
+        value("high"),
+        value("low"),
+        value("close"),
+        value("volume"),
+    )
+
+
+def upsert_dataframe(df: pd.DataFrame, sink, symbol: str, batch_size: int = 1000):
     inserted = 0
+    docs = []
     df = df.reset_index()
     for _, row in df.iterrows():
         try:
@@ -54,38 +49,38 @@ def upsert_dataframe_to_mongo(df: pd.DataFrame, collection):
                     else pd.to_datetime(idx)
                 )
 
-            doc = row_to_doc(dt, row)
-            # upsert and remove any 'symbol' field
-            collection.update_one(
-                {"timestamp_ms": doc["timestamp_ms"]},
-                {"$set": doc, "$unset": {"symbol": ""}},
-                upsert=True,
-            )
-            inserted += 1
+            docs.append(row_to_doc(dt, row, symbol))
         except Exception as e:
-            print(f"Failed to upsert row: {e}")
-    print(f"Upserted/updated {inserted} documents into Mongo collection")
+            print(f"Failed to convert row: {e}")
+    docs, rejected = BarValidator().validate_docs(docs)
+    if rejected:
+        print(f"Quarantined {Quarantine().put(rejected, 'process_data')} invalid rows")
+    for start in range(0, len(docs), batch_size):
+        try:
+            inserted += sink.upsert_docs(docs[start : start + batch_size])
+        except Exception as e:
+            print(f"Failed to upsert batch at {start}: {e}")
+    sink.flush()
+    print(f"Upserted/updated {inserted} documents into {sink.name} sink")
 
 
 def main():
-    # Setup mongo
-    mongo_client = MongoDBConfig.get_client()
-    db = mongo_client.get_database(DATA_CRAWL_CONFIG.get("db"))
-    coll = db.get_collection(DATA_CRAWL_CONFIG.get("collection"))
+    # Setup storage (Mongo / SQLite / Parquet per DATA_CRAWL_CONFIG["sinks"])
+    sink = build_sink(mongo_profile="bulk")
+    symbol = DATA_CRAWL_CONFIG.get("symbol", "BTC.D")
 
     # If CSV exists, import it first
     if os.path.exists(CSV_PATH):
         try:
             existing = pd.read_csv(CSV_PATH, parse_dates=[0], index_col=0)
             print(f"Loaded {len(existing)} rows from {CSV_PATH}")
-            upsert_dataframe_to_mongo(existing, coll)
+            upsert_dataframe(existing, sink, symbol)
         except Exception as e:
             print(f"Failed to import CSV {CSV_PATH}: {e}")
 
     # Fetch historical using tvDatafeed and upsert
-    symbol = DATA_CRAWL_CONFIG.get("symbol", "BTC.D")
     try:
-        tv = TvDatafeed()
+        tv = TradingViewClient()
         df = tv.get_hist(
             symbol=symbol,
             exchange="CRYPTOCAP",
@@ -102,12 +97,14 @@ def main():
             )
 
         if df is not None and not df.empty:
-            upsert_dataframe_to_mongo(df, coll)
+            upsert_dataframe(df, sink, symbol)
         else:
             print("No historical data fetched from tvDatafeed.")
 
     except Exception as e:
         print(f"Failed to fetch or upsert historical from tvDatafeed: {e}")
+    finally:
+        sink.close()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,186 @@
+import os
+import sys
+import threading
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from src.configs.config_schema import (
+    F_CLOSE,
+    F_HIGH,
+    F_LOW,
+    F_OPEN,
+    F_TIME,
+    F_VOLUME,
+    doc_ms,
+)
+from src.configs.config_variable import RECENT_BARS_CONFIG
+from src.log.logger_setup import LoggerSetup
+
+COLUMNS = ("open", "high", "low", "close", "volume")
+
+
+class BarView:
+    """Read-only record view of one slot; holds no copy of the data"""
+
+    __slots__ = ("_store", "_slot")
+
+    def __init__(self, store, slot: int):
+        self._store = store
+        self._slot = slot
+
+    @property
+    def timestamp_ms(self):
+        return int(self._store.ts[self._slot])
+
+    @property
+    def open(self):
+        return float(self._store.open[self._slot])
+
+    @property
+    def high(self):
+        return float(self._store.high[self._slot])
+
+    @property
+    def low(self):
+        return float(self._store.low[self._slot])
+
+    @property
+    def close(self):
+        return float(self._store.close[self._slot])
+
+    @property
+    def volume(self):
+        return float(self._store.volume[self._slot])
+
+    def to_dict(self):
+        out = {"timestamp_ms": self.timestamp_ms}
+        for name in COLUMNS:
+            out[name] = getattr(self, name)
+        return out
+
+
+class RecentBars:
+    """
+    Process-wide columnar ring buffer of the latest bars, one per symbol
+    (RecentBars(symbol) always names the symbol it reads or writes).
+
+    Every bar is written twice (slot i and i + capacity), so any window of up to
+    `capacity` bars is one contiguous slice: window queries return NumPy views, never copies.
+    There is a single writer (the symbol's realtime extractor); readers take no lock. A view
+    stays valid until `capacity - len(view)` further bars are appended.
+    """
+
+    _instances = {}
+    _instance_lock = threading.Lock()
+
+    # One instance per symbol
+    def __new__(cls, symbol: str):
+        if not symbol:
+            raise ValueError("RecentBars needs the symbol of its series")
+        with cls._instance_lock:
+            instance = cls._instances.get(symbol)
+            if instance is None:
+                instance = super().__new__(cls)
+                instance._init_store(RECENT_BARS_CONFIG.get("capacity", 24 * 60))
+                instance.symbol = symbol
+                cls._instances[symbol] = instance
+        return instance
+
+    def _init_store(self, capacity: int):
+        self.logger = LoggerSetup.logger_setup("RecentBars")
+        self.capacity = capacity
+        self.ts = np.zeros(2 * capacity, dtype=np.int64)
+        self.open = np.full(2 * capacity, np.nan)
+        self.high = np.full(2 * capacity, np.nan)
+        self.low = np.full(2 * capacity, np.nan)
+        self.close = np.full(2 * capacity, np.nan)
+        self.volume = np.full(2 * capacity, np.nan)
+        # Number of bars ever appended; readers snapshot it once per query
+        self._end = 0
+        self._write_lock = threading.Lock()
+
+    @property
+    def nbytes(self):
+        return sum(getattr(self, c).nbytes for c in ("ts",) + COLUMNS)
+
+    def __len__(self):
+        return min(self._end, self.capacity)
+
+    def _write_slot(self, index: int, ts_ms: int, values):
+        slot = index % self.capacity
+        for slot_i in (slot, slot + self.capacity):
+            self.ts[slot_i] = ts_ms
+            self.open[slot_i], self.high[slot_i], self.low[slot_i] = values[0], values[1], values[2]
+            self.close[slot_i], self.volume[slot_i] = values[3], values[4]
+
+    def append(self, ts_ms: int, open_, high, low, close, volume):
+        """Append a bar; a repeated timestamp revises the latest bar in place, older ones are ignored"""
+        values = tuple(np.nan if v is None else float(v) for v in (open_, high, low, close, volume))
+        with self._write_lock:
+            end = self._end
+            if end:
+                last_ts = self.ts[(end - 1) % self.capacity]
+                if ts_ms == last_ts:
+                    self._write_slot(end - 1, ts_ms, values)
+                    return False
+                if ts_ms < last_ts:
+                    return False
+            self._write_slot(end, ts_ms, values)
+            # Publish only after both copies are written
+            self._end = end + 1
+        return True
+
+    def _bounds(self, n: int):
+        end = self._end
+        n = min(n, end, self.capacity)
+        start = (end - n) % self.capacity
+        return start, start + n
+
+    def window(self, n: int = None):
+        """Last n bars as a dict of zero-copy column views (oldest first)"""
+        start, stop = self._bounds(self.capacity if n is None else n)
+        out = {"timestamp_ms": self.ts[start:stop]}
+        for name in COLUMNS:
+            out[name] = getattr(self, name)[start:stop]
+        return out
+
+    def since(self, ts_ms: int):
+        """Bars with timestamp >= ts_ms as zero-copy column views"""
+        start, stop = self._bounds(self.capacity)
+        offset = int(np.searchsorted(self.ts[start:stop], ts_ms, side="left"))
+        out = {"timestamp_ms": self.ts[start + offset : stop]}
+        for name in COLUMNS:
+            out[name] = getattr(self, name)[start + offset : stop]
+        return out
+
+    def latest(self):
+        end = self._end
+        if not end:
+            return None
+        return BarView(self, (end - 1) % self.capacity)
+
+    def warm_load(self, collection, query: dict = None):
+        """Fill from the newest bars of a Mongo collection (oldest first)"""
+        try:
+            projection = {"_id": 0, F_TIME: 1, F_OPEN: 1, F_HIGH: 1, F_LOW: 1, F_CLOSE: 1, F_VOLUME: 1}
+            docs = list(
+                collection.find(query or {}, projection).sort(F_TIME, -1).limit(self.capacity)
+            )
+            for doc in reversed(docs):
+                self.append(
+                    doc_ms(doc),
+                    doc.get(F_OPEN),
+                    doc.get(F_HIGH),
+                    doc.get(F_LOW),
+                    doc.get(F_CLOSE),
+                    doc.get(F_VOLUME),
+                )
+            self.logger.info(
+                f"Warm-loaded {len(docs)} bars into recent window ({self.nbytes / 1024:.0f} KB)"
+            )
+            return len(docs)
+        except Exception as e:
+            self.logger.error(f"Failed to warm-load recent bars: {e}")
+            return 0
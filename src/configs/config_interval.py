@@ -0,0 +1,23 @@
+from src.configs.config_variable import DATA_CRAWL_CONFIG
+
+# Bar size in milliseconds for every interval we store
+INTERVAL_MS = {
+    "1m": 60 * 1000,
+    "1h": 60 * 60 * 1000,
+    "1d": 24 * 60 * 60 * 1000,
+}
+
+# DATA_CRAWL_CONFIG key holding the collection name of each interval
+INTERVAL_COLLECTION_KEYS = {
+    "1m": "minute_collection",
+    "1h": "hourly_collection",
+    "1d": "collection",
+}
+
+
+def get_interval_collection(mongo_client, interval: str):
+    if interval not in INTERVAL_COLLECTION_KEYS:
+        raise ValueError(f"Unsupported interval '{interval}'")
+    return mongo_client.get_database(DATA_CRAWL_CONFIG.get("db")).get_collection(
+        DATA_CRAWL_CONFIG.get(INTERVAL_COLLECTION_KEYS[interval])
+    )
@@ -1,10 +1,107 @@
+import importlib.util
+import threading
+
 from pymongo import MongoClient
-from src.configs.config_variable import MONGO_CONFIG
+from pymongo import monitoring
+from src.configs.config_variable import MONGO_CONFIG, MONGO_PROFILES
+
+
+# Optional compression modules; zlib ships with Python
+_COMPRESSOR_MODULES = {"zstd": "zstandard", "snappy": "snappy", "zlib": "zlib"}
+
+
+def available_compressors(compressors: str):
+    """Keep only the compressors whose module is installed (pymongo would warn and drop the rest)"""
+    names = [c.strip() for c in compressors.split(",") if c.strip()]
+    return ",".join(
+        c for c in names if importlib.util.find_spec(_COMPRESSOR_MODULES.get(c, c)) is not None
+    )
+
+
+class PoolStatsListener(monitoring.ConnectionPoolListener):
+    """Per-profile connection pool counters fed by pymongo's CMAP monitoring events"""
+
+    def __init__(self, profile: str):
+        self.profile = profile
+        self._lock = threading.Lock()
+        self._stats = {
+            "created": 0,
+            "closed": 0,
+            "open": 0,
+            "checked_out": 0,
+            "max_checked_out": 0,
+            "checkouts": 0,
+            "checkout_failures": 0,
+            "checkout_wait_ms_total": 0.0,
+            "checkout_wait_ms_max": 0.0,
+            "pool_clears": 0,
+        }
+
+    def stats(self):
+        with self._lock:
+            out = dict(self._stats)
+        out["checkout_wait_ms_avg"] = (
+            out["checkout_wait_ms_total"] / out["checkouts"] if out["checkouts"] else 0.0
+        )
+        return out
+
+    def _inc(self, key: str, n: int = 1):
+        with self._lock:
+            self._stats[key] += n
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        self._inc("pool_clears")
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        with self._lock:
+            self._stats["created"] += 1
+            self._stats["open"] += 1
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        with self._lock:
+            self._stats["closed"] += 1
+            self._stats["open"] -= 1
+
+    def connection_check_out_started(self, event):
+        pass
+
+    def connection_check_out_failed(self, event):
+        self._inc("checkout_failures")
+
+    def connection_checked_out(self, event):
+        # event.duration (seconds) is time spent waiting for the pool, pymongo >= 4.7
+        wait_ms = (getattr(event, "duration", None) or 0.0) * 1000
+        with self._lock:
+            stats = self._stats
+            stats["checkouts"] += 1
+            stats["checked_out"] += 1
+            stats["max_checked_out"] = max(stats["max_checked_out"], stats["checked_out"])
+            stats["checkout_wait_ms_total"] += wait_ms
+            stats["checkout_wait_ms_max"] = max(stats["checkout_wait_ms_max"], wait_ms)
+
+    def connection_checked_in(self, event):
+        self._inc("checked_out", -1)
 
 
 class MongoDBConfig:
     _instance = None
     _client = None
+    # One MongoClient (and pool) per connection profile
+    _clients = {}
+    _listeners = {}
+    _clients_lock = threading.Lock()
 
     def _init_config(self):
         self._config = {
@@ -26,10 +123,18 @@ class MongoDBConfig:
     def get_config(self):
         return self._config
 
-    # Singletion client
+    # Singletion client per profile ("default", "realtime", "bulk", "monitor")
     @classmethod
-    def get_client(cls):
-        if cls._client is None:
+    def get_client(cls, profile: str = "default"):
+        if profile not in MONGO_PROFILES:
+            raise ValueError(f"Unknown Mongo connection profile '{profile}'")
+        client = cls._clients.get(profile)
+        if client is not None:
+            return client
+
+        with cls._clients_lock:
+            if profile in cls._clients:
+                return cls._clients[profile]
             instance = cls()
             config = instance.get_config
             client_kwargs = {
@@ -44,10 +149,32 @@ class MongoDBConfig:
                 client_kwargs["password"] = config["pass"]
             if config["auth"]:
                 client_kwargs["authSource"] = config["auth"]
-            cls._client = MongoClient(**client_kwargs)
-        return cls._client
+            client_kwargs.update(MONGO_PROFILES[profile])
+            if client_kwargs.get("compressors"):
+                client_kwargs["compressors"] = available_compressors(client_kwargs["compressors"])
+
+            listener = PoolStatsListener(profile)
+            client_kwargs["event_listeners"] = [listener]
+            client = MongoClient(**client_kwargs)
+            cls._listeners[profile] = listener
+            cls._clients[profile] = client
+            if profile == "default":
+                cls._client = client
+        return client
+
+    @classmethod
+    def pool_stats(cls, profile: str = None):
+        """Pool counters of one profile, or of every profile opened so far"""
+        if profile is not None:
+            listener = cls._listeners.get(profile)
+            return listener.stats() if listener else None
+        return {name: listener.stats() for name, listener in cls._listeners.items()}
 
     @classmethod
     def client_close(cls):
-        if cls._client:
-            cls._client.close()
+        with cls._clients_lock:
+            for client in cls._clients.values():
+                client.close()
+            cls._clients = {}
+            cls._listeners = {}
+            cls._client = None
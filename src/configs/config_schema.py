@@ -0,0 +1,70 @@
+from datetime import datetime, timezone
+
+from pymongo import ASCENDING
+
+# Bar document schema v2 (compact keys):
+# {"s": symbol, "i": interval, "t": BSON Date bar open (UTC),
+#  "o", "h", "l", "c", "v": OHLCV, "u": last realtime update (Date, optional),
+#  "ind": indicators (optional), "src": upstream source of the last write (optional), "_v": 2}
+SCHEMA_VERSION = 2
+
+F_SYMBOL = "s"
+F_INTERVAL = "i"
+F_TIME = "t"
+F_OPEN = "o"
+F_HIGH = "h"
+F_LOW = "l"
+F_CLOSE = "c"
+F_VOLUME = "v"
+F_UPDATED = "u"
+F_INDICATORS = "ind"
+F_SOURCE = "src"
+F_VERSION = "_v"
+
+OHLCV_FIELDS = (F_OPEN, F_HIGH, F_LOW, F_CLOSE, F_VOLUME)
+
+EPOCH = datetime(1970, 1, 1)
+
+
+def ms_to_date(ts_ms: int):
+    """Epoch ms -> naive UTC datetime (what pymongo stores/returns by default)"""
+    return datetime.fromtimestamp(int(ts_ms) / 1000, tz=timezone.utc).replace(tzinfo=None)
+
+
+def date_to_ms(dt: datetime):
+    if dt.tzinfo is not None:
+        return int(dt.timestamp() * 1000)
+    return int((dt - EPOCH).total_seconds() * 1000)
+
+
+def bar_key(symbol: str, interval: str, ts_ms: int):
+    return {F_SYMBOL: symbol, F_INTERVAL: interval, F_TIME: ms_to_date(ts_ms)}
+
+
+def bar_doc(symbol: str, interval: str, ts_ms: int, open_, high, low, close, volume):
+    doc = bar_key(symbol, interval, ts_ms)
+    doc.update(
+        {
+            F_OPEN: open_,
+            F_HIGH: high,
+            F_LOW: low,
+            F_CLOSE: close,
+            F_VOLUME: volume,
+            F_VERSION: SCHEMA_VERSION,
+        }
+    )
+    return doc
+
+
+def doc_ms(doc: dict):
+    return date_to_ms(doc[F_TIME])
+
+
+def ensure_bar_indexes(collection):
+    # Sparse so legacy (pre-v2) docs without s/i/t don't collide while migrating
+    collection.create_index(
+        [(F_SYMBOL, ASCENDING), (F_INTERVAL, ASCENDING), (F_TIME, ASCENDING)],
+        unique=True,
+        sparse=True,
+        name="bar_key",
+    )
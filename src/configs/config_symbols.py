@@ -0,0 +1,71 @@
+from collections import namedtuple
+
+from src.configs.config_variable import DATA_CRAWL_CONFIG, EXTRACT_CONFIG, QUALITY_CONFIG
+
+# One crawled series: the historical job fetches `interval` candles, the realtime job
+# polls 1m bars every ~poll_seconds (adaptive); min_value / max_value / reject_zero_volume
+# are its data-quality bounds (see quality_bounds)
+SymbolSpec = namedtuple(
+    "SymbolSpec",
+    [
+        "symbol", "exchange", "interval", "poll_seconds", "realtime", "historical",
+        "min_value", "max_value", "reject_zero_volume",
+    ],
+)
+
+
+def is_dominance(symbol: str):
+    """Dominance series (BTC.D, ETH.D, ...) are percentages"""
+    return symbol.upper().endswith(".D")
+
+
+def _entry_quality(symbol: str, entry: dict, config: dict = None):
+    config = config or QUALITY_CONFIG
+    dominance = is_dominance(symbol)
+    # The 0-100 % range and the zero-volume check only hold for dominance series;
+    # market caps (BTC, TOTAL...) set their own bounds on their symbols entry
+    return (
+        entry.get("min_value", config.get("min_value", 0.0)),
+        entry.get("max_value", config.get("max_value", 100.0) if dominance else None),
+        entry.get("reject_zero_volume", config.get("reject_zero_volume", True) if dominance else False),
+    )
+
+
+def quality_bounds(symbol: str, config: dict = None):
+    """(min_value, max_value, reject_zero_volume) of a symbol; None = no bound"""
+    for entry in DATA_CRAWL_CONFIG.get("symbols") or []:
+        if isinstance(entry, dict) and entry.get("symbol") == symbol:
+            return _entry_quality(symbol, entry, config)
+    return _entry_quality(symbol, {}, config)
+
+
+def crawl_symbols(config: dict = None):
+    """DATA_CRAWL_CONFIG["symbols"] as SymbolSpec list (falls back to the single "symbol")"""
+    config = config or DATA_CRAWL_CONFIG
+    entries = config.get("symbols") or [config.get("symbol", "BTC.D")]
+    specs = []
+    for entry in entries:
+        if isinstance(entry, str):
+            entry = {"symbol": entry}
+        min_value, max_value, reject_zero_volume = _entry_quality(entry["symbol"], entry)
+        specs.append(
+            SymbolSpec(
+                symbol=entry["symbol"],
+                exchange=entry.get("exchange", "CRYPTOCAP"),
+                interval=entry.get("interval", "1d"),
+                poll_seconds=entry.get("poll_seconds", EXTRACT_CONFIG.get("realtime_poll_seconds", 30)),
+                realtime=entry.get("realtime", EXTRACT_CONFIG.get("realtime_enabled", True)),
+                historical=entry.get("historical", EXTRACT_CONFIG.get("historical_enabled", True)),
+                min_value=min_value,
+                max_value=max_value,
+                reject_zero_volume=reject_zero_volume,
+            )
+        )
+    return specs
+
+
+def interval_specs(specs: list, interval: str):
+    """Symbols with a crawled `interval` series: 1m bars come from the realtime job"""
+    if interval == "1m":
+        return [spec for spec in specs if spec.realtime]
+    return [spec for spec in specs if spec.historical and spec.interval == interval]
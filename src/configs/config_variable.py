@@ -19,16 +19,77 @@ MONGO_CONFIG = {
     "auth": os.getenv("MONGO_AUTH"),
 }
 
+# Connection profiles: MongoClient options per workload, so backfills do not
+# compete with the realtime tick for the same pool.
+# Compressors missing on this host (zstd needs `zstandard`, snappy needs
+# `python-snappy`) are skipped at connect time; zlib is always available.
+MONGO_PROFILES = {
+    "default": {},
+    # realtime tick: small warm pool, acknowledged single-node writes, fail fast
+    "realtime": {
+        "maxPoolSize": 4,
+        "minPoolSize": 1,
+        "w": 1,
+        "serverSelectionTimeoutMS": 5000,
+        "socketTimeoutMS": 10000,
+        "waitQueueTimeoutMS": 2000,
+        "appname": "btcd-realtime",
+    },
+    # backfills / repair / retention: big batches, compressed, relaxed journaling
+    "bulk": {
+        "maxPoolSize": 16,
+        "w": 1,
+        "journal": False,
+        "compressors": "zstd,snappy,zlib",
+        "zlibCompressionLevel": 6,
+        "socketTimeoutMS": 300000,
+        "maxIdleTimeMS": 60000,
+        "appname": "btcd-bulk",
+    },
+    # freshness checks / change streams: read from secondaries when there are any
+    "monitor": {
+        "maxPoolSize": 2,
+        "readPreference": "secondaryPreferred",
+        "compressors": "zstd,snappy,zlib",
+        "serverSelectionTimeoutMS": 5000,
+        "socketTimeoutMS": 20000,
+        "appname": "btcd-monitor",
+    },
+}
 
 DATA_CRAWL_CONFIG = {
     # socket/url field removed (not used for BTC.D dominance-only pipeline)
     "url": None,
     "db": "btc_dominance",
     "collection": "raw_btc_dominance",
-    # Preferred symbol used for historical/realtime fetches
+    # 1-minute bars fetched by the realtime extractor
+    "minute_collection": "raw_btc_dominance_1m",
+    # hourly archive built by downsampling old minute bars (retention job)
+    "hourly_collection": "raw_btc_dominance_1h",
+    # Preferred symbol used for historical/realtime fetches; also the one the Telegram
+    # monitor works on and the default of the jobs' --symbol options
     "symbol": "BTC.D",
+    # Every series the crawl scheduler tracks (see CRAWL_SCHEDULER_CONFIG). Per symbol:
+    #   exchange, interval (candles of the historical job: "1d" or "1h"),
+    #   poll_seconds (base realtime cadence), realtime / historical (which jobs run),
+    #   min_value / max_value / reject_zero_volume (data-quality bounds, see QUALITY_CONFIG)
+    # A plain string uses the defaults. Bars of all symbols share the same collections,
+    # keyed by (s, i, t).
+    "symbols": [
+        {"symbol": "BTC.D", "exchange": "CRYPTOCAP", "interval": "1d", "poll_seconds": 30},
+    ],
     # Relative path to historical CSV exported from test (if available)
     "historical_csv": "btcd_daily_data.csv",
+    # Storage sinks bars are written to: any of "mongo", "sqlite", "parquet".
+    # Several sinks = fan-out; the first one is primary (its errors fail the write).
+    # Reads (warm-up, freshness checks, jobs) still go to Mongo.
+    "sinks": ["mongo"],
+    # embedded store for edge nodes (WAL mode, one transaction per batch)
+    "sqlite_path": "data/btc_dominance.sqlite",
+    # append-only parquet parts: <dir>/<interval>/part-<ns>.parquet (needs pyarrow)
+    "parquet_dir": "data/parquet",
+    "parquet_flush_rows": 1000,
+    "parquet_flush_seconds": 300,
 }
 
 EXTRACT_CONFIG = {
@@ -37,11 +98,331 @@ EXTRACT_CONFIG = {
     "historical_enabled": True,
     # configure data days here - "all" will download complete historical data
     "historical_days": "all",
-    "run_parallel": True,
-    # expected realtime insertion cadence in seconds (default daily)
-    "realtime_poll_seconds": 24 * 60 * 60,
+    # base realtime poll cadence in seconds; adapted at runtime, see REALTIME_CADENCE_CONFIG
+    "realtime_poll_seconds": 30,
     # wait this many seconds after midnight UTC before inserting daily data
     "realtime_post_midnight_delay_seconds": 60,
+    # on resume the realtime extractor fetches the missed minutes in one request (tvDatafeed caps n_bars at 5000)
+    "catchup_max_bars": 5000,
+}
+
+CRAWL_SCHEDULER_CONFIG = {
+    # run every symbol of DATA_CRAWL_CONFIG["symbols"] on one bounded worker pool
+    # instead of one thread per extractor
+    "workers": 4,
+    # spread the first polls so N symbols do not hit the rate budget in the same second
+    "start_stagger_seconds": 0.5,
+    # a symbol's job that keeps failing is retried with backoff up to this many seconds
+    "max_backoff_seconds": 300,
+    # every poll of every symbol spends UPSTREAM_CONFIG's shared budget. Realtime polls may
+    # use this share of rate_per_second (the rest is left to historical / derived jobs); with
+    # more symbols than that allows, each symbol's polls are stretched to
+    # n_realtime_symbols / (rate_per_second * share) seconds apart
+    "realtime_budget_share": 0.8,
+}
+
+SUPERVISOR_CONFIG = {
+    # watchdog period (runs on the main thread): restarts dead service threads and the
+    # crawl dispatcher, checks job liveness
+    "check_seconds": 5,
+    # a crashed service (SSE server, change streams) is restarted with exponential backoff
+    "restart_base_seconds": 5,
+    "restart_max_seconds": 300,
+    # a job running or overdue this long is reported as stalled
+    "stall_seconds": 600,
+    # a job failing this many times in a row is reported until it succeeds again
+    "alert_after_errors": 3,
+    # per-worker CPU time / liveness report is logged this often
+    "report_seconds": 300,
+}
+
+WRITE_COORDINATOR_CONFIG = {
+    # every extractor submits bar mutations to one process-wide writer (see write_coordinator.py)
+    "mongo_profile": "realtime",
+    # writes accumulate until this many candles are pending or flush_interval_seconds pass
+    "batch_size": 500,
+    "flush_interval_seconds": 1.0,
+    # per interval: field -> source that owns it; other sources can only fill it in / widen h, l
+    "field_owners": {
+        "1d": {"o": "historical", "h": "historical", "l": "historical", "c": "historical",
+               "v": "historical", "u": "realtime", "ind": "realtime"},
+    },
+    # while a candle is still open, its h/l/c/v belong to the live feed
+    "open_candle_owner": "realtime",
+    # latest flush / submit->commit latencies kept for p50/p95/p99
+    "latency_samples": 10000,
+}
+
+REALTIME_PIPELINE_CONFIG = {
+    # asyncio pipeline used by the CSV replay (replay_source.py): source -> bounded queue ->
+    # normalize -> batched writer (+ monitor side-channel). Live polls run as crawl scheduler
+    # jobs and are batched by the write coordinator instead; their stage stats are in the
+    # crawl scheduler's stats ("realtime_stages", "writes")
+    # bounded queues between stages; when full the oldest item is dropped (newest tick wins)
+    "queue_size": 64,
+    # the writer flushes when it holds this many ops or after flush_interval_seconds
+    "write_batch_size": 50,
+    "flush_interval_seconds": 1.0,
+    # stage stats (queue depth, throughput, latency) are logged this often
+    "stats_log_seconds": 300,
+    # latest fetch->commit latencies kept for p50/p95/p99
+    "latency_samples": 100000,
+}
+
+REALTIME_CADENCE_CONFIG = {
+    # adapt the realtime poll interval to the market; False keeps realtime_poll_seconds
+    "enabled": True,
+    # fast when bars move / an alert rule is near, flat (slowest) when dominance is quiet
+    "fast_seconds": 5,
+    "flat_seconds": 60,
+    # polls land on minute-bar close + offset (sub-minute intervals divide the minute evenly)
+    "align_to_minute": True,
+    "close_offset_seconds": 2,
+    # |close change| in % between consecutive 1m bars (BTC.D median is ~0.007%)
+    "fast_move_pct": 0.02,
+    "flat_move_pct": 0.003,
+    "move_window_bars": 5,
+    # poll fast while the price is within this % of firing an alert rule
+    "rule_proximity_pct": 0.05,
+    # recent polls used for the effective rate
+    "rate_window_polls": 120,
+}
+
+UPSTREAM_CONFIG = {
+    # process-wide token bucket shared by every TradingView call
+    "rate_per_second": 0.5,
+    "burst": 5,
+    # max seconds a caller waits for a token before giving up
+    "acquire_timeout_seconds": 300,
+    # retries with exponential backoff + full jitter
+    "max_retries": 5,
+    # an empty answer is retried at most this often (each retry spends a token); realtime
+    # fetches (n_bars <= realtime_max_bars) take an empty answer as "no new bar" and never retry
+    "max_empty_retries": 1,
+    "realtime_max_bars": 2,
+    "backoff_base_seconds": 1,
+    "backoff_max_seconds": 60,
+    # circuit breaker: open after N consecutive failures, probe again after reset
+    "breaker_failure_threshold": 5,
+    "breaker_reset_seconds": 120,
+}
+
+SOURCE_CONFIG = {
+    # realtime fetches go to the primary; when it has not answered within its own
+    # p<hedge_percentile> latency, the same request is sent to the secondary and the
+    # first valid answer wins
+    "hedge_enabled": True,
+    "primary": "tradingview",
+    "secondary": "global_mcap",
+    "hedge_percentile": 95,
+    # primary latency samples kept; until min_samples the default delay is used
+    "latency_window": 200,
+    "min_samples": 20,
+    "default_hedge_delay_seconds": 3.0,
+    "min_hedge_delay_seconds": 0.5,
+    # the secondary only has the latest value, so catch-up fetches stay on the primary
+    "hedge_max_bars": 2,
+    # ask the secondary every N polls even when the primary is fast, to keep the basis fresh
+    "basis_probe_every": 20,
+    "max_workers": 4,
+    "global_mcap": {
+        # CoinGecko-style /global endpoint: data.market_cap_percentage + data.updated_at
+        "url": "https://api.coingecko.com/api/v3/global",
+        "timeout_seconds": 5,
+        # CRYPTOCAP symbol -> key in market_cap_percentage
+        "symbols": {"BTC.D": "btc", "ETH.D": "eth", "USDT.D": "usdt"},
+    },
+}
+
+DERIVED_SERIES_CONFIG = {
+    "enabled": False,
+    "exchange": "CRYPTOCAP",
+    "interval": "1m",
+    # constituent market-cap series; each is fetched once per poll, whatever the number of
+    # derived symbols using it
+    "inputs": ["BTC", "ETH", "USDT", "TOTAL"],
+    # derived symbol -> expression over the inputs (numbers, names, + - * / and parentheses)
+    "series": {
+        # own name so it does not overwrite the BTC.D bars fetched from TradingView
+        "BTC.D.CALC": "BTC / TOTAL * 100",
+        "ETH.D": "ETH / TOTAL * 100",
+        "USDT.D": "USDT / TOTAL * 100",
+        "OTHERS.D": "(TOTAL - BTC - ETH - USDT) / TOTAL * 100",
+        "ETH.BTC.MCAP": "ETH / BTC",
+    },
+    "poll_seconds": 60,
+    # bars fetched per input on start (vectorized backfill) and on every poll
+    "backfill_bars": 1000,
+    "poll_bars": 2,
+    # timestamps kept while waiting for the remaining inputs of a bar
+    "pending_bars": 10,
+}
+
+GAP_REPAIR_CONFIG = {
+    # scheduled by the supervisor for every crawled symbol (1m: realtime symbols,
+    # 1h/1d: symbols whose historical interval it is)
+    "enabled": True,
+    "intervals": ["1m", "1d"],
+    "run_every_seconds": 6 * 60 * 60,
+    # tvDatafeed only returns the latest n bars, so spans older than this are unreachable
+    "max_fetch_bars": {"1m": 5000, "1h": 5000, "1d": 10000},
+    # default audit range per interval when no start is given
+    "default_lookback_days": {"1m": 3, "1h": 180, "1d": 365 * 15},
+}
+
+RECONCILE_CONFIG = {
+    # re-fetch the trailing window of closed bars and rewrite only the ones upstream revised
+    "enabled": True,
+    "window_bars": {"1m": 240, "1h": 72, "1d": 30},
+    # values are compared after rounding to this many decimals (float noise is not a revision)
+    "compare_decimals": 8,
+    # daily run, after the historical extractor's 7AM UTC update
+    "run_hour_utc": 8,
+    # audit trail: one document per revised / added bar with old and new values
+    "revisions_collection": "bar_revisions",
+}
+
+ROLLUP_STATS_CONFIG = {
+    # materialized per-period stats (min, max, mean, realized volatility, change) of every
+    # symbol, updated as bars commit and rebuildable with one aggregation pipeline
+    "enabled": True,
+    "collection": "bar_stats",
+    # bars the stats are computed from (log returns close-to-close of these bars)
+    "source_interval": "1m",
+    "periods": ["day", "week", "month"],
+    # pending stat updates are written every flush_seconds or once this many are queued
+    "flush_seconds": 5,
+    "flush_batch": 300,
+    # default rebuild range; only whole periods inside it are replaced
+    # (keep it within the source interval's retention, see RETENTION_CONFIG)
+    "rebuild_lookback_days": 30,
+    # daily rebuild of every symbol by the supervisor, after reconciliation (8AM UTC) so
+    # revised and repaired bars reach the stats
+    "rebuild_enabled": True,
+    "rebuild_hour_utc": 9,
+}
+
+RETENTION_CONFIG = {
+    # run daily by the supervisor over every crawled (and derived) symbol
+    "enabled": True,
+    "run_hour_utc": 3,
+    # keep_days=None keeps the interval forever
+    # downsample_to: coarser intervals rebuilt from this one before old bars are pruned
+    # ttl_field: BSON Date field for a Mongo TTL index, e.g. "t" (bar open time);
+    #            with TTL set, Mongo expires bars itself instead of batched pruning;
+    #            not allowed together with downsample_to (bars could expire before the rollup)
+    "policies": {
+        "1m": {"keep_days": 30, "downsample_to": ["1h", "1d"], "ttl_field": None},
+        "1h": {"keep_days": 2 * 365, "downsample_to": [], "ttl_field": None},
+        "1d": {"keep_days": None, "downsample_to": [], "ttl_field": None},
+    },
+    # pruning deletes at most this many docs per batch, pausing in between
+    "delete_batch_size": 5000,
+    "delete_pause_seconds": 0.2,
+}
+
+PUBLISH_CONFIG = {
+    # push each committed bar to SSE subscribers
+    "enabled": False,
+    # "bus": in-process pub/sub fed by the extractors
+    # "change_stream": tail Mongo change streams (requires a replica set)
+    "source": "bus",
+    "host": "0.0.0.0",
+    "port": 8765,
+    # per-client buffer; when full the oldest bar is dropped
+    "client_buffer": 256,
+    # SSE keep-alive comment interval
+    "heartbeat_seconds": 15,
+}
+
+INDICATOR_CONFIG = {
+    # streaming indicators are updated per realtime bar and stored under "ind" on the candle
+    "enabled": True,
+    "interval": "1m",
+    "sma": [20, 50],
+    "ema": [12, 26],
+    "rsi": [14],
+    # (window, number of standard deviations)
+    "bollinger": [(20, 2.0)],
+    # bars replayed from Mongo to warm the streaming state on start
+    "warmup_bars": 1000,
+    # backfill: cursor batch and bulk write size; stored values within this relative
+    # tolerance of the recomputed ones are left alone
+    "backfill_batch_size": 1000,
+    "backfill_rtol": 1e-9,
+}
+
+ALERT_RULES_CONFIG = {
+    "enabled": True,
+    # days of daily candles loaded once to seed new-high/low windows
+    "warmup_days": 30,
+    "rules": [
+        {"name": "BTC.D crosses 60%", "type": "threshold", "level": 60.0,
+         "direction": "both", "cooldown_seconds": 60 * 60},
+        {"name": "BTC.D moves 0.5% in 15m", "type": "move", "pct": 0.5,
+         "window_minutes": 15, "cooldown_seconds": 15 * 60},
+        {"name": "BTC.D new 30-day high", "type": "new_high", "days": 30,
+         "cooldown_seconds": 24 * 60 * 60},
+        {"name": "BTC.D new 30-day low", "type": "new_low", "days": 30,
+         "cooldown_seconds": 24 * 60 * 60},
+    ],
+}
+
+QUALITY_CONFIG = {
+    # vectorized checks before bars are written; rejected rows go to quarantine with reasons
+    "enabled": True,
+    # prices must be above min_value; dominance (*.D) series are percentages, so they also
+    # stay <= max_value and reject zero volume. Other symbols (market caps) set their own
+    # min_value / max_value / reject_zero_volume on their DATA_CRAWL_CONFIG["symbols"] entry
+    "min_value": 0.0,
+    "max_value": 100.0,
+    "reject_zero_volume": True,
+    # spike: |log return| z-score vs the trailing window (needs min periods) and a minimum size
+    "spike_window": 60,
+    "spike_min_periods": 10,
+    "spike_z": 12.0,
+    "min_spike_pct": 1.0,
+    "quarantine_collection": "bars_quarantine",
+}
+
+RECENT_BARS_CONFIG = {
+    # in-memory window of the latest 1-minute bars (one day = 1440 bars, ~138 KB)
+    "capacity": 24 * 60,
+    # warm-load the window from Mongo when the realtime extractor starts
+    "warm_load": True,
+}
+
+EXPORT_CONFIG = {
+    # range split into this many time partitions, read by `workers` threads in parallel
+    "partitions": 8,
+    "workers": 4,
+    # documents per cursor round-trip
+    "cursor_batch_size": 10000,
+    # rows per written chunk; each partition buffers at most queue_chunks chunks
+    "chunk_rows": 50000,
+    "queue_chunks": 2,
+}
+
+SCHEMA_MIGRATION_CONFIG = {
+    # legacy docs are rewritten to schema v2 in _id order, one bulk batch at a time
+    "batch_size": 1000,
+    "pause_seconds": 0.1,
+    # last migrated _id per collection, so an interrupted run resumes where it stopped
+    "state_collection": "schema_migrations",
+}
+
+FRESHNESS_CONFIG = {
+    # rolling window of landed bars per symbol for the p50/p95/p99 freshness latencies
+    # (bar close -> fetch -> commit)
+    "window": 120,
+    # bars that closed longer than this before being fetched are catch-up after an
+    # outage (the no-data alert covers those), not a freshness sample
+    "catchup_cutoff_seconds": 600,
+    # SLO: p<slo_percentile> of bar close -> commit must stay under slo_seconds
+    "slo_percentile": 95,
+    "slo_seconds": 45,
+    "min_samples": 20,
+    "alert_cooldown_seconds": 900,
 }
 
 TELEGRAM_CONFIG = {
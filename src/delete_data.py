@@ -11,7 +11,8 @@ import sys
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
 from src.configs.config_mongo import MongoDBConfig
-from src.configs.config_variable import DATA_CRAWL_CONFIG
+from src.configs.config_variable import DATA_CRAWL_CONFIG, RETENTION_CONFIG
+from src.jobs.retention import delete_in_batches
 from src.log.logger_setup import LoggerSetup
 
 def delete_all_data():
@@ -20,7 +21,7 @@ def delete_all_data():
 
     try:
         # Kết nối MongoDB
-        mongo_client = MongoDBConfig.get_client()
+        mongo_client = MongoDBConfig.get_client("bulk")
         db_name = DATA_CRAWL_CONFIG.get("db")
         collection_name = DATA_CRAWL_CONFIG.get("collection")
 
@@ -32,15 +33,21 @@ def delete_all_data():
         count_before = collection.count_documents({})
         logger.info(f"Số documents trước khi xóa: {count_before}")
 
-        # Xóa tất cả documents
-        result = collection.delete_many({})
+        # Xóa theo từng batch _id (tiếp tục sau _id cuối cùng) để không khóa collection trong một lệnh lớn
+        deleted_count = delete_in_batches(
+            collection,
+            {},
+            RETENTION_CONFIG.get("delete_batch_size", 5000),
+            RETENTION_CONFIG.get("delete_pause_seconds", 0.2),
+            logger,
+        )
 
         # Đếm số documents sau khi xóa
         count_after = collection.count_documents({})
-        logger.info(f"Số documents đã xóa: {result.deleted_count}")
+        logger.info(f"Số documents đã xóa: {deleted_count}")
         logger.info(f"Số documents sau khi xóa: {count_after}")
 
-        print(f"✅ Đã xóa thành công {result.deleted_count} documents từ collection '{collection_name}' trong database '{db_name}'")
+        print(f"✅ Đã xóa thành công {deleted_count} documents từ collection '{collection_name}' trong database '{db_name}'")
 
     except Exception as e:
         logger.error(f"Lỗi khi xóa dữ liệu: {str(e)}")
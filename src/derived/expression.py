@@ -0,0 +1,63 @@
+import ast
+import operator
+
+import numpy as np
+
+_BINARY = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: operator.mul,
+    ast.Div: operator.truediv,
+}
+
+_UNARY = {
+    ast.USub: operator.neg,
+    ast.UAdd: operator.pos,
+}
+
+
+class Expression:
+    """
+    Arithmetic over named series, e.g. "(TOTAL - BTC - ETH) / TOTAL * 100".
+    Only numbers, input names, + - * / and parentheses are accepted; the tree is
+    walked directly (no eval), so it evaluates on floats and on NumPy arrays alike.
+    """
+
+    def __init__(self, text: str, allowed_names=None):
+        self.text = text
+        try:
+            tree = ast.parse(text, mode="eval")
+        except SyntaxError as e:
+            raise ValueError(f"Invalid expression '{text}': {e.msg}") from e
+        self.inputs = set()
+        self._check(tree.body, allowed_names)
+        self._root = tree.body
+
+    def _check(self, node, allowed_names):
+        if isinstance(node, ast.BinOp) and type(node.op) in _BINARY:
+            self._check(node.left, allowed_names)
+            self._check(node.right, allowed_names)
+        elif isinstance(node, ast.UnaryOp) and type(node.op) in _UNARY:
+            self._check(node.operand, allowed_names)
+        elif isinstance(node, ast.Constant) and type(node.value) in (int, float):
+            pass
+        elif isinstance(node, ast.Name):
+            if allowed_names is not None and node.id not in allowed_names:
+                raise ValueError(f"Unknown series '{node.id}' in '{self.text}'")
+            self.inputs.add(node.id)
+        else:
+            raise ValueError(f"Unsupported syntax '{ast.dump(node)}' in '{self.text}'")
+
+    def _eval(self, node, env):
+        if isinstance(node, ast.BinOp):
+            return _BINARY[type(node.op)](self._eval(node.left, env), self._eval(node.right, env))
+        if isinstance(node, ast.UnaryOp):
+            return _UNARY[type(node.op)](self._eval(node.operand, env))
+        if isinstance(node, ast.Constant):
+            return float(node.value)
+        return env[node.id]
+
+    def evaluate(self, env: dict):
+        """Value for env {name: float or array}; division by zero gives inf/nan, not an error"""
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return self._eval(self._root, {k: np.asarray(v, dtype=np.float64) for k, v in env.items()})
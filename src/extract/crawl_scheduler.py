@@ -0,0 +1,291 @@
+import heapq
+import itertools
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from src.configs.config_symbols import crawl_symbols
+from src.configs.config_variable import CRAWL_SCHEDULER_CONFIG, EXTRACT_CONFIG, UPSTREAM_CONFIG
+from src.extract.extract_dominance_historical import ExtractBTCDominanceHistorical
+from src.extract.extract_dominance_realtime import ExtractBTCDominanceRealtime
+from src.log.logger_setup import LoggerSetup
+from src.metrics.freshness import FreshnessTracker
+from src.storage.write_coordinator import WriteCoordinator
+from src.upstream.rate_limiter import CircuitOpenError, backoff_delay
+from src.upstream.tradingview_client import TradingViewClient
+
+
+class _Job:
+    __slots__ = (
+        "name", "step", "runs", "errors", "consecutive_errors", "last_error",
+        "cpu_s", "due_at", "started_at", "finished_at", "last_ok_at",
+    )
+
+    def __init__(self, name: str, step):
+        self.name = name
+        # step() does one unit of work and returns the seconds until it is due again
+        self.step = step
+        self.runs = 0
+        self.errors = 0
+        self.consecutive_errors = 0
+        self.last_error = None
+        # CPU seconds spent in step() (thread CPU clock, so time blocked on I/O is not counted)
+        self.cpu_s = 0.0
+        # Wall-clock liveness: due_at while queued, started_at while running
+        self.due_at = None
+        self.started_at = None
+        self.finished_at = None
+        self.last_ok_at = None
+
+    def stats(self, now: float):
+        age = lambda t: now - t if t is not None else None
+        return {
+            "runs": self.runs,
+            "errors": self.errors,
+            "consecutive_errors": self.consecutive_errors,
+            "last_error": self.last_error,
+            "cpu_s": self.cpu_s,
+            "running_s": age(self.started_at),
+            "overdue_s": max(0.0, now - self.due_at) if self.started_at is None and self.due_at else 0.0,
+            "last_ok_age_s": age(self.last_ok_at),
+        }
+
+
+class CrawlScheduler:
+    """
+    Realtime and historical jobs of every symbol in DATA_CRAWL_CONFIG["symbols"] on one
+    bounded worker pool.
+
+    Jobs wait in a heap ordered by due time; a dispatcher thread hands due jobs to
+    `workers` threads, and a job goes back into the heap only once its run finished, so a
+    symbol never runs twice at the same time and 50+ series cost `workers` threads, not
+    one per symbol. Every job fetches through the shared TradingViewClient (one session,
+    one token bucket) and writes through the shared write coordinator. Realtime polls are
+    spaced so all symbols together stay within realtime_budget_share of that token bucket,
+    instead of parking pool workers in the limiter.
+    """
+
+    def __init__(self, specs: list = None, config: dict = None, telegram_monitor=None):
+        self.logger = LoggerSetup.logger_setup("CrawlScheduler")
+        config = config or CRAWL_SCHEDULER_CONFIG
+        self.specs = specs or crawl_symbols()
+        self.workers = config.get("workers", 4)
+        self.stagger = config.get("start_stagger_seconds", 0.5)
+        self.max_backoff = config.get("max_backoff_seconds", 300)
+        self.budget_share = config.get("realtime_budget_share", 0.8)
+        self.rate_per_second = UPSTREAM_CONFIG.get("rate_per_second", 0.5)
+        # Seconds between two polls of one realtime symbol the shared budget allows
+        self.realtime_min_interval = 0.0
+        # Alert rules / freshness checks of the main symbol
+        self.telegram_monitor = telegram_monitor
+
+        self.realtime = {}
+        self.historical = {}
+        self.jobs = []
+        self._heap = []
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._in_flight = 0
+        self._executor = None
+        self._dispatcher = None
+        self.running = False
+
+    def _push(self, due: float, job: _Job):
+        with self._cond:
+            job.due_at = due
+            heapq.heappush(self._heap, (due, next(self._seq), job))
+            self._cond.notify()
+
+    def _historical_step(self, extractor: ExtractBTCDominanceHistorical):
+        state = {"loaded": False}
+
+        def step():
+            if not state["loaded"]:
+                # Lần đầu: lấy lịch sử (toàn bộ hoặc historical_days ngày), sau đó chỉ cập nhật nến mới
+                historical_days = EXTRACT_CONFIG.get("historical_days", "all")
+                if historical_days == "all":
+                    extractor.get_all_historical_data()
+                else:
+                    extractor.get_recent_historical_data(days=historical_days)
+                state["loaded"] = True
+            else:
+                extractor.run_daily_once()
+            return extractor.seconds_until_next_run()
+
+        return step
+
+    def _realtime_step(self, extractor: ExtractBTCDominanceRealtime):
+        def step():
+            # The adaptive cadence never polls faster than the shared budget allows
+            return max(extractor.poll_once(), self.realtime_min_interval)
+
+        return step
+
+    def _plan_realtime_budget(self):
+        # One token per poll: a realtime fetch (n_bars <= realtime_max_bars) does not retry
+        # an empty answer, only transport errors are retried (and those trip the breaker).
+        # Catch-up fetches after an outage are one request each as well
+        specs = [spec for spec in self.specs if spec.realtime]
+        if not specs:
+            return
+        budget = self.rate_per_second * self.budget_share
+        self.realtime_min_interval = len(specs) / budget
+        # First polls too: one symbol per budget slot instead of a burst parked in the limiter
+        self.stagger = max(self.stagger, 1.0 / budget)
+        demand = sum(60.0 / spec.poll_seconds for spec in specs)
+        if demand > budget * 60:
+            self.logger.warning(
+                f"{len(specs)} realtime symbols at their poll_seconds need {demand:.0f} req/min, "
+                f"over the {budget * 60:.0f} req/min realtime budget "
+                f"(rate_per_second={self.rate_per_second}, share={self.budget_share}): "
+                f"each symbol is polled at most every {self.realtime_min_interval:.1f}s"
+            )
+
+    def _build_jobs(self):
+        self._plan_realtime_budget()
+        monitor_symbol = getattr(self.telegram_monitor, "symbol", None)
+        for spec in self.specs:
+            if spec.realtime:
+                extractor = ExtractBTCDominanceRealtime(
+                    poll_interval_seconds=spec.poll_seconds,
+                    symbol=spec.symbol,
+                    exchange=spec.exchange,
+                    telegram_monitor=self.telegram_monitor if spec.symbol == monitor_symbol else None,
+                )
+                self.realtime[spec.symbol] = extractor
+                self.jobs.append(_Job(f"realtime:{spec.symbol}", self._realtime_step(extractor)))
+            if spec.historical:
+                extractor = ExtractBTCDominanceHistorical(
+                    symbol=spec.symbol, exchange=spec.exchange, interval=spec.interval
+                )
+                self.historical[spec.symbol] = extractor
+                self.jobs.append(_Job(f"historical:{spec.symbol}", self._historical_step(extractor)))
+
+    def add_job(self, name: str, step, delay: float = 0.0):
+        """Run step() on the pool too (e.g. the derived series poll); step returns its next delay"""
+        job = _Job(name, step)
+        self.jobs.append(job)
+        if self.running:
+            self._push(time.time() + delay, job)
+        elif delay:
+            # First run after start() is due at this time instead of the start stagger
+            job.due_at = time.time() + delay
+        return job
+
+    def _run(self, job: _Job):
+        job.started_at = time.time()
+        cpu_started = time.thread_time()
+        try:
+            delay = job.step()
+            job.consecutive_errors = 0
+            job.last_ok_at = time.time()
+        except CircuitOpenError as e:
+            # Upstream breaker open: not this job's fault, wait for the probe window
+            self.logger.warning(f"Job {job.name} skipped: {e}")
+            delay = TradingViewClient().breaker.seconds_until_retry()
+        except Exception as e:
+            job.errors += 1
+            job.last_error = str(e)
+            self.logger.error(f"Job {job.name} failed: {e}")
+            delay = backoff_delay(job.consecutive_errors, base=5, cap=self.max_backoff)
+            job.consecutive_errors += 1
+        finally:
+            job.cpu_s += time.thread_time() - cpu_started
+            job.runs += 1
+            job.started_at = None
+            job.finished_at = time.time()
+            with self._cond:
+                self._in_flight -= 1
+                self._cond.notify()
+        if self.running:
+            self._push(time.time() + max(0.0, delay), job)
+
+    def _dispatch(self):
+        while True:
+            with self._cond:
+                while self.running:
+                    now = time.time()
+                    if self._heap and self._in_flight < self.workers and self._heap[0][0] <= now:
+                        break
+                    timeout = self._heap[0][0] - now if self._heap else None
+                    if self._in_flight >= self.workers:
+                        timeout = None
+                    self._cond.wait(timeout)
+                if not self.running:
+                    return
+                _, _, job = heapq.heappop(self._heap)
+                self._in_flight += 1
+            self._executor.submit(self._run, job)
+
+    def _start_dispatcher(self):
+        self._dispatcher = threading.Thread(target=self._dispatch, name="crawl-dispatch")
+        self._dispatcher.daemon = True
+        self._dispatcher.start()
+
+    def dispatcher_alive(self):
+        return self._dispatcher is not None and self._dispatcher.is_alive()
+
+    def restart_dispatcher(self):
+        """Start a new dispatcher if the old one died; queued jobs are kept"""
+        if self.running and not self.dispatcher_alive():
+            self.logger.warning("Crawl dispatcher is not running, restarting it")
+            self._start_dispatcher()
+
+    def pool_threads(self):
+        return list(getattr(self._executor, "_threads", ())) if self._executor is not None else []
+
+    def start(self):
+        if self.running:
+            return True
+        self._build_jobs()
+        self.running = True
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="crawl")
+        now = time.time()
+        for i, job in enumerate(self.jobs):
+            self._push(job.due_at or now + i * self.stagger, job)
+        self._start_dispatcher()
+        self.logger.info(
+            f"Crawl scheduler started: {len(self.jobs)} jobs for {len(self.specs)} symbols "
+            f"on {self.workers} workers"
+        )
+        return True
+
+    def stop(self):
+        with self._cond:
+            self.running = False
+            self._cond.notify_all()
+        if self._dispatcher and self._dispatcher.is_alive():
+            self._dispatcher.join(timeout=2)
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+        for extractor in self.realtime.values():
+            extractor.sink.flush()
+        self.logger.info("Crawl scheduler stopped")
+
+    def job_stats(self):
+        now = time.time()
+        return {job.name: job.stats(now) for job in list(self.jobs)}
+
+    def stats(self):
+        with self._cond:
+            queued = len(self._heap)
+            next_due = self._heap[0][0] - time.time() if self._heap else None
+        return {
+            "jobs": len(self.jobs),
+            "in_flight": self._in_flight,
+            "queued": queued,
+            "next_due_s": next_due,
+            "runs": sum(job.runs for job in self.jobs),
+            "errors": {job.name: job.errors for job in self.jobs if job.errors},
+            "cpu_s": sum(job.cpu_s for job in self.jobs),
+            "realtime_min_interval_s": self.realtime_min_interval,
+            # Bar close -> fetch -> commit, per symbol
+            "freshness": FreshnessTracker().stats(),
+            # Live path stages: fetch/normalize/monitor per symbol, then the shared writer
+            "realtime_stages": {symbol: e.stage_stats() for symbol, e in self.realtime.items()},
+            "writes": WriteCoordinator().stats(),
+        }
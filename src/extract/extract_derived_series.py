@@ -0,0 +1,148 @@
+import os
+import sys
+import threading
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from src.configs.config_schema import F_SOURCE, bar_doc
+from src.configs.config_variable import DERIVED_SERIES_CONFIG
+from src.derived.engine import DerivedSeriesEngine
+from src.log.logger_setup import LoggerSetup
+from src.storage.base import upsert_write
+from src.storage.write_coordinator import WriteCoordinator
+from src.upstream.rate_limiter import CircuitOpenError, backoff_delay
+from src.upstream.tradingview_client import TradingViewClient
+from src.upstream.tv_bars import tv_interval
+
+
+class ExtractDerivedSeries:
+    """
+    Crawls the constituent CRYPTOCAP series once per poll and writes every derived
+    series (DERIVED_SERIES_CONFIG["series"]) computed from them: one request per input,
+    not per derived symbol. Starts with a vectorized backfill, then updates incrementally.
+    """
+
+    def __init__(self, poll_interval_seconds: int = None, sink=None, config: dict = None):
+        self.logger = LoggerSetup.logger_setup("ExtractDerivedSeries")
+        config = config or DERIVED_SERIES_CONFIG
+        self.engine = DerivedSeriesEngine(config=config)
+        self.exchange = config.get("exchange", "CRYPTOCAP")
+        self.interval = config.get("interval", "1m")
+        self.poll_interval_seconds = poll_interval_seconds or config.get("poll_seconds", 60)
+        self.backfill_bars = config.get("backfill_bars", 1000)
+        self.poll_bars = config.get("poll_bars", 2)
+        # Chung token bucket / circuit breaker với các extractor khác
+        self.tv_client = TradingViewClient()
+        self.sink = sink or WriteCoordinator().for_source("derived")
+        self.running = False
+        self.thread = None
+        self.consecutive_errors = 0
+
+    def _fetch_inputs(self, n_bars: int):
+        """{input: [Bar]} with one request per constituent series"""
+        interval = tv_interval(self.interval)
+        fetched = {}
+        for name in self.engine.inputs:
+            bars = self.tv_client.get_bars(
+                symbol=name, exchange=self.exchange, interval=interval, n_bars=n_bars
+            )
+            fetched[name] = bars or []
+        return fetched
+
+    def _write(self, derived: dict):
+        """derived {symbol: [Bar]} -> one batch of upserts"""
+        writes = []
+        for symbol, bars in derived.items():
+            for bar in bars:
+                doc = bar_doc(symbol, self.interval, bar.ts_ms, bar.open, bar.high, bar.low, bar.close, bar.volume)
+                doc[F_SOURCE] = bar.src
+                writes.append(upsert_write(doc))
+        if writes:
+            self.sink.write(writes)
+        return len(writes)
+
+    def backfill(self, n_bars: int = None):
+        """Fetch n_bars of every input and write all derived series in one vectorized pass"""
+        try:
+            fetched = self._fetch_inputs(n_bars or self.backfill_bars)
+            written = self._write(self.engine.compute(fetched))
+            self.logger.info(
+                f"Backfilled {written} derived bars ({len(self.engine.expressions)} series "
+                f"from {len(self.engine.inputs)} inputs)"
+            )
+            return written
+        except CircuitOpenError:
+            raise
+        except Exception as e:
+            self.logger.error(f"Derived series backfill failed: {e}")
+            return 0
+
+    def poll_once(self):
+        """Fetch the latest bars of every input and write the derived bars they complete"""
+        fetched = self._fetch_inputs(self.poll_bars)
+        latest = {}
+        for name, bars in fetched.items():
+            for bar in bars:
+                for symbol, derived in self.engine.update(name, bar).items():
+                    # Revisions of the same bar in one poll: keep the last
+                    latest[(symbol, derived.ts_ms)] = derived
+        by_symbol = {}
+        for (symbol, _), bar in sorted(latest.items(), key=lambda item: item[0][1]):
+            by_symbol.setdefault(symbol, []).append(bar)
+        return self._write(by_symbol)
+
+    def _run_loop(self):
+        self.logger.info(
+            f"Derived series loop started: {sorted(self.engine.expressions)} "
+            f"from {self.engine.inputs}, every {self.poll_interval_seconds}s"
+        )
+        try:
+            self.backfill()
+        except CircuitOpenError as e:
+            self.logger.warning(f"Derived series backfill skipped: {e}")
+
+        while self.running:
+            try:
+                time.sleep(self.poll_interval_seconds)
+                if not self.running:
+                    break
+                written = self.poll_once()
+                self.logger.debug(f"Wrote {written} derived bars")
+                self.consecutive_errors = 0
+            except CircuitOpenError as e:
+                self.logger.warning(f"Derived series fetch skipped: {e}")
+                time.sleep(self.tv_client.breaker.seconds_until_retry())
+            except Exception as e:
+                self.logger.error(f"Error in derived series loop: {e}")
+                time.sleep(backoff_delay(self.consecutive_errors, base=5, cap=300))
+                self.consecutive_errors += 1
+
+        self.logger.info("Derived series loop stopped")
+
+    def start(self):
+        if self.running:
+            return True
+        self.running = True
+        self.thread = threading.Thread(target=self._run_loop)
+        self.thread.daemon = True
+        self.thread.start()
+        self.logger.info("Derived series extractor started")
+        return True
+
+    def stop(self):
+        self.running = False
+        self.sink.flush()
+        if self.thread and self.thread.is_alive():
+            self.thread.join(timeout=2)
+        self.logger.info("Derived series extractor stopped")
+
+
+if __name__ == "__main__":
+    d = ExtractDerivedSeries()
+    d.start()
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        d.stop()
@@ -7,23 +7,49 @@ import pandas as pd
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
+from src.configs.config_interval import INTERVAL_MS
 from src.configs.config_mongo import MongoDBConfig
+from src.configs.config_schema import F_SOURCE, F_TIME, bar_doc, ensure_bar_indexes
 from src.configs.config_variable import DATA_CRAWL_CONFIG, EXTRACT_CONFIG
 from src.log.logger_setup import LoggerSetup
+from src.quality.quarantine import Quarantine
+from src.quality.validator import BarValidator
+from src.storage.write_coordinator import WriteCoordinator
+from src.upstream.rate_limiter import CircuitOpenError
+from src.upstream.sources import TradingViewSource
+from src.upstream.tradingview_client import TradingViewClient
+from src.upstream.tv_bars import tv_interval
 
 
 class ExtractBTCDominanceHistorical:
-    def __init__(self, csv_path: str = None, poll_interval_seconds: int = 24 * 60 * 60):
+    def __init__(
+        self,
+        csv_path: str = None,
+        poll_interval_seconds: int = 24 * 60 * 60,
+        symbol: str = None,
+        exchange: str = None,
+        interval: str = "1d",
+    ):
         self.logger = LoggerSetup.logger_setup("ExtractBTCDominanceHistorical")
-        self.mongo_client = MongoDBConfig.get_client()
+        self.mongo_client = MongoDBConfig.get_client("bulk")
         self.db_name = DATA_CRAWL_CONFIG.get("db")
         self.collection_name = DATA_CRAWL_CONFIG.get("collection")
         self.collection = self.mongo_client.get_database(self.db_name).get_collection(
             self.collection_name
         )
+        ensure_bar_indexes(self.collection)
+        # Cùng write coordinator với realtime extractor: nến ngày đang mở thuộc về realtime
+        self.sink = WriteCoordinator().for_source("historical")
         # CSV is not used in this extractor; we always write to Mongo
         self.csv_path = None
-        self.symbol = DATA_CRAWL_CONFIG.get("symbol", "BTC.D")
+        self.symbol = symbol or DATA_CRAWL_CONFIG.get("symbol", "BTC.D")
+        self.exchange = exchange or "CRYPTOCAP"
+        # Nến ngày mặc định; "1h" cho symbol cấu hình theo giờ
+        self.interval = interval
+        self.tv_client = TradingViewClient()
+        # Nến lỗi (NaN, high < low, spike...) vào quarantine thay vì Mongo
+        self.validator = BarValidator(symbol=self.symbol)
+        self.quarantine = Quarantine()
         
         # Thêm logic chạy định kỳ như realtime extractor cũ
         self.poll_interval_seconds = poll_interval_seconds
@@ -32,9 +58,38 @@ class ExtractBTCDominanceHistorical:
 
     # No CSV reading: historical extractor writes only to Mongo
 
+    def _row_to_doc(self, dt: datetime, row):
+        """Build a v2 daily bar document from a tvDatafeed row"""
+
+        def value(name):
+            raw = row.get(name, row.get(name.capitalize(), None))
+            return float(raw) if pd.notnull(raw) else None
+
+        doc = bar_doc(
+            self.symbol,
+            self.interval,
+            int(dt.timestamp() * 1000),
+            value("open"),
+            value("high"),
+            value("low"),
+            value("close"),
+            value("volume"),
+        )
+        doc[F_SOURCE] = TradingViewSource.name
+        return doc
+
+    def _validated(self, docs: list):
+        valid, rejected = self.validator.validate_docs(docs)
+        self.quarantine.put(rejected, "historical")
+        return valid
+
+    def _upsert_daily_docs(self, docs: list):
+        # Chỉ ghi các field historical (OHLCV), giữ nguyên field realtime như "u"/"ind"
+        self.sink.upsert_docs(self._validated(docs))
+
     def _insert_daily_docs(self, df: pd.DataFrame):
         # Expect df.index as datetime-like
-        inserted = 0
+        docs = []
         for idx, row in df.iterrows():
             try:
                 # normalize timestamp
@@ -43,95 +98,41 @@ class ExtractBTCDominanceHistorical:
                 else:
                     dt = idx.to_pydatetime()
 
-                doc = {
-                    "datetime": dt.strftime("%Y-%m-%d"),  # Chỉ ngày, không có giờ
-                    "timestamp_ms": int(dt.timestamp() * 1000),
-                    "open": (
-                        float(row.get("open", row.get("Open", None)))
-                        if pd.notnull(row.get("open", row.get("Open", None)))
-                        else None
-                    ),
-                    "high": (
-                        float(row.get("high", row.get("High", None)))
-                        if pd.notnull(row.get("high", row.get("High", None)))
-                        else None
-                    ),
-                    "low": (
-                        float(row.get("low", row.get("Low", None)))
-                        if pd.notnull(row.get("low", row.get("Low", None)))
-                        else None
-                    ),
-                    "close": (
-                        float(row.get("close", row.get("Close", None)))
-                        if pd.notnull(row.get("close", row.get("Close", None)))
-                        else None
-                    ),
-                    "volume": (
-                        float(row.get("volume", row.get("Volume", None)))
-                        if pd.notnull(row.get("volume", row.get("Volume", None)))
-                        else None
-                    ),
-                }
-
-                # Check if document already exists to avoid overwriting realtime fields
-                existing_doc = self.collection.find_one({"timestamp_ms": doc["timestamp_ms"]})
-                
-                if existing_doc:
-                    # Document exists, only update historical fields
-                    historical_fields = {
-                        "datetime": doc["datetime"],
-                        "timestamp_ms": doc["timestamp_ms"],
-                        "open": doc["open"],
-                        "high": doc["high"],
-                        "low": doc["low"],
-                        "close": doc["close"],
-                        "volume": doc["volume"]
-                    }
-                    self.collection.update_one(
-                        {"timestamp_ms": doc["timestamp_ms"]},
-                        {"$set": historical_fields, "$unset": {"symbol": ""}},
-                    )
-                else:
-                    # New document, upsert completely
-                    self.collection.update_one(
-                        {"timestamp_ms": doc["timestamp_ms"]},
-                        {"$set": doc, "$unset": {"symbol": ""}},
-                        upsert=True,
-                    )
-                inserted += 1
+                docs.append(self._row_to_doc(dt, row))
+            except Exception as e:
+                self.logger.error(f"Failed to convert row {idx}: {e}")
+
+        docs = self._validated(docs)
+
+        # Một batch cho cả lịch sử thay vì một lệnh ghi mỗi dòng
+        inserted = 0
+        batch_size = 1000
+        for start in range(0, len(docs), batch_size):
+            try:
+                inserted += self.sink.upsert_docs(docs[start : start + batch_size])
             except Exception as e:
-                self.logger.error(f"Failed to insert row {idx}: {e}")
+                self.logger.error(f"Failed to write daily batch at {start}: {e}")
+        self.sink.flush()
 
         self.logger.info(
             f"Inserted/updated {inserted} daily documents into {self.collection_name}"
         )
         return inserted
 
-    def get_all_historical_data(self):
+    def get_all_historical_data(self, n_bars: int = 10000):
         # Always fetch from TradingView and upsert into Mongo
         try:
-            from tvDatafeed import TvDatafeed, Interval
-
-            tv = TvDatafeed()
             self.logger.info(
                 f"Fetching historical data from TradingView via tvDatafeed for symbol {self.symbol}"
             )
 
-            attempts = 3
-            df = None
-            for attempt in range(1, attempts + 1):
-                try:
-                    df = tv.get_hist(
-                        symbol=self.symbol,
-                        exchange="CRYPTOCAP",
-                        interval=Interval.in_daily,
-                        n_bars=10000,
-                    )
-                    if df is not None and len(df) > 0:
-                        break
-                except Exception as e:
-                    self.logger.warning(f"Attempt {attempt} failed: {e}")
-                time.sleep(2)
+            # Retries/backoff are handled by the shared TradingView client
+            df = self.tv_client.get_hist(
+                symbol=self.symbol,
+                exchange=self.exchange,
+                interval=tv_interval(self.interval),
+                n_bars=n_bars,
+            )
 
             if df is None or len(df) == 0:
                 self.logger.warning(
@@ -146,168 +147,98 @@ class ExtractBTCDominanceHistorical:
             raise
 
     def get_recent_historical_data(self, days: int = 30):
-        try:
-            from tvDatafeed import TvDatafeed, Interval
-        except Exception as e:
-            self.logger.error(f"Error fetching recent historical data: {e}")
-            raise
+        """Chỉ lấy `days` ngày gần nhất (historical_days dạng số) thay vì toàn bộ lịch sử"""
+        bars_per_day = INTERVAL_MS["1d"] // INTERVAL_MS.get(self.interval, INTERVAL_MS["1d"])
+        # +1: the open candle of today
+        n_bars = max(1, int(days)) * bars_per_day + 1
+        self.logger.info(f"Fetching the last {days} days ({n_bars} {self.interval} bars) of {self.symbol}")
+        return self.get_all_historical_data(n_bars=n_bars)
 
     def _fetch_daily_data(self):
-        """Lấy data daily mới nhất (logic cũ của realtime extractor)"""
+        """
+        Daily docs of the last 2 days: yesterday's finished candle and today's open one
+        (the coordinator keeps today's price fields with the realtime feed)
+        """
         try:
-            from tvDatafeed import TvDatafeed, Interval
-
-            tv = TvDatafeed()
-            # Lấy 2 ngày gần nhất để đảm bảo có data mới
-            df = tv.get_hist(
+            # Lấy 2 nến gần nhất để đảm bảo có data mới
+            df = self.tv_client.get_hist(
                 symbol=self.symbol,
-                exchange="CRYPTOCAP",
-                interval=Interval.in_daily,
+                exchange=self.exchange,
+                interval=tv_interval(self.interval),
                 n_bars=2,
             )
 
             if df is None or len(df) == 0:
                 return None
 
-            # Lấy ngày mới nhất
-            last_idx = df.index[-1]
-            last_row = df.iloc[-1]
-
-            if hasattr(last_idx, "to_pydatetime"):
-                dt = last_idx.to_pydatetime()
-            else:
-                dt = pd.to_datetime(last_idx).to_pydatetime()
-
-            doc = {
-                "datetime": dt.strftime("%Y-%m-%d"),  # Chỉ ngày, không có giờ
-                "timestamp_ms": int(dt.timestamp() * 1000),
-                "open": (
-                    float(last_row.get("open", last_row.get("Open", None)))
-                    if pd.notnull(last_row.get("open", last_row.get("Open", None)))
-                    else None
-                ),
-                "high": (
-                    float(last_row.get("high", last_row.get("High", None)))
-                    if pd.notnull(last_row.get("high", last_row.get("High", None)))
-                    else None
-                ),
-                "low": (
-                    float(last_row.get("low", last_row.get("Low", None)))
-                    if pd.notnull(last_row.get("low", last_row.get("Low", None)))
-                    else None
-                ),
-                "close": (
-                    float(last_row.get("close", last_row.get("Close", None)))
-                    if pd.notnull(last_row.get("close", last_row.get("Close", None)))
-                    else None
-                ),
-                "volume": (
-                    float(last_row.get("volume", last_row.get("Volume", None)))
-                    if pd.notnull(last_row.get("volume", last_row.get("Volume", None)))
-                    else None
-                ),
-            }
-
-            return doc
+            return [
+                self._row_to_doc(pd.Timestamp(idx).to_pydatetime(), row)
+                for idx, row in df.iterrows()
+            ]
 
+        except CircuitOpenError as e:
+            self.logger.warning(f"Skipping daily fetch: {e}")
+            return None
         except Exception as e:
             self.logger.error(f"Error fetching daily data via tvDatafeed: {e}")
             return None
 
-    def _insert_daily_doc(self, doc: dict):
-        """Insert daily document"""
-        if not doc:
+    def _insert_daily_doc(self, docs: list):
+        """Upsert the latest daily documents"""
+        if not docs:
             return False
         try:
-            # Kiểm tra xem document đã tồn tại chưa
-            existing_doc = self.collection.find_one({"timestamp_ms": doc["timestamp_ms"]})
-            
-            if existing_doc:
-                # Document đã tồn tại, chỉ update các field historical, giữ nguyên realtime fields
-                historical_fields = {
-                    "datetime": doc["datetime"],
-                    "timestamp_ms": doc["timestamp_ms"],
-                    "open": doc["open"],
-                    "high": doc["high"],
-                    "low": doc["low"],
-                    "close": doc["close"],
-                    "volume": doc["volume"]
-                }
-                self.collection.update_one(
-                    {"timestamp_ms": doc["timestamp_ms"]},
-                    {"$set": historical_fields, "$unset": {"symbol": ""}},
-                )
-                self.logger.info(f"Updated historical fields for existing doc ts={doc['timestamp_ms']}")
-            else:
-                # Document mới, insert toàn bộ
-                self.collection.update_one(
-                    {"timestamp_ms": doc["timestamp_ms"]},
-                    {"$set": doc, "$unset": {"symbol": ""}},
-                    upsert=True,
-                )
-                self.logger.info(f"Upserted new daily doc ts={doc['timestamp_ms']}")
+            self._upsert_daily_docs(docs)
+            self.logger.info(
+                f"Upserted {len(docs)} daily docs up to t={docs[-1][F_TIME]:%Y-%m-%d}"
+            )
             return True
         except Exception as e:
             self.logger.error(f"Failed to insert daily doc: {e}")
             return False
 
+    def seconds_until_next_run(self, now: datetime = None):
+        """Daily candles: next 7AM UTC; hourly: next hour close + 1 minute"""
+        now = now or datetime.utcnow()
+        if self.interval != "1d":
+            next_hour = now.replace(minute=0, second=0, microsecond=0) + timedelta(hours=1)
+            return (next_hour + timedelta(minutes=1) - now).total_seconds()
+
+        # Chạy mỗi ngày vào 7h sáng UTC
+        today_7am = datetime(year=now.year, month=now.month, day=now.day, hour=7)
+        # Nếu hiện tại chưa qua 7h sáng hôm nay thì chạy hôm nay
+        next_run = today_7am if now < today_7am else today_7am + timedelta(days=1)
+        return (next_run - now).total_seconds()
+
+    def run_daily_once(self):
+        """Fetch and upsert the latest candles once; True when something was written"""
+        docs = self._fetch_daily_data()
+        if not docs:
+            self.logger.debug(f"No daily doc fetched this cycle for {self.symbol}")
+            return False
+        return self._insert_daily_doc(docs)
+
     def _run_daily_loop(self):
         """Logic chạy định kỳ 24h như realtime extractor cũ"""
         self.logger.info("Historical daily extractor loop started")
-        
+
         # Chạy ngay lần đầu
         try:
-            doc = self._fetch_daily_data()
-            if doc:
-                self._insert_daily_doc(doc)
-            else:
-                self.logger.debug("No daily doc fetched on initial run")
+            self.run_daily_once()
         except Exception as e:
             self.logger.error(f"Error on initial daily fetch: {e}")
 
         while self.running:
             try:
-                # Chạy mỗi ngày vào 7h sáng UTC
-                now = datetime.utcnow()
-                
-                # Tính thời gian đến 7h sáng ngày mai
-                tomorrow_7am = datetime(
-                    year=now.year, 
-                    month=now.month, 
-                    day=now.day,
-                    hour=7,
-                    minute=0,
-                    second=0
-                ) + timedelta(days=1)
-                
-                # Nếu hiện tại chưa qua 7h sáng hôm nay thì chạy hôm nay
-                today_7am = datetime(
-                    year=now.year, 
-                    month=now.month, 
-                    day=now.day,
-                    hour=7,
-                    minute=0,
-                    second=0
-                )
-                
-                if now < today_7am:
-                    next_run = today_7am
-                else:
-                    next_run = tomorrow_7am
-                
-                seconds_to_sleep = (next_run - now).total_seconds()
-                self.logger.info(f"Sleeping until next 7AM UTC ({seconds_to_sleep:.0f}s)")
+                seconds_to_sleep = self.seconds_until_next_run()
+                self.logger.info(f"Sleeping until next run ({seconds_to_sleep:.0f}s)")
                 time.sleep(max(0, seconds_to_sleep))
 
                 if not self.running:
                     break
 
-                doc = self._fetch_daily_data()
-                if doc:
-                    self._insert_daily_doc(doc)
-                else:
-                    self.logger.debug("No daily doc fetched this cycle")
-                    
+                self.run_daily_once()
+
             except Exception as e:
                 self.logger.error(f"Error in daily loop: {e}")
 
@@ -6,214 +6,438 @@ from datetime import datetime, timedelta
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
-import pandas as pd
-
+from src.cache.recent_bars import RecentBars
 from src.configs.config_mongo import MongoDBConfig
-from src.configs.config_variable import DATA_CRAWL_CONFIG, EXTRACT_CONFIG
+from src.configs.config_schema import (
+    F_CLOSE,
+    F_HIGH,
+    F_INDICATORS,
+    F_INTERVAL,
+    F_LOW,
+    F_OPEN,
+    F_SOURCE,
+    F_SYMBOL,
+    F_TIME,
+    F_UPDATED,
+    F_VERSION,
+    F_VOLUME,
+    SCHEMA_VERSION,
+    bar_doc,
+    doc_ms,
+    ensure_bar_indexes,
+)
+from src.configs.config_variable import (
+    DATA_CRAWL_CONFIG,
+    EXTRACT_CONFIG,
+    INDICATOR_CONFIG,
+    PUBLISH_CONFIG,
+    RECENT_BARS_CONFIG,
+)
+from src.extract.poll_cadence import AdaptiveCadence
+from src.indicators.streaming import StreamingIndicators
 from src.log.logger_setup import LoggerSetup
+from src.metrics.freshness import FreshnessTracker
+from src.metrics.stage_stats import StageStats
+from src.publish.bar_bus import BarBus
+from src.quality.quarantine import Quarantine
+from src.quality.validator import BarValidator
+from src.storage.base import BarWrite, upsert_write
+from src.storage.write_coordinator import WriteCoordinator
 from src.tele_bot.tele_message import TelegramMonitor
+from src.upstream.hedged_fetcher import HedgedFetcher
+from src.upstream.rate_limiter import CircuitOpenError, backoff_delay
+from src.upstream.tradingview_client import TradingViewClient
+from src.upstream.tv_bars import Bar
+
+DAY_MS = 24 * 60 * 60 * 1000
+MINUTE_MS = 60 * 1000
+
+
+def fetched_bar_doc(symbol: str, interval: str, bar: Bar):
+    """Schema v2 doc of one fetched bar, tagged with the source that served it"""
+    doc = bar_doc(symbol, interval, bar.ts_ms, bar.open, bar.high, bar.low, bar.close, bar.volume)
+    if bar.src is not None:
+        doc[F_SOURCE] = bar.src
+    return doc
 
 
 class ExtractBTCDominanceRealtime:
-    def __init__(self, poll_interval_seconds: int = 30):
+    def __init__(
+        self,
+        poll_interval_seconds: int = 30,
+        symbol: str = None,
+        sink=None,
+        exchange: str = None,
+        telegram_monitor: TelegramMonitor = None,
+        use_mongo: bool = True,
+    ):
         # Default: run every 30 seconds for realtime data
         self.logger = LoggerSetup.logger_setup("ExtractBTCDominanceRealtime")
-        self.mongo_client = MongoDBConfig.get_client()
         self.db_name = DATA_CRAWL_CONFIG.get("db")
-        
-        # Sử dụng cùng collection với historical data
         self.collection_name = DATA_CRAWL_CONFIG.get("collection")  # raw_btc_dominance
-        self.collection = self.mongo_client.get_database(self.db_name).get_collection(
-            self.collection_name
-        )
+        # use_mongo=False (replay vào sink nhúng): không kết nối Mongo, state bắt đầu rỗng
+        self.mongo_client = None
+        self.collection = None
+        self.minute_collection = None
+        if use_mongo:
+            self.mongo_client = MongoDBConfig.get_client("realtime")
+            # Sử dụng cùng collection với historical data
+            self.collection = self.mongo_client.get_database(self.db_name).get_collection(
+                self.collection_name
+            )
+            # Lưu từng nến 1 phút để job gap repair có thể audit
+            self.minute_collection = self.mongo_client.get_database(
+                self.db_name
+            ).get_collection(DATA_CRAWL_CONFIG.get("minute_collection"))
+            ensure_bar_indexes(self.collection)
+            ensure_bar_indexes(self.minute_collection)
+        # Ghi qua write coordinator dùng chung với historical extractor (field ownership,
+        # không ghi đè lẫn nhau); sink truyền vào (replay) thì ghi thẳng. Đọc warm-up vẫn từ Mongo
+        self.sink = sink or WriteCoordinator().for_source("realtime")
 
-        self.symbol = DATA_CRAWL_CONFIG.get("symbol", "BTC.D")
+        self.symbol = symbol or DATA_CRAWL_CONFIG.get("symbol", "BTC.D")
+        self.exchange = exchange or "CRYPTOCAP"
+        self.tv_client = TradingViewClient()
+        # TradingView là nguồn chính; chậm quá p95 thì hỏi thêm nguồn phụ (hedged request)
+        self.fetcher = HedgedFetcher()
+        # Độ trễ bar close -> fetch -> commit (p50/p95/p99 theo symbol)
+        self.freshness = FreshnessTracker()
+        # Thống kê từng stage của một poll (fetch -> normalize -> monitor); stage write nằm ở coordinator
+        self.started_at = time.perf_counter()
+        self.fetch_stats = StageStats()
+        self.normalize_stats = StageStats()
+        self.monitor_stats = StageStats()
+        # Khi dùng change stream thì Mongo tự phát bar, không publish từ đây nữa
+        self.bar_bus = BarBus() if PUBLISH_CONFIG.get("source", "bus") == "bus" else None
 
         # Sử dụng interval 30 giây cho realtime
         self.poll_interval_seconds = poll_interval_seconds
         self.running = False
         self.thread = None
+        self.consecutive_errors = 0
+        # Thời điểm nến 1 phút cuối cùng đã ghi xong; dùng để fetch bù khi resume
+        self.catchup_max_bars = EXTRACT_CONFIG.get("catchup_max_bars", 5000)
+        self.last_committed_ms = self._load_last_committed()
+
+        # Cửa sổ nến gần nhất trong RAM, dùng chung cho monitor/alert
+        self.recent_bars = RecentBars(self.symbol)
+        if use_mongo and RECENT_BARS_CONFIG.get("warm_load", True) and len(self.recent_bars) == 0:
+            self.recent_bars.warm_load(
+                self.minute_collection, {F_SYMBOL: self.symbol, F_INTERVAL: "1m"}
+            )
+
+        # Indicator tính O(1) trên mỗi nến 1 phút, lưu cạnh nến dưới field "ind"
+        self.indicators = None
+        if INDICATOR_CONFIG.get("enabled") and INDICATOR_CONFIG.get("interval") == "1m":
+            self.indicators = StreamingIndicators(INDICATOR_CONFIG)
+            if use_mongo:
+                self._warm_up_indicators()
         
-        # Initialize Telegram Monitor for data checking
-        self.telegram_monitor = TelegramMonitor()
+        # Mỗi tick được kiểm tra với cửa sổ nến gần nhất trong RAM trước khi ghi
+        self.validator = BarValidator(symbol=self.symbol)
+        self.quarantine = Quarantine(profile="realtime") if use_mongo else None
 
-    def _fetch_realtime_data(self):
-        # Lấy dữ liệu realtime để update vào ngày hiện tại
+        # Initialize Telegram Monitor for data checking. Alert rules and freshness checks
+        # are set up for the main symbol; other symbols only get a monitor passed in
+        if telegram_monitor is None and self.symbol == DATA_CRAWL_CONFIG.get("symbol", "BTC.D"):
+            telegram_monitor = TelegramMonitor()
+        self.telegram_monitor = telegram_monitor
+
+        # Nhịp poll thích ứng: nhanh khi thị trường biến động / gần ngưỡng alert, chậm khi đi ngang
+        self.cadence = AdaptiveCadence(
+            base_seconds=poll_interval_seconds,
+            rules_engine=telegram_monitor.rules_engine if telegram_monitor is not None else None,
+        )
+
+    def _load_last_committed(self):
+        """Time (epoch ms) of the newest stored minute bar, None if the series is empty"""
+        if self.minute_collection is None:
+            return None
         try:
-            from tvDatafeed import TvDatafeed, Interval
+            doc = self.minute_collection.find_one(
+                {F_SYMBOL: self.symbol, F_INTERVAL: "1m"},
+                {"_id": 0, F_TIME: 1},
+                sort=[(F_TIME, -1)],
+            )
+            return doc_ms(doc) if doc else None
+        except Exception as e:
+            self.logger.error(f"Failed to load last committed minute bar: {e}")
+            return None
 
-            tv = TvDatafeed()
-            # Lấy dữ liệu 1 phút gần nhất cho realtime update
-            df = tv.get_hist(
+    def _mark_committed(self, ts_ms: int):
+        if self.last_committed_ms is None or ts_ms > self.last_committed_ms:
+            self.last_committed_ms = ts_ms
+
+    def _bars_to_fetch(self, now_ms: int = None):
+        """
+        n_bars for the next poll: the open minute plus every minute since the last
+        committed bar, which is re-fetched too so its final values overwrite the partial ones
+        """
+        if self.last_committed_ms is None:
+            return 1
+        now_ms = int(time.time() * 1000) if now_ms is None else now_ms
+        current_minute = now_ms - now_ms % MINUTE_MS
+        missing = (current_minute - self.last_committed_ms) // MINUTE_MS
+        n_bars = max(1, missing + 1)
+        if n_bars > self.catchup_max_bars:
+            # Phần cũ hơn để job gap repair xử lý
+            self.logger.warning(
+                f"Realtime gap of {missing} minutes exceeds catchup_max_bars, "
+                f"fetching the latest {self.catchup_max_bars}"
+            )
+            n_bars = self.catchup_max_bars
+        return n_bars
+
+    def _fetch_realtime_batch(self):
+        """
+        Minute bars (Bar tuples) not committed yet, oldest first. Steady state this is the
+        open minute (plus the previous one right after it closes); after a pause or outage
+        it is the whole missed span, fetched in one request.
+        """
+        try:
+            from tvDatafeed import Interval
+
+            # Payload parse thẳng ra Bar, không dựng DataFrame cho mỗi tick
+            bars = self.fetcher.get_bars(
                 symbol=self.symbol,
-                exchange="CRYPTOCAP",
+                exchange=self.exchange,
                 interval=Interval.in_1_minute,
-                n_bars=1,
+                n_bars=self._bars_to_fetch(),
             )
 
-            if df is None or len(df) == 0:
+            if not bars:
                 self.logger.debug("No realtime data available")
-                return None
+                return []
 
-            # Lấy data point mới nhất
-            last_idx = df.index[-1]
-            last_row = df.iloc[-1]
-
-            if hasattr(last_idx, "to_pydatetime"):
-                dt = last_idx.to_pydatetime()
-            else:
-                dt = pd.to_datetime(last_idx).to_pydatetime()
-
-            # Tạo datetime cho ngày hiện tại (bỏ giờ phút giây)
-            today = datetime.utcnow().date()
-            today_datetime = datetime.combine(today, datetime.min.time())
-            
-            realtime_data = {
-                "current_open": (
-                    float(last_row.get("open", last_row.get("Open", None)))
-                    if pd.notnull(last_row.get("open", last_row.get("Open", None)))
-                    else None
-                ),
-                "current_high": (
-                    float(last_row.get("high", last_row.get("High", None)))
-                    if pd.notnull(last_row.get("high", last_row.get("High", None)))
-                    else None
-                ),
-                "current_low": (
-                    float(last_row.get("low", last_row.get("Low", None)))
-                    if pd.notnull(last_row.get("low", last_row.get("Low", None)))
-                    else None
-                ),
-                "current_close": (
-                    float(last_row.get("close", last_row.get("Close", None)))
-                    if pd.notnull(last_row.get("close", last_row.get("Close", None)))
-                    else None
-                ),
-                "current_volume": (
-                    float(last_row.get("volume", last_row.get("Volume", None)))
-                    if pd.notnull(last_row.get("volume", last_row.get("Volume", None)))
-                    else None
-                ),
-                "last_update": datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S"),
-                "today_date": today_datetime.strftime("%Y-%m-%d"),  # Chỉ ngày, không có giờ
-                "today_timestamp_ms": int(today_datetime.timestamp() * 1000)
-            }
-
-            return realtime_data
+            fetched_ms = int(time.time() * 1000)
+            if self.last_committed_ms is not None:
+                bars = [bar for bar in bars if bar.ts_ms >= self.last_committed_ms]
+            bars = [bar._replace(fetched_ms=fetched_ms) for bar in bars]
+            if len(bars) > 2:
+                self.logger.info(f"Catching up {len(bars)} minute bars since last committed bar")
+            return bars
 
+        except CircuitOpenError:
+            # Let the loop back off until the breaker allows a probe
+            raise
         except Exception as e:
             self.logger.error(f"Error fetching realtime data via tvDatafeed: {e}")
-            return None
+            return []
 
-    def _update_today_document(self, realtime_data: dict):
-        """Update document của ngày hôm nay với dữ liệu realtime"""
-        if not realtime_data:
-            return False
-            
+    def _fetch_realtime_data(self):
+        # Lấy nến 1 phút mới nhất để update vào ngày hiện tại
+        batch = self._fetch_realtime_batch()
+        return batch[-1] if batch else None
+
+    def _warm_up_indicators(self):
         try:
-            today_date = realtime_data["today_date"]  # Format: "2025-09-23"
-            today_timestamp_ms = realtime_data["today_timestamp_ms"]
-            
-            # Tìm document của ngày hôm nay theo datetime field
-            today_doc = self.collection.find_one({"datetime": today_date})
-            
-            if today_doc:
-                # Document ngày hôm nay đã tồn tại, update realtime data
-                update_fields = {
-                    "current_open": realtime_data["current_open"],
-                    "current_high": realtime_data["current_high"], 
-                    "current_low": realtime_data["current_low"],
-                    "current_close": realtime_data["current_close"],
-                    "current_volume": realtime_data["current_volume"],
-                    "last_update": realtime_data["last_update"]
-                }
-                
-                # Update TẤT CẢ historical fields với dữ liệu realtime hiện tại
-                # Không có điều kiện gì - luôn update toàn bộ OHLCV
-                
-                if realtime_data["current_open"]:
-                    update_fields["open"] = realtime_data["current_open"]
-                
-                if realtime_data["current_high"]:
-                    update_fields["high"] = realtime_data["current_high"]
-                
-                if realtime_data["current_low"]:
-                    update_fields["low"] = realtime_data["current_low"]
-                
-                if realtime_data["current_close"]:
-                    update_fields["close"] = realtime_data["current_close"]
-                
-                if realtime_data["current_volume"]:
-                    update_fields["volume"] = realtime_data["current_volume"]
-                
-                self.collection.update_one(
-                    {"datetime": today_date},  # Tìm theo datetime thay vì timestamp_ms
-                    {"$set": update_fields}
+            warmup = INDICATOR_CONFIG.get("warmup_bars", 1000)
+            recent = list(
+                self.minute_collection.find(
+                    {F_SYMBOL: self.symbol, F_INTERVAL: "1m", F_CLOSE: {"$ne": None}},
+                    {"_id": 0, F_TIME: 1, F_CLOSE: 1},
                 )
-                
-                self.logger.info(f"Updated today's document with realtime data: C={realtime_data['current_close']:.4f}")
-                return True
-                
+                .sort(F_TIME, -1)
+                .limit(warmup)
+            )
+            for doc in reversed(recent):
+                self.indicators.update(doc_ms(doc), doc[F_CLOSE])
+            self.logger.info(f"Warmed up streaming indicators with {len(recent)} bars")
+        except Exception as e:
+            self.logger.error(f"Failed to warm up indicators: {e}")
+
+    def _build_minute_doc(self, bar: Bar):
+        """Nến 1 phút (schema v2) kèm indicator, và đưa vào cửa sổ RAM"""
+        ts_ms = bar.ts_ms
+        doc = fetched_bar_doc(self.symbol, "1m", bar)
+        if self.indicators is not None:
+            doc[F_INDICATORS] = self.indicators.update(ts_ms, bar.close)
+        self.cadence.observe(ts_ms, bar.close)
+        self.recent_bars.append(ts_ms, bar.open, bar.high, bar.low, bar.close, bar.volume)
+        return doc
+
+    def _is_secondary(self, bar: Bar):
+        """Bar served by the hedge source: a flat o=h=l=c snapshot without volume"""
+        return bar.src is not None and bar.src != self.fetcher.primary.name
+
+    def _build_today_update(self, bar: Bar):
+        """
+        BarWrite folding one minute bar into its daily candle (UTC); upsert by key (s, i, t),
+        no find_one. Open is kept from the first minute and high/low only widen, so
+        replaying a span of minute bars (catch-up) builds the same candle as live polling.
+        A secondary-source bar only fills a candle that does not exist yet.
+        """
+        day_ms = bar.ts_ms - bar.ts_ms % DAY_MS
+        if self._is_secondary(bar):
+            fields = {F_OPEN: bar.open, F_HIGH: bar.high, F_LOW: bar.low, F_CLOSE: bar.close, F_SOURCE: bar.src}
+            fields = {field: value for field, value in fields.items() if value is not None}
+            fields[F_VERSION] = SCHEMA_VERSION
+            return BarWrite(self.symbol, "1d", day_ms, {"$setOnInsert": fields})
+
+        update = {
+            "$set": {F_UPDATED: datetime.utcnow()},
+            "$setOnInsert": {F_VERSION: SCHEMA_VERSION},
+        }
+        if bar.open is not None:
+            update["$setOnInsert"][F_OPEN] = bar.open
+        if bar.high is not None:
+            update["$max"] = {F_HIGH: bar.high}
+        if bar.low is not None:
+            update["$min"] = {F_LOW: bar.low}
+        if bar.close is not None:
+            update["$set"][F_CLOSE] = bar.close
+        if bar.volume is not None:
+            update["$set"][F_VOLUME] = bar.volume
+        if bar.src is not None:
+            update["$set"][F_SOURCE] = bar.src
+        return BarWrite(self.symbol, "1d", day_ms, update)
+
+    def _publish_bar(self, doc: dict):
+        if self.bar_bus is not None:
+            self.bar_bus.publish(doc)
+
+    def _on_minute_committed(self, bar: Bar, doc: dict):
+        self._mark_committed(bar.ts_ms)
+        self.freshness.record(self.symbol, bar.ts_ms, bar.fetched_ms, int(time.time() * 1000))
+        self._publish_bar(doc)
+
+    def _upsert_minute_bar(self, bar: Bar):
+        """Lưu nến 1 phút vừa fetch vào minute collection"""
+        try:
+            doc = self._build_minute_doc(bar)
+            if self._is_secondary(bar):
+                # Nến phẳng của nguồn phụ chỉ lấp phút còn trống, không ghi đè OHLCV của nguồn chính;
+                # lần poll sau nguồn chính fetch lại phút này và ghi đè bằng $set
+                write = BarWrite(self.symbol, "1m", bar.ts_ms, {"$setOnInsert": doc})
             else:
-                # Chưa có document ngày hôm nay, tạo mới với dữ liệu realtime
-                new_doc = {
-                    "datetime": realtime_data["today_date"],  # Chỉ ngày: 2025-09-23
-                    "timestamp_ms": today_timestamp_ms,
-                    "open": realtime_data["current_open"],
-                    "high": realtime_data["current_high"],
-                    "low": realtime_data["current_low"], 
-                    "close": realtime_data["current_close"],
-                    "volume": realtime_data["current_volume"],
-                    "current_open": realtime_data["current_open"],
-                    "current_high": realtime_data["current_high"],
-                    "current_low": realtime_data["current_low"],
-                    "current_close": realtime_data["current_close"],
-                    "current_volume": realtime_data["current_volume"],
-                    "last_update": realtime_data["last_update"]
-                }
-                
-                self.collection.insert_one(new_doc)
-                self.logger.info(f"Created today's document with realtime data: C={realtime_data['current_close']:.4f}")
-                return True
-                
+                write = upsert_write(doc)
+            # Coordinator gom ghi theo batch: freshness/publish chỉ chạy khi nến đã thực sự ghi xong
+            # last_committed_ms chỉ tiến lên sau khi flush xong, nên poll sau vẫn fetch lại nến chưa ghi
+            self.sink.submit([write], on_commit=lambda: self._on_minute_committed(bar, doc))
+            return True
+        except Exception as e:
+            self.logger.error(f"Failed to upsert minute bar: {e}")
+            return False
+
+    def _reject_reasons(self, bar: Bar):
+        """Data-quality reasons to drop this tick (empty list = valid)"""
+        return self.validator.check_bar(bar, self.recent_bars)
+
+    def _quarantine_bar(self, bar: Bar, reasons: list):
+        if self.quarantine is None:
+            self.logger.warning(f"Rejected {self.symbol} bar t={bar.ts_ms}: {reasons}")
+            return
+        self.quarantine.put_bar(self.symbol, "1m", bar, reasons, "realtime")
+
+    def _handle_realtime_data(self, bar: Bar, catchup: bool = False):
+        started = time.perf_counter()
+        reasons = self._reject_reasons(bar)
+        if reasons:
+            self.normalize_stats.dropped += 1
+            self._quarantine_bar(bar, reasons)
+            return False
+        if not self._upsert_minute_bar(bar):
+            self.normalize_stats.errors += 1
+        success = self._update_today_document(bar)
+        self.normalize_stats.record(time.perf_counter() - started)
+
+        # Nến bù (catch-up) chỉ được ghi, không chạy alert rules
+        monitor = None if catchup else self.telegram_monitor
+        if monitor is not None:
+            started = time.perf_counter()
+            try:
+                monitor.evaluate_tick(bar.ts_ms, bar.close)
+                if success:
+                    monitor.check_data_after_realtime_extract()
+                self.monitor_stats.record(time.perf_counter() - started)
+            except Exception as e:
+                self.monitor_stats.errors += 1
+                self.logger.error(f"Error in realtime monitor checks ({self.symbol}): {e}")
+        return success
+
+    def _catchup_cutoff_ms(self, batch: list):
+        """
+        Bars older than this are catch-up (written only, no alerts): older than the last
+        committed minute, and never the open minute nor the one that just closed, so the
+        steady-state 2-bar answer is treated as live
+        """
+        live_from = batch[-1].ts_ms - MINUTE_MS
+        if self.last_committed_ms is None:
+            return live_from
+        return max(self.last_committed_ms, live_from)
+
+    def _handle_realtime_batch(self, batch: list):
+        # Oldest first: catch-up bars go through the same write path before the live ones
+        if not batch:
+            return
+        cutoff_ms = self._catchup_cutoff_ms(batch)
+        for bar in batch:
+            self._handle_realtime_data(bar, catchup=bar.ts_ms < cutoff_ms)
+
+    def _update_today_document(self, bar: Bar):
+        """Update document của ngày hôm nay với dữ liệu realtime"""
+        if not bar:
+            return False
+
+        try:
+            self.sink.write([self._build_today_update(bar)])
+            self.logger.debug(
+                f"Updated today's document with realtime data: C={bar.close:.4f} (src={bar.src})"
+            )
+            return True
+
         except Exception as e:
             self.logger.error(f"Failed to update today's document: {e}")
             return False
 
-    def _run_loop(self):
-        self.logger.info("Realtime extractor loop started (30s interval)")
-        
-        # Initial run
+    def poll_once(self):
+        """
+        One realtime poll: fetch and handle the uncommitted bars. Returns the seconds to
+        wait before the next poll (adaptive cadence, or backoff after errors), so the
+        own-thread loop and the multi-symbol crawl scheduler drive it the same way.
+        """
+        poll_started = time.time()
         try:
-            realtime_data = self._fetch_realtime_data()
-            if realtime_data:
-                success = self._update_today_document(realtime_data)
-                if success:
-                    self.telegram_monitor.check_data_after_realtime_extract()
+            fetch_started = time.perf_counter()
+            batch = self._fetch_realtime_batch()
+            self.fetch_stats.record(time.perf_counter() - fetch_started, max(1, len(batch)))
+            if batch:
+                self._handle_realtime_batch(batch)
             else:
-                self.logger.debug("No realtime data fetched on initial run")
+                self.logger.debug(f"No realtime data fetched this cycle for {self.symbol}")
+            self.consecutive_errors = 0
+            # Chờ tới lần poll kế tiếp theo nhịp thích ứng (căn theo lúc đóng nến phút)
+            return self.cadence.next_delay(poll_started)
+        except CircuitOpenError as e:
+            self.fetch_stats.dropped += 1
+            self.logger.warning(f"Realtime fetch skipped: {e}")
+            return self.tv_client.breaker.seconds_until_retry()
         except Exception as e:
-            self.logger.error(f"Error on initial realtime fetch: {e}")
+            self.fetch_stats.errors += 1
+            self.logger.error(f"Error in realtime loop ({self.symbol}): {e}")
+            # Back off exponentially (with jitter) on repeated errors
+            delay = backoff_delay(self.consecutive_errors, base=5, cap=300)
+            self.consecutive_errors += 1
+            return delay
+
+    def stage_stats(self):
+        """Per-stage throughput/latency of this symbol's polls (the write stage is the coordinator's)"""
+        uptime = time.perf_counter() - self.started_at
+        return {
+            "fetch": self.fetch_stats.as_dict(uptime),
+            "normalize": self.normalize_stats.as_dict(uptime),
+            "monitor": self.monitor_stats.as_dict(uptime),
+        }
+
+    def _run_loop(self):
+        self.logger.info(
+            f"Realtime extractor loop started ({self.poll_interval_seconds}s base interval, adaptive)"
+        )
 
+        # The first poll catches up on bars missed while stopped
         while self.running:
-            try:
-                # Sleep for 30 seconds between each fetch
-                time.sleep(self.poll_interval_seconds)
-
-                if not self.running:
-                    break
-
-                realtime_data = self._fetch_realtime_data()
-                if realtime_data:
-                    success = self._update_today_document(realtime_data)
-                    if success:
-                        self.telegram_monitor.check_data_after_realtime_extract()
-                else:
-                    self.logger.debug("No realtime data fetched this cycle")
-            except Exception as e:
-                self.logger.error(f"Error in realtime loop: {e}")
-                # Sleep a bit on error to avoid rapid retries
-                time.sleep(5)
+            delay = self.poll_once()
+            time.sleep(delay)
 
         self.logger.info("Realtime extractor loop stopped")
 
@@ -229,6 +453,7 @@ class ExtractBTCDominanceRealtime:
 
     def stop(self):
         self.running = False
+        self.sink.flush()
         if self.thread and self.thread.is_alive():
             self.thread.join(timeout=2)
         self.logger.info("Realtime extractor stopped")
@@ -0,0 +1,146 @@
+import math
+import os
+import sys
+import threading
+import time
+from collections import deque
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from src.configs.config_variable import REALTIME_CADENCE_CONFIG
+from src.log.logger_setup import LoggerSetup
+
+MINUTE_SECONDS = 60
+
+
+class AdaptiveCadence:
+    """
+    Poll cadence of the realtime extractor, adapted to the market:
+
+      fast: recent bar-to-bar moves are large, or an alert rule is close to firing
+      base: the configured poll interval
+      flat: dominance barely moved for a while -> back off to the slowest interval
+
+    Polls are aligned to minute-bar close + close_offset_seconds; intervals under a
+    minute are rounded so they divide the minute evenly, longer ones to whole minutes.
+    """
+
+    def __init__(self, base_seconds: float = None, rules_engine=None, config: dict = None):
+        self.logger = LoggerSetup.logger_setup("AdaptiveCadence")
+        config = config or REALTIME_CADENCE_CONFIG
+        self.enabled = config.get("enabled", True)
+        self.base_seconds = float(base_seconds or config.get("base_seconds", 30))
+        self.fast_seconds = float(config.get("fast_seconds", 5))
+        self.flat_seconds = float(config.get("flat_seconds", 60))
+        self.align = config.get("align_to_minute", True)
+        self.close_offset = float(config.get("close_offset_seconds", 2))
+        self.fast_move_pct = config.get("fast_move_pct", 0.02)
+        self.flat_move_pct = config.get("flat_move_pct", 0.003)
+        self.rule_proximity_pct = config.get("rule_proximity_pct", 0.05)
+        self.rules_engine = rules_engine
+
+        # |close change| in % between consecutive minute bars
+        self._moves = deque(maxlen=config.get("move_window_bars", 5))
+        self._bar_ts = None
+        self._bar_close = None
+        self._prev_close = None
+        self.mode = "base"
+        self.reason = "start"
+
+        # Poll times for the effective rate
+        self._polls = deque(maxlen=config.get("rate_window_polls", 120))
+        self._lock = threading.Lock()
+
+    def observe(self, ts_ms: int, close: float):
+        """Feed every fetched minute bar (repeated ticks of one bar revise it)"""
+        if close is None:
+            return
+        with self._lock:
+            if ts_ms != self._bar_ts:
+                if self._bar_ts is not None and ts_ms < self._bar_ts:
+                    return
+                # The previous bar is final: its close becomes the reference
+                if self._bar_close is not None:
+                    if self._prev_close:
+                        self._moves.append(abs(self._bar_close - self._prev_close) / self._prev_close * 100)
+                    self._prev_close = self._bar_close
+                self._bar_ts = ts_ms
+            self._bar_close = float(close)
+
+    def _rule_demand(self):
+        if self.rules_engine is None or self._bar_close is None:
+            return False
+        try:
+            distance = self.rules_engine.proximity_pct(self._bar_close, self._bar_ts)
+        except Exception:
+            # Rule state is updated on another thread; skip this round
+            return False
+        return distance is not None and distance <= self.rule_proximity_pct
+
+    def interval_seconds(self):
+        """Current target interval between polls and update mode/reason"""
+        if not self.enabled:
+            return self.base_seconds
+        with self._lock:
+            moves = list(self._moves)
+            live_move = None
+            if self._prev_close and self._bar_close is not None:
+                live_move = abs(self._bar_close - self._prev_close) / self._prev_close * 100
+
+        if live_move is not None and live_move >= self.fast_move_pct:
+            mode, reason = "fast", f"bar move {live_move:.4f}%"
+        elif moves and sum(moves) / len(moves) >= self.fast_move_pct:
+            mode, reason = "fast", f"avg move {sum(moves) / len(moves):.4f}%"
+        elif self._rule_demand():
+            mode, reason = "fast", "alert rule close to firing"
+        elif len(moves) == self._moves.maxlen and max(moves) < self.flat_move_pct:
+            mode, reason = "flat", f"max move {max(moves):.4f}% over {len(moves)} bars"
+        else:
+            mode, reason = "base", "normal"
+
+        if mode != self.mode:
+            self.logger.info(f"Realtime cadence {self.mode} -> {mode} ({reason})")
+        self.mode, self.reason = mode, reason
+        return self._mode_seconds(mode)
+
+    def _mode_seconds(self, mode: str):
+        return {"fast": self.fast_seconds, "base": self.base_seconds, "flat": self.flat_seconds}[mode]
+
+    def _step(self, interval: float):
+        if not self.align:
+            return interval
+        if interval < MINUTE_SECONDS:
+            # 60 / n so polls land on the same offsets every minute
+            return MINUTE_SECONDS / math.ceil(MINUTE_SECONDS / max(interval, 1.0))
+        return MINUTE_SECONDS * max(1, round(interval / MINUTE_SECONDS))
+
+    def next_delay(self, poll_started: float = None):
+        """Seconds to sleep until the next poll; records a poll started at `poll_started` (epoch s)"""
+        now = time.time()
+        poll_started = now if poll_started is None else poll_started
+        self._polls.append(poll_started)
+        step = self._step(self.interval_seconds())
+        if self.align:
+            # Next point on the grid offset + k * step (k integer) after the poll started
+            due = math.floor((poll_started - self.close_offset) / step) * step + self.close_offset + step
+        else:
+            due = poll_started + step
+        # Fetch latency is taken out of the sleep
+        return max(0.0, due - now)
+
+    def effective_interval_seconds(self):
+        """Mean spacing of the recent polls (None until two polls happened)"""
+        polls = self._polls
+        if len(polls) < 2:
+            return None
+        return (polls[-1] - polls[0]) / (len(polls) - 1)
+
+    def stats(self):
+        effective = self.effective_interval_seconds()
+        return {
+            "mode": self.mode,
+            "reason": self.reason,
+            "target_seconds": self._step(self._mode_seconds(self.mode)),
+            "effective_seconds": effective,
+            "polls_per_minute": MINUTE_SECONDS / effective if effective else None,
+        }
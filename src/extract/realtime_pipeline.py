@@ -0,0 +1,303 @@
+import asyncio
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from src.configs.config_variable import REALTIME_PIPELINE_CONFIG
+from src.log.logger_setup import LoggerSetup
+from src.metrics.stage_stats import StageStats
+from src.storage.base import merge_updates, upsert_write
+
+
+class RealtimePipeline:
+    """
+    asyncio pipeline replaying recorded bars through the realtime extractor's code paths
+    (see replay_source.py):
+
+        source -> raw queue -> normalize -> write queue -> batched writer
+                                   \\-> monitor queue (alert rules, freshness check)
+
+    Blocking calls (sink writes, monitor) run on a small thread pool, so a slow sink flush
+    never holds back the source. Queues are bounded: a full raw or write queue slows the
+    source down, a full monitor queue drops its oldest item (the newest tick wins).
+    Live polls do not use it: they run as crawl scheduler jobs (poll_once), which record the
+    same fetch/normalize/monitor stage stats, and the write coordinator records the write stage.
+    """
+
+    def __init__(self, extractor, config: dict = None, clock=None):
+        self.logger = LoggerSetup.logger_setup("RealtimePipeline")
+        self.extractor = extractor
+        # Virtual clock of a replay (ReplayClock): stamps fetch/commit times for freshness
+        self.clock = clock
+        config = config or REALTIME_PIPELINE_CONFIG
+        self.queue_size = config.get("queue_size", 64)
+        self.write_batch_size = config.get("write_batch_size", 50)
+        self.flush_interval = config.get("flush_interval_seconds", 1.0)
+        self.stats_log_seconds = config.get("stats_log_seconds", 300)
+
+        self.loop = None
+        self.running = False
+        self._stop_event = None
+        self._executor = None
+        self.raw_queue = None
+        self.write_queue = None
+        self.monitor_queue = None
+
+        self.started_at = None
+        self.fetch_stats = StageStats()
+        self.normalize_stats = StageStats()
+        self.write_stats = StageStats()
+        self.monitor_stats = StageStats()
+        # fetch -> committed to the sink
+        self.e2e_stats = StageStats(sample_size=config.get("latency_samples", 100000))
+        self.flushes = 0
+
+    # ---- helpers ----
+
+    def _put_latest(self, queue: asyncio.Queue, item, stats: StageStats):
+        if queue.full():
+            queue.get_nowait()
+            queue.task_done()
+            stats.dropped += 1
+        queue.put_nowait(item)
+
+    async def _blocking(self, fn, *args):
+        return await self.loop.run_in_executor(self._executor, fn, *args)
+
+    async def _sleep(self, seconds: float):
+        # Wakes up early on stop
+        try:
+            await asyncio.wait_for(self._stop_event.wait(), timeout=max(0.0, seconds))
+        except asyncio.TimeoutError:
+            pass
+
+    # ---- stages ----
+
+    async def _replay(self, source):
+        """Feed recorded rows instead of polling; paced by source.speed (None = as fast as possible)"""
+        started = time.perf_counter()
+        first_ts = None
+        bars = iter(source.rows())
+        while self.running:
+            read_at = time.perf_counter()
+            bar = next(bars, None)
+            if bar is None:
+                break
+            self.fetch_stats.record(time.perf_counter() - read_at)
+            if source.speed:
+                first_ts = bar.ts_ms if first_ts is None else first_ts
+                due = started + (bar.ts_ms - first_ts) / 1000 / source.speed
+                delay = due - time.perf_counter()
+                if delay > 0:
+                    await self._sleep(delay)
+            fetched_at = time.perf_counter()
+            if self.clock is not None:
+                bar = bar._replace(fetched_ms=self.clock.fetched_ms(bar))
+            # Replay never drops: a full queue slows the source down instead
+            await self.raw_queue.put((bar, False, fetched_at))
+        self.logger.info(f"Replay source exhausted after {self.fetch_stats.count} rows")
+        self._stop_event.set()
+
+    async def _normalize(self):
+        extractor = self.extractor
+        while True:
+            bar, catchup, fetched_at = await self.raw_queue.get()
+            started = time.perf_counter()
+            try:
+                reasons = extractor._reject_reasons(bar)
+                if reasons:
+                    self.normalize_stats.dropped += 1
+                    await self._blocking(extractor._quarantine_bar, bar, reasons)
+                    continue
+                minute_doc = extractor._build_minute_doc(bar)
+                # Writes are never dropped: a full write queue blocks here and the
+                # backpressure lands on the raw queue instead
+                await self.write_queue.put((upsert_write(minute_doc), minute_doc, fetched_at, bar.fetched_ms))
+                await self.write_queue.put((extractor._build_today_update(bar), None, fetched_at, None))
+                if not catchup:
+                    self._put_latest(self.monitor_queue, ("tick", bar.ts_ms, bar.close), self.monitor_stats)
+                self.normalize_stats.record(time.perf_counter() - started)
+            except Exception as e:
+                self.normalize_stats.errors += 1
+                self.logger.error(f"Error normalizing realtime data: {e}")
+            finally:
+                self.raw_queue.task_done()
+
+    def _coalesce(self, pending: dict, item):
+        write, publish_doc, fetched_at, fetched_ms = item
+        slot = (write.symbol, write.interval, write.ts_ms)
+        previous = pending.get(slot)
+        if previous is not None:
+            # Same bar written twice in one batch: merged per operator, one op is sent
+            write = write._replace(update=merge_updates(previous[0].update, write.update))
+            fetched_at = min(fetched_at, previous[2])
+            publish_doc = publish_doc or previous[1]
+            # Freshness of the bar is its first fetch after closing
+            if previous[3] is not None:
+                fetched_ms = previous[3] if fetched_ms is None else min(fetched_ms, previous[3])
+        pending[slot] = (write, publish_doc, fetched_at, fetched_ms)
+
+    def _bulk_write(self, pending: dict):
+        self.extractor.sink.write([write for write, _, _, _ in pending.values()])
+
+    async def _flush(self, pending: dict, items: int):
+        if not pending:
+            return
+        started = time.perf_counter()
+        try:
+            await self._blocking(self._bulk_write, pending)
+            finished = time.perf_counter()
+            self.write_stats.record(finished - started, len(pending))
+            self.flushes += 1
+            committed_ms = int(time.time() * 1000)
+            for write, publish_doc, fetched_at, fetched_ms in pending.values():
+                if write.interval == "1m":
+                    self.extractor._mark_committed(write.ts_ms)
+                    if self.clock is not None and fetched_ms is not None:
+                        committed_ms = self.clock.committed_ms(fetched_ms, fetched_at, finished)
+                    self.extractor.freshness.record(write.symbol, write.ts_ms, fetched_ms, committed_ms)
+                self.e2e_stats.record(finished - fetched_at)
+                if publish_doc is not None:
+                    # Only committed bars reach subscribers
+                    self.extractor._publish_bar(publish_doc)
+            self._put_latest(self.monitor_queue, ("committed",), self.monitor_stats)
+        except Exception as e:
+            self.write_stats.errors += 1
+            self.logger.error(f"Failed to flush {len(pending)} realtime ops: {e}")
+        finally:
+            pending.clear()
+            for _ in range(items):
+                self.write_queue.task_done()
+
+    async def _write(self):
+        pending = {}
+        items = 0
+        deadline = None
+        while True:
+            timeout = None if deadline is None else max(0.0, deadline - self.loop.time())
+            try:
+                item = await asyncio.wait_for(self.write_queue.get(), timeout=timeout)
+            except asyncio.TimeoutError:
+                await self._flush(pending, items)
+                items, deadline = 0, None
+                continue
+            self._coalesce(pending, item)
+            items += 1
+            if deadline is None:
+                deadline = self.loop.time() + self.flush_interval
+            if len(pending) >= self.write_batch_size:
+                await self._flush(pending, items)
+                items, deadline = 0, None
+
+    async def _monitor(self):
+        monitor = self.extractor.telegram_monitor
+        while True:
+            event = await self.monitor_queue.get()
+            started = time.perf_counter()
+            try:
+                if monitor is None:
+                    # Symbol without alert rules / freshness monitor
+                    pass
+                elif event[0] == "tick":
+                    await self._blocking(monitor.evaluate_tick, event[1], event[2])
+                else:
+                    await self._blocking(monitor.check_data_after_realtime_extract)
+                self.monitor_stats.record(time.perf_counter() - started)
+            except Exception as e:
+                self.monitor_stats.errors += 1
+                self.logger.error(f"Error in realtime monitor stage: {e}")
+            finally:
+                self.monitor_queue.task_done()
+
+    async def _log_stats(self):
+        while True:
+            await asyncio.sleep(self.stats_log_seconds)
+            self.logger.info(f"Realtime pipeline stats: {self.stats()}")
+
+    # ---- lifecycle ----
+
+    def stats(self):
+        uptime = time.perf_counter() - self.started_at if self.started_at else 0.0
+        depth = lambda q: q.qsize() if q is not None else 0
+        return {
+            "uptime_s": uptime,
+            "queue_depth": {
+                "raw": depth(self.raw_queue),
+                "write": depth(self.write_queue),
+                "monitor": depth(self.monitor_queue),
+            },
+            "fetch": self.fetch_stats.as_dict(uptime),
+            "normalize": self.normalize_stats.as_dict(uptime),
+            "write": self.write_stats.as_dict(uptime),
+            "monitor": self.monitor_stats.as_dict(uptime),
+            "end_to_end": self.e2e_stats.as_dict(uptime),
+            # Bar close -> fetch -> commit, per symbol
+            "freshness": self.extractor.freshness.stats(),
+            "cadence": self.extractor.cadence.stats(),
+            "sources": self.extractor.fetcher.stats(),
+            "flushes": self.flushes,
+        }
+
+    async def _main(self, source):
+        self._stop_event = asyncio.Event()
+        self.raw_queue = asyncio.Queue(maxsize=self.queue_size)
+        self.write_queue = asyncio.Queue(maxsize=self.queue_size)
+        self.monitor_queue = asyncio.Queue(maxsize=self.queue_size)
+
+        producer = asyncio.create_task(self._replay(source))
+        workers = [
+            asyncio.create_task(self._normalize()),
+            asyncio.create_task(self._write()),
+            asyncio.create_task(self._monitor()),
+            asyncio.create_task(self._log_stats()),
+        ]
+        await self._stop_event.wait()
+
+        # Stop reading, then let queued ticks reach the sink before tearing down.
+        # Stages drain in order: each one feeds the next.
+        producer.cancel()
+
+        async def drain():
+            await self.raw_queue.join()
+            await self.write_queue.join()
+            await self.monitor_queue.join()
+
+        try:
+            await asyncio.wait_for(drain(), timeout=self.flush_interval + 5)
+        except asyncio.TimeoutError:
+            self.logger.warning("Realtime pipeline stopped with unflushed writes")
+        for task in workers:
+            task.cancel()
+        await asyncio.gather(producer, *workers, return_exceptions=True)
+
+    def run(self, source):
+        """
+        Replay `source` (ReplaySource) on the calling thread; returns once it is drained
+        and every queued write reached the sink, or after stop().
+        """
+        self.running = True
+        self.started_at = time.perf_counter()
+        self._executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="realtime-pipeline")
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self.logger.info(
+            f"Realtime pipeline started (batch={self.write_batch_size}, flush={self.flush_interval}s)"
+        )
+        try:
+            self.loop.run_until_complete(self._main(source))
+        finally:
+            self.loop.close()
+            self._executor.shutdown(wait=False)
+            self.logger.info(f"Realtime pipeline stopped: {self.stats()}")
+
+    def stop(self):
+        self.running = False
+        if self.loop is not None and not self.loop.is_closed():
+            try:
+                self.loop.call_soon_threadsafe(self._stop_event.set)
+            except RuntimeError:
+                # Loop already closed
+                pass
@@ -0,0 +1,201 @@
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from src.configs.config_variable import (
+    ALERT_RULES_CONFIG,
+    DATA_CRAWL_CONFIG,
+    FRESHNESS_CONFIG,
+    REALTIME_PIPELINE_CONFIG,
+)
+from src.log.logger_setup import LoggerSetup
+from src.metrics.freshness import MINUTE_MS, FreshnessTracker
+from src.tele_bot.alert_rules import AlertRulesEngine
+from src.upstream.tv_bars import Bar
+
+
+def parse_speed(value: str):
+    """"1x" / "100" / "max" -> replay speed multiplier (None = as fast as possible)"""
+    value = str(value).strip().lower()
+    if value in ("max", "0", "inf"):
+        return None
+    return float(value.rstrip("x"))
+
+
+class ReplaySource:
+    """
+    Recorded minute bars (e.g. btc_dominance_ohlcv_1min_full.csv) replayed through the
+    realtime pipeline. Rows are read in chunks, so memory stays flat on long recordings.
+    """
+
+    def __init__(self, csv_path: str, speed: float = None, limit: int = None, chunk_rows: int = 10000):
+        self.csv_path = csv_path
+        self.speed = speed
+        self.limit = limit
+        self.chunk_rows = chunk_rows
+
+    def rows(self):
+        """Yield Bar tuples in file order (timestamps are read as UTC)"""
+        emitted = 0
+        for chunk in pd.read_csv(self.csv_path, chunksize=self.chunk_rows):
+            time_col = "datetime" if "datetime" in chunk.columns else chunk.columns[0]
+            stamps = pd.to_datetime(chunk[time_col])
+            ts_ms = (stamps - pd.Timestamp(0)) // pd.Timedelta(milliseconds=1)
+            columns = []
+            for name in ("open", "high", "low", "close", "volume"):
+                col = name if name in chunk.columns else name.capitalize()
+                # NaN -> None once per chunk, not per value
+                values = chunk[col].astype(object) if col in chunk.columns else pd.Series([None] * len(chunk))
+                columns.append(values.where(values.notna(), None).tolist())
+            for row in zip(ts_ms.tolist(), *columns):
+                if self.limit is not None and emitted >= self.limit:
+                    return
+                emitted += 1
+                yield Bar(*row)
+
+
+class ReplayClock:
+    """
+    Virtual wall clock of a replay. Recorded bars closed long ago, so on the real clock
+    every one would look like outage catch-up: instead a bar is fetched the moment it
+    closes (its recorded close time) and the real time it then spends in the pipeline is
+    added at 1x, so freshness measures the pipeline's own close -> commit latency.
+    """
+
+    def __init__(self, interval_ms: int = MINUTE_MS):
+        self.interval_ms = interval_ms
+        # Virtual time of the newest commit
+        self.now_ms = None
+
+    def fetched_ms(self, bar: Bar):
+        return bar.ts_ms + self.interval_ms
+
+    def committed_ms(self, fetched_ms: int, fetched_at: float, finished_at: float):
+        """fetched_at / finished_at are perf_counter() readings of the fetch and the commit"""
+        committed = fetched_ms + int((finished_at - fetched_at) * 1000)
+        if self.now_ms is None or committed > self.now_ms:
+            self.now_ms = committed
+        return committed
+
+
+class ReplayMonitor:
+    """
+    Stand-in for TelegramMonitor during a replay: the alert rules run on their own state
+    (the live monitor never sees replayed ticks), nothing is sent and Mongo is not queried.
+    The freshness SLO is checked on the replayed symbol's samples, stamped by ReplayClock.
+    """
+
+    def __init__(self, symbol: str, config: dict = None):
+        self.logger = LoggerSetup.logger_setup("ReplayMonitor")
+        self.symbol = symbol
+        self.rules_engine = None
+        if ALERT_RULES_CONFIG.get("enabled") and ALERT_RULES_CONFIG.get("rules"):
+            self.rules_engine = AlertRulesEngine(ALERT_RULES_CONFIG["rules"])
+        self.alerts = 0
+
+        config = config or FRESHNESS_CONFIG
+        self.freshness = FreshnessTracker()
+        self.slo_seconds = config.get("slo_seconds", 45)
+        self.slo_percentile = config.get("slo_percentile", 95)
+        self.slo_min_samples = config.get("min_samples", 20)
+        self.in_breach = False
+        self.slo_breaches = 0
+
+    def evaluate_tick(self, ts_ms: int, value: float):
+        if self.rules_engine is None:
+            return []
+        alerts = self.rules_engine.evaluate(ts_ms, value)
+        self.alerts += len(alerts)
+        for alert in alerts:
+            self.logger.debug(f"Replay alert rule fired: {alert.message}")
+        return alerts
+
+    def check_data_after_realtime_extract(self):
+        """Freshness SLO of the replayed symbol; a breach is counted once until it recovers"""
+        breaches = [
+            breach
+            for breach in self.freshness.breaches(self.slo_seconds, self.slo_percentile, self.slo_min_samples)
+            if breach[0] == self.symbol
+        ]
+        if breaches and not self.in_breach:
+            self.slo_breaches += 1
+            self.logger.warning(
+                f"Replay freshness SLO breach: p{self.slo_percentile}={breaches[0][1]:.1f}s > {self.slo_seconds}s"
+            )
+        self.in_breach = bool(breaches)
+        return not breaches
+
+
+def run_replay(csv_path: str, speed: float, limit: int = None, symbol: str = None, sink_name: str = "sqlite"):
+    """Replay a recording through the real extractor code paths; returns the pipeline stats"""
+    from src.extract.extract_dominance_realtime import ExtractBTCDominanceRealtime
+    from src.extract.realtime_pipeline import RealtimePipeline
+    from src.storage.factory import build_sink
+
+    config = dict(DATA_CRAWL_CONFIG)
+    with tempfile.TemporaryDirectory() as tmp:
+        # Replays go to a throwaway embedded store unless a real sink is asked for
+        config["sqlite_path"] = os.path.join(tmp, "replay.sqlite")
+        config["parquet_dir"] = os.path.join(tmp, "parquet")
+        sink = build_sink([sink_name], mongo_profile="bulk", config=config)
+
+        # A separate symbol keeps replayed bars apart from the live series
+        replay_symbol = symbol or f"{DATA_CRAWL_CONFIG.get('symbol', 'BTC.D')}.REPLAY"
+        monitor = ReplayMonitor(replay_symbol)
+        # Embedded sinks replay without Mongo: no warm-up, rejects are only logged
+        extractor = ExtractBTCDominanceRealtime(
+            symbol=replay_symbol, sink=sink, telegram_monitor=monitor, use_mongo=sink_name == "mongo"
+        )
+        # Replayed bars never reach live subscribers
+        extractor.bar_bus = None
+
+        pipeline = RealtimePipeline(extractor, REALTIME_PIPELINE_CONFIG, clock=ReplayClock())
+        started = time.perf_counter()
+        pipeline.run(source=ReplaySource(csv_path, speed=speed, limit=limit))
+        elapsed = time.perf_counter() - started
+        sink.close()
+
+    stats = pipeline.stats()
+    stats["wall_s"] = elapsed
+    stats["alerts"] = monitor.alerts
+    # Only the replayed series (the tracker is process-wide)
+    stats["freshness"] = FreshnessTracker().percentiles(replay_symbol)
+    stats["slo_breaches"] = monitor.slo_breaches
+    stats["ticks_per_sec"] = pipeline.fetch_stats.count / elapsed if elapsed > 0 else 0.0
+    return stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay recorded minute bars through the realtime pipeline")
+    parser.add_argument("csv", nargs="?", default="btc_dominance_ohlcv_1min_full.csv")
+    parser.add_argument("--speed", default="max", help='"1x", "100x" or "max"')
+    parser.add_argument("--limit", type=int, default=None, help="replay only the first N rows")
+    parser.add_argument("--symbol", default=None, help="symbol written for replayed bars")
+    parser.add_argument("--sink", default="sqlite", choices=["sqlite", "parquet", "mongo"])
+    args = parser.parse_args()
+
+    stats = run_replay(args.csv, parse_speed(args.speed), args.limit, args.symbol, args.sink)
+    e2e = stats["end_to_end"]
+    print(
+        f"Replayed {stats['fetch']['count']} ticks in {stats['wall_s']:.2f}s "
+        f"({stats['ticks_per_sec']:,.0f} ticks/s), {stats['flushes']} flushes"
+    )
+    print(
+        "fetch->commit latency ms: "
+        f"p50={e2e.get('p50_ms', 0):.2f} p95={e2e.get('p95_ms', 0):.2f} "
+        f"p99={e2e.get('p99_ms', 0):.2f} max={e2e['max_ms']:.2f}"
+    )
+    e2e = stats["freshness"].get("end_to_end", {})
+    print(
+        "bar close->commit freshness s: "
+        f"p50={e2e.get('p50_s', 0):.3f} p95={e2e.get('p95_s', 0):.3f} p99={e2e.get('p99_s', 0):.3f} "
+        f"({e2e.get('count', 0)} samples, {stats['slo_breaches']} SLO breaches)"
+    )
+    print(json.dumps(stats, indent=2, default=str))
@@ -0,0 +1,226 @@
+import numpy as np
+
+
+class RingBuffer:
+    """Fixed-size float ring; push() returns the evicted value (or None while filling)"""
+
+    __slots__ = ("data", "capacity", "head", "count")
+
+    def __init__(self, capacity: int):
+        self.data = np.zeros(capacity, dtype=np.float64)
+        self.capacity = capacity
+        self.head = 0
+        self.count = 0
+
+    def push(self, value: float):
+        evicted = self.data[self.head] if self.count == self.capacity else None
+        self.data[self.head] = value
+        self.head = (self.head + 1) % self.capacity
+        if self.count < self.capacity:
+            self.count += 1
+        return evicted
+
+    def full(self):
+        return self.count == self.capacity
+
+    def values(self):
+        """Oldest-to-newest copy of the buffered values"""
+        if self.count < self.capacity:
+            return self.data[: self.count].copy()
+        return np.roll(self.data, -self.head)
+
+    def snapshot(self):
+        # push() only ever overwrites data[head], so this is enough to undo it
+        return (self.head, self.count, self.data[self.head])
+
+    def restore(self, snap):
+        self.head, self.count, self.data[snap[0]] = snap
+
+
+class SMA:
+    def __init__(self, window: int):
+        self.name = f"sma_{window}"
+        self.window = window
+        self.ring = RingBuffer(window)
+        self.total = 0.0
+        self._pushes = 0
+
+    def push(self, value: float):
+        evicted = self.ring.push(value)
+        self.total += value - (evicted if evicted is not None else 0.0)
+        self._pushes += 1
+        # Re-sum every window pushes so float drift never accumulates (still O(1) amortized)
+        if self._pushes % self.window == 0:
+            self.total = float(self.ring.data[: self.ring.count].sum())
+
+    def value(self):
+        return {self.name: self.total / self.window if self.ring.full() else None}
+
+    def snapshot(self):
+        return (self.ring.snapshot(), self.total, self._pushes)
+
+    def restore(self, snap):
+        ring, self.total, self._pushes = snap
+        self.ring.restore(ring)
+
+
+class EMA:
+    def __init__(self, window: int):
+        self.name = f"ema_{window}"
+        self.window = window
+        self.alpha = 2.0 / (window + 1)
+        self.ema = None
+        self.count = 0
+
+    def push(self, value: float):
+        if self.ema is None:
+            self.ema = value
+        else:
+            self.ema = self.alpha * value + (1 - self.alpha) * self.ema
+        self.count += 1
+
+    def value(self):
+        return {self.name: self.ema if self.count >= self.window else None}
+
+    def snapshot(self):
+        return (self.ema, self.count)
+
+    def restore(self, snap):
+        self.ema, self.count = snap
+
+
+class RSI:
+    """Wilder RSI: gains/losses smoothed with alpha = 1/window, seeded by the first change"""
+
+    def __init__(self, window: int):
+        self.name = f"rsi_{window}"
+        self.window = window
+        self.alpha = 1.0 / window
+        self.prev = None
+        self.avg_gain = None
+        self.avg_loss = None
+        self.count = 0
+
+    def push(self, value: float):
+        if self.prev is not None:
+            change = value - self.prev
+            gain = change if change > 0 else 0.0
+            loss = -change if change < 0 else 0.0
+            if self.avg_gain is None:
+                self.avg_gain, self.avg_loss = gain, loss
+            else:
+                self.avg_gain = self.alpha * gain + (1 - self.alpha) * self.avg_gain
+                self.avg_loss = self.alpha * loss + (1 - self.alpha) * self.avg_loss
+            self.count += 1
+        self.prev = value
+
+    def value(self):
+        if self.count < self.window:
+            return {self.name: None}
+        return {self.name: rsi_from_averages(self.avg_gain, self.avg_loss)}
+
+    def snapshot(self):
+        return (self.prev, self.avg_gain, self.avg_loss, self.count)
+
+    def restore(self, snap):
+        self.prev, self.avg_gain, self.avg_loss, self.count = snap
+
+
+class Bollinger:
+    """Population std over the window; values are shifted by the first sample to keep sums small"""
+
+    def __init__(self, window: int, num_std: float):
+        self.prefix = bollinger_prefix(window, num_std)
+        self.window = window
+        self.num_std = num_std
+        self.ring = RingBuffer(window)
+        self.shift = None
+        self.s1 = 0.0
+        self.s2 = 0.0
+        self._pushes = 0
+
+    def push(self, value: float):
+        if self.shift is None:
+            self.shift = value
+        x = value - self.shift
+        evicted = self.ring.push(x)
+        if evicted is not None:
+            self.s1 -= evicted
+            self.s2 -= evicted * evicted
+        self.s1 += x
+        self.s2 += x * x
+        self._pushes += 1
+        if self._pushes % self.window == 0:
+            buffered = self.ring.data[: self.ring.count]
+            self.s1 = float(buffered.sum())
+            self.s2 = float((buffered * buffered).sum())
+
+    def value(self):
+        names = (f"{self.prefix}_mid", f"{self.prefix}_upper", f"{self.prefix}_lower")
+        if not self.ring.full():
+            return dict.fromkeys(names)
+        mean = self.s1 / self.window
+        std = max(self.s2 / self.window - mean * mean, 0.0) ** 0.5
+        mid = mean + self.shift
+        return dict(zip(names, (mid, mid + self.num_std * std, mid - self.num_std * std)))
+
+    def snapshot(self):
+        return (self.ring.snapshot(), self.shift, self.s1, self.s2, self._pushes)
+
+    def restore(self, snap):
+        ring, self.shift, self.s1, self.s2, self._pushes = snap
+        self.ring.restore(ring)
+
+
+def rsi_from_averages(avg_gain, avg_loss):
+    if avg_loss == 0:
+        return 100.0 if avg_gain > 0 else 50.0
+    return 100.0 - 100.0 / (1.0 + avg_gain / avg_loss)
+
+
+def bollinger_prefix(window: int, num_std: float):
+    return f"bb_{window}_{num_std:g}"
+
+
+def build_indicators(config: dict):
+    indicators = []
+    indicators += [SMA(n) for n in config.get("sma", [])]
+    indicators += [EMA(n) for n in config.get("ema", [])]
+    indicators += [RSI(n) for n in config.get("rsi", [])]
+    indicators += [Bollinger(n, k) for n, k in config.get("bollinger", [])]
+    return indicators
+
+
+class StreamingIndicators:
+    """
+    O(1)-per-bar indicator state for one series.
+    Pushing the same bar timestamp again (the realtime poll sees a minute bar twice)
+    revises the last bar instead of appending a new one.
+    """
+
+    def __init__(self, config: dict):
+        self.indicators = build_indicators(config)
+        self.last_ts = None
+        self._snapshots = None
+
+    def update(self, ts_ms: int, close: float):
+        if close is None:
+            return self.values()
+        if ts_ms is not None and ts_ms == self.last_ts and self._snapshots is not None:
+            for indicator, snap in zip(self.indicators, self._snapshots):
+                indicator.restore(snap)
+        elif self.last_ts is not None and ts_ms is not None and ts_ms < self.last_ts:
+            # Out-of-order bar: ignore rather than corrupt the state
+            return self.values()
+        else:
+            self._snapshots = [indicator.snapshot() for indicator in self.indicators]
+        for indicator in self.indicators:
+            indicator.push(float(close))
+        self.last_ts = ts_ms
+        return self.values()
+
+    def values(self):
+        out = {}
+        for indicator in self.indicators:
+            out.update(indicator.value())
+        return out
@@ -0,0 +1,265 @@
+import argparse
+import os
+import queue
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from pymongo import ASCENDING
+
+from src.configs.config_interval import (
+    INTERVAL_COLLECTION_KEYS,
+    INTERVAL_MS,
+    get_interval_collection,
+)
+from src.configs.config_mongo import MongoDBConfig
+from src.configs.config_schema import (
+    F_INTERVAL,
+    F_SYMBOL,
+    F_TIME,
+    OHLCV_FIELDS,
+    date_to_ms,
+    ms_to_date,
+)
+from src.configs.config_variable import DATA_CRAWL_CONFIG, EXPORT_CONFIG
+from src.log.logger_setup import LoggerSetup
+
+EXPORT_COLUMNS = ("timestamp_ms", "datetime", "open", "high", "low", "close", "volume")
+
+# Sentinel closing a partition's chunk queue
+_DONE = object()
+
+
+def split_range(start_ms: int, end_ms: int, step_ms: int, partitions: int):
+    """Split [start_ms, end_ms) into up to `partitions` contiguous ranges aligned to the bar size"""
+    bars = max(0, -(-(end_ms - start_ms) // step_ms))
+    partitions = max(1, min(partitions, bars))
+    per_partition = -(-bars // partitions)
+    ranges = []
+    lo = start_ms
+    while lo < end_ms:
+        hi = min(end_ms, lo + per_partition * step_ms)
+        ranges.append((lo, hi))
+        lo = hi
+    return ranges
+
+
+def _frame(rows: list):
+    frame = pd.DataFrame(rows, columns=(F_TIME,) + OHLCV_FIELDS)
+    stamps = pd.to_datetime(frame[F_TIME])
+    frame.insert(0, "timestamp_ms", (stamps - pd.Timestamp(0)) // pd.Timedelta(milliseconds=1))
+    frame = frame.rename(
+        columns={F_TIME: "datetime", "o": "open", "h": "high", "l": "low", "c": "close", "v": "volume"}
+    )
+    frame["datetime"] = stamps.dt.strftime("%Y-%m-%dT%H:%M:%SZ")
+    return frame[list(EXPORT_COLUMNS)]
+
+
+class _CsvWriter:
+    def __init__(self, path: str):
+        self.handle = open(path, "w", newline="")
+        self.header = True
+
+    def write(self, frame: pd.DataFrame):
+        frame.to_csv(self.handle, index=False, header=self.header)
+        self.header = False
+
+    def close(self):
+        self.handle.close()
+
+
+class _NdjsonWriter:
+    def __init__(self, path: str):
+        self.handle = open(path, "w")
+
+    def write(self, frame: pd.DataFrame):
+        if len(frame):
+            self.handle.write(frame.to_json(orient="records", lines=True))
+            self.handle.write("\n")
+
+    def close(self):
+        self.handle.close()
+
+
+class _ParquetWriter:
+    def __init__(self, path: str):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise ImportError("Parquet export requires pyarrow (pip install pyarrow)") from e
+        self._pa = pa
+        self.schema = pa.schema(
+            [("timestamp_ms", pa.int64()), ("datetime", pa.string())]
+            + [(name, pa.float64()) for name in EXPORT_COLUMNS[2:]]
+        )
+        # One row group per chunk: the file grows chunk by chunk
+        self.writer = pq.ParquetWriter(path, self.schema, compression="zstd")
+
+    def write(self, frame: pd.DataFrame):
+        self.writer.write_table(
+            self._pa.Table.from_pandas(frame, schema=self.schema, preserve_index=False)
+        )
+
+    def close(self):
+        self.writer.close()
+
+
+WRITERS = {"csv": _CsvWriter, "ndjson": _NdjsonWriter, "parquet": _ParquetWriter}
+
+
+class BarExporter:
+    """
+    Streams one symbol/interval/time range out of Mongo.
+
+    The range is split into partitions read in parallel with projected, sorted cursors;
+    each partition hands fixed-size chunks to its own bounded queue and the writer drains
+    partitions in order. Memory is bounded by workers x queue_chunks x chunk_rows rows.
+    """
+
+    def __init__(self, interval: str = "1m", symbol: str = None, config: dict = None):
+        self.logger = LoggerSetup.logger_setup("BarExporter")
+        self.config = config or EXPORT_CONFIG
+        self.interval = interval
+        self.symbol = symbol or DATA_CRAWL_CONFIG.get("symbol", "BTC.D")
+        self.mongo_client = MongoDBConfig.get_client("bulk")
+        self.collection = get_interval_collection(self.mongo_client, interval)
+        self.cursor_batch_size = self.config.get("cursor_batch_size", 10000)
+        self.chunk_rows = self.config.get("chunk_rows", 50000)
+        self.queue_chunks = self.config.get("queue_chunks", 2)
+        self._cancelled = threading.Event()
+
+    def bounds(self):
+        """First and last stored bar of the series as epoch ms (None if empty)"""
+        query = {F_SYMBOL: self.symbol, F_INTERVAL: self.interval}
+        first = self.collection.find_one(query, {"_id": 0, F_TIME: 1}, sort=[(F_TIME, ASCENDING)])
+        last = self.collection.find_one(query, {"_id": 0, F_TIME: 1}, sort=[(F_TIME, -1)])
+        if not first or not last:
+            return None
+        return date_to_ms(first[F_TIME]), date_to_ms(last[F_TIME]) + INTERVAL_MS[self.interval]
+
+    def _put(self, out: queue.Queue, item):
+        # Blocks while the writer is behind, but gives up once the export is cancelled
+        while not self._cancelled.is_set():
+            try:
+                out.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _read_partition(self, lo_ms: int, hi_ms: int, out: queue.Queue):
+        try:
+            projection = {"_id": 0, F_TIME: 1}
+            projection.update({f: 1 for f in OHLCV_FIELDS})
+            cursor = (
+                self.collection.find(
+                    {
+                        F_SYMBOL: self.symbol,
+                        F_INTERVAL: self.interval,
+                        F_TIME: {"$gte": ms_to_date(lo_ms), "$lt": ms_to_date(hi_ms)},
+                    },
+                    projection,
+                )
+                .sort(F_TIME, ASCENDING)
+                .batch_size(self.cursor_batch_size)
+            )
+            rows = []
+            for doc in cursor:
+                rows.append((doc[F_TIME],) + tuple(doc.get(f) for f in OHLCV_FIELDS))
+                if len(rows) >= self.chunk_rows:
+                    if not self._put(out, _frame(rows)):
+                        return
+                    rows = []
+            if rows:
+                self._put(out, _frame(rows))
+        except Exception as e:
+            self._put(out, e)
+        finally:
+            self._put(out, _DONE)
+
+    def export(self, output: str, fmt: str, start_ms: int = None, end_ms: int = None, partitions: int = None, workers: int = None):
+        partitions = partitions or self.config.get("partitions", 8)
+        workers = workers or self.config.get("workers", 4)
+        if start_ms is None or end_ms is None:
+            bounds = self.bounds()
+            if bounds is None:
+                self.logger.warning(f"No {self.interval} bars stored for {self.symbol}")
+                return 0
+            start_ms = bounds[0] if start_ms is None else start_ms
+            end_ms = bounds[1] if end_ms is None else end_ms
+
+        ranges = split_range(start_ms, end_ms, INTERVAL_MS[self.interval], partitions)
+        queues = [queue.Queue(maxsize=self.queue_chunks) for _ in ranges]
+        writer = WRITERS[fmt](output)
+        started = time.perf_counter()
+        rows = 0
+        self._cancelled.clear()
+        try:
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="export") as pool:
+                # Submitted in order, so the partition being written is always among the running ones
+                for (lo, hi), q in zip(ranges, queues):
+                    pool.submit(self._read_partition, lo, hi, q)
+                try:
+                    for q in queues:
+                        while True:
+                            chunk = q.get()
+                            if chunk is _DONE:
+                                break
+                            if isinstance(chunk, Exception):
+                                raise chunk
+                            writer.write(chunk)
+                            rows += len(chunk)
+                except BaseException:
+                    # Unblock readers waiting on full queues before the pool joins them
+                    self._cancelled.set()
+                    raise
+        finally:
+            writer.close()
+
+        elapsed = time.perf_counter() - started
+        size_mb = os.path.getsize(output) / 1024 / 1024
+        self.logger.info(
+            f"Exported {rows} {self.interval} bars of {self.symbol} to {output} "
+            f"({size_mb:.1f} MB, {elapsed:.2f}s, {rows / elapsed if elapsed else 0:,.0f} rows/s)"
+        )
+        return rows
+
+
+def _parse_time(value: str):
+    if value is None:
+        return None
+    return int(pd.Timestamp(value).value // 1_000_000)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stream stored bars to CSV / Parquet / NDJSON")
+    parser.add_argument("output")
+    parser.add_argument("--format", choices=sorted(WRITERS), default=None, help="default: from the file extension")
+    parser.add_argument("--interval", choices=sorted(INTERVAL_COLLECTION_KEYS), default="1m")
+    parser.add_argument("--symbol", default=None)
+    parser.add_argument("--start", default=None, help="inclusive UTC time, e.g. 2024-01-01")
+    parser.add_argument("--end", default=None, help="exclusive UTC time")
+    parser.add_argument("--partitions", type=int, default=None)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    fmt = args.format or os.path.splitext(args.output)[1].lstrip(".").lower()
+    if fmt == "jsonl":
+        fmt = "ndjson"
+    if fmt not in WRITERS:
+        parser.error(f"unknown format '{fmt}', use --format")
+
+    BarExporter(args.interval, args.symbol).export(
+        args.output,
+        fmt,
+        start_ms=_parse_time(args.start),
+        end_ms=_parse_time(args.end),
+        partitions=args.partitions,
+        workers=args.workers,
+    )
@@ -0,0 +1,281 @@
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from pymongo import ASCENDING
+
+from src.configs.config_interval import (
+    INTERVAL_COLLECTION_KEYS,
+    INTERVAL_MS,
+    get_interval_collection,
+)
+from src.configs.config_schema import (
+    F_INTERVAL,
+    F_SYMBOL,
+    F_TIME,
+    bar_doc,
+    ensure_bar_indexes,
+    ms_to_date,
+)
+from src.configs.config_mongo import MongoDBConfig
+from src.configs.config_symbols import crawl_symbols, interval_specs
+from src.configs.config_variable import DATA_CRAWL_CONFIG, GAP_REPAIR_CONFIG, PUBLISH_CONFIG
+from src.extract.extract_dominance_realtime import fetched_bar_doc
+from src.log.logger_setup import LoggerSetup
+from src.publish.bar_bus import BarBus
+from src.quality.quarantine import Quarantine
+from src.quality.validator import BarValidator, reasons_of
+from src.storage.base import BarWrite
+from src.storage.write_coordinator import WriteCoordinator
+from src.upstream.sources import TradingViewSource
+from src.upstream.tradingview_client import TradingViewClient
+from src.upstream.tv_bars import Bar, bars_to_arrays, tv_interval
+
+
+def find_missing_spans(timestamps: np.ndarray, start_ms: int, end_ms: int, step_ms: int):
+    """
+    Return an (N, 2) int64 array of inclusive [first_missing, last_missing] spans
+    between start_ms and end_ms (both snapped to the cadence).
+    """
+    first = -(-int(start_ms) // step_ms) * step_ms
+    last = (int(end_ms) // step_ms) * step_ms
+    if last < first:
+        return np.empty((0, 2), dtype=np.int64)
+
+    ts = np.asarray(timestamps, dtype=np.int64)
+    ts = ts[(ts >= first) & (ts <= last)]
+    # Input is normally already sorted by the cursor; duplicates give diff 0 and are harmless
+    if len(ts) > 1 and not (ts[1:] >= ts[:-1]).all():
+        ts = np.sort(ts)
+    # Sentinels one step outside the range turn leading/trailing gaps into ordinary diffs
+    bounds = np.concatenate(([first - step_ms], ts, [last + step_ms]))
+    holes = np.flatnonzero(np.diff(bounds) > step_ms)
+    return np.column_stack((bounds[holes] + step_ms, bounds[holes + 1] - step_ms))
+
+
+def count_bars(spans: np.ndarray, step_ms: int):
+    if len(spans) == 0:
+        return 0
+    return int(((spans[:, 1] - spans[:, 0]) // step_ms + 1).sum())
+
+
+def plan_fetch_window(spans: np.ndarray, step_ms: int, now_ms: int, max_bars: int):
+    """
+    tvDatafeed only serves the trailing n bars, so a single request reaching back to the
+    oldest reachable span repairs every newer span at once: the fewest windows is one.
+    Returns (n_bars, reachable_spans, unreachable_spans).
+    """
+    if len(spans) == 0:
+        return 0, spans, spans
+
+    oldest_reachable = (int(now_ms) // step_ms - (max_bars - 1)) * step_ms
+    reachable = spans[spans[:, 1] >= oldest_reachable].copy()
+    unreachable = spans[spans[:, 0] < oldest_reachable].copy()
+    if len(unreachable):
+        unreachable[:, 1] = np.minimum(unreachable[:, 1], oldest_reachable - step_ms)
+    if len(reachable) == 0:
+        return 0, reachable, unreachable
+
+    reachable[:, 0] = np.maximum(reachable[:, 0], oldest_reachable)
+    n_bars = int((int(now_ms) // step_ms * step_ms - reachable[0, 0]) // step_ms + 1)
+    return n_bars, reachable, unreachable
+
+
+def expand_spans(spans: np.ndarray, step_ms: int):
+    if len(spans) == 0:
+        return np.empty(0, dtype=np.int64)
+    return np.concatenate([np.arange(a, b + step_ms, step_ms) for a, b in spans])
+
+
+class GapRepairJob:
+    """
+    Audits one symbol's series for missing bars and fills them from upstream with one
+    request. Repaired bars go through the write coordinator as $setOnInsert (never
+    overwriting a bar written meanwhile), so every sink, the BarBus subscribers and the
+    rollup stats see them like any other committed bar.
+    """
+
+    def __init__(self, symbol: str = None, interval: str = "1m", exchange: str = None, config: dict = None):
+        if interval not in INTERVAL_COLLECTION_KEYS:
+            raise ValueError(f"Unsupported interval '{interval}'")
+
+        self.logger = LoggerSetup.logger_setup("GapRepairJob")
+        config = config or GAP_REPAIR_CONFIG
+        self.symbol = symbol or DATA_CRAWL_CONFIG.get("symbol", "BTC.D")
+        self.exchange = exchange or "CRYPTOCAP"
+        self.interval = interval
+        self.step_ms = INTERVAL_MS[interval]
+        self.max_fetch_bars = config["max_fetch_bars"][interval]
+        self.lookback_days = config["default_lookback_days"][interval]
+
+        # Audit reads go to Mongo; repaired bars are written through the coordinator
+        self.mongo_client = MongoDBConfig.get_client("bulk")
+        self.collection_name = DATA_CRAWL_CONFIG.get(INTERVAL_COLLECTION_KEYS[interval])
+        self.collection = get_interval_collection(self.mongo_client, interval)
+        # (s, i, t) index serves the audit range scan
+        ensure_bar_indexes(self.collection)
+        self.sink = WriteCoordinator().for_source("gap_repair")
+        self.bar_bus = BarBus() if PUBLISH_CONFIG.get("source", "bus") == "bus" else None
+
+        self.tv_client = TradingViewClient()
+        self.validator = BarValidator(symbol=self.symbol)
+        self.quarantine = Quarantine()
+
+    def load_timestamps(self, start_ms: int, end_ms: int):
+        # The server converts the Date to epoch ms, so Python only unpacks int64s
+        cursor = self.collection.aggregate(
+            [
+                {
+                    "$match": {
+                        F_SYMBOL: self.symbol,
+                        F_INTERVAL: self.interval,
+                        F_TIME: {"$gte": ms_to_date(start_ms), "$lte": ms_to_date(end_ms)},
+                    }
+                },
+                {"$sort": {F_TIME: ASCENDING}},
+                {"$project": {"_id": 0, "ms": {"$toLong": f"${F_TIME}"}}},
+            ],
+            batchSize=100000,
+        )
+        return np.fromiter((d["ms"] for d in cursor), dtype=np.int64)
+
+    def audit(self, start_ms: int, end_ms: int):
+        started = time.perf_counter()
+        timestamps = self.load_timestamps(start_ms, end_ms)
+        loaded = time.perf_counter()
+        spans = find_missing_spans(timestamps, start_ms, end_ms, self.step_ms)
+        self.logger.info(
+            f"Audited {len(timestamps)} {self.symbol} {self.interval} bars in {self.collection_name}: "
+            f"{len(spans)} gaps / {count_bars(spans, self.step_ms)} missing bars "
+            f"(load {loaded - started:.3f}s, diff {time.perf_counter() - loaded:.3f}s)"
+        )
+        return spans
+
+    def _fetch(self, n_bars: int):
+        # Lean path: epoch ms straight from the payload, no DataFrame / datetime per row
+        bars = self.tv_client.get_bars(
+            symbol=self.symbol,
+            exchange=self.exchange,
+            interval=tv_interval(self.interval),
+            n_bars=n_bars,
+        )
+        return bars_to_arrays(bars or [])
+
+    def _repair_writes(self, index_ms: np.ndarray, values: np.ndarray, wanted_ms: np.ndarray):
+        """BarWrites filling the wanted bars that pass validation; the rest is quarantined"""
+        # Whole fetched window validated at once, so spike checks see the neighbours too
+        codes = self.validator.validate(index_ms, *values.T)
+        wanted = np.isin(index_ms, wanted_ms)
+
+        rejected = [
+            (
+                bar_doc(self.symbol, self.interval, int(index_ms[i]), *self._ohlcv(values, i)),
+                reasons_of(int(codes[i])),
+            )
+            for i in np.flatnonzero(wanted & (codes != 0))
+        ]
+        self.quarantine.put(rejected, "gap_repair")
+
+        writes, docs = [], []
+        for i in np.flatnonzero(wanted & (codes == 0)):
+            bar = Bar(int(index_ms[i]), *self._ohlcv(values, i), src=TradingViewSource.name)
+            doc = fetched_bar_doc(self.symbol, self.interval, bar)
+            # Only fill holes; never overwrite a bar written meanwhile by the extractors
+            writes.append(BarWrite(self.symbol, self.interval, bar.ts_ms, {"$setOnInsert": doc}))
+            docs.append(doc)
+        return writes, docs
+
+    @staticmethod
+    def _ohlcv(values: np.ndarray, i: int):
+        return [None if np.isnan(x) else float(x) for x in values[i]]
+
+    def _publish(self, docs: list):
+        if self.bar_bus is not None:
+            for doc in docs:
+                self.bar_bus.publish(doc)
+
+    def repair(self, spans: np.ndarray, now_ms: int = None):
+        now_ms = now_ms if now_ms is not None else int(time.time() * 1000)
+        n_bars, reachable, unreachable = plan_fetch_window(
+            spans, self.step_ms, now_ms, self.max_fetch_bars
+        )
+        if len(unreachable):
+            self.logger.warning(
+                f"{count_bars(unreachable, self.step_ms)} missing {self.symbol} bars are older than the "
+                f"upstream limit of {self.max_fetch_bars} bars and cannot be repaired"
+            )
+        if n_bars == 0:
+            return 0
+
+        index_ms, values = self._fetch(n_bars)
+        if len(index_ms) == 0:
+            self.logger.warning(f"Upstream returned no bars for gap repair of {self.symbol}")
+            return 0
+
+        writes, docs = self._repair_writes(index_ms, values, expand_spans(reachable, self.step_ms))
+        if writes:
+            # Stored by the coordinator's next flush; subscribers only see them once committed
+            self.sink.submit(writes, on_commit=lambda: self._publish(docs))
+
+        missing = count_bars(reachable, self.step_ms)
+        self.logger.info(
+            f"Gap repair queued {len(writes)}/{missing} missing {self.symbol} {self.interval} bars "
+            f"with 1 request"
+        )
+        return len(writes)
+
+    def run(self, start_ms: int = None, end_ms: int = None):
+        end_ms = end_ms if end_ms is not None else int(time.time() * 1000)
+        if start_ms is None:
+            start_ms = end_ms - self.lookback_days * 24 * 60 * 60 * 1000
+        # The still-forming bar is not a gap
+        spans = self.audit(start_ms, end_ms - self.step_ms)
+        return self.repair(spans, now_ms=end_ms)
+
+
+def repair_symbols(specs: list = None, config: dict = None):
+    """Audit and repair every crawled series, one symbol after another"""
+    config = config or GAP_REPAIR_CONFIG
+    specs = specs or crawl_symbols()
+    logger = LoggerSetup.logger_setup("GapRepairJob")
+    repaired, failed, total = 0, 0, 0
+    for interval in config.get("intervals", ["1m"]):
+        for spec in interval_specs(specs, interval):
+            total += 1
+            try:
+                repaired += GapRepairJob(spec.symbol, interval, spec.exchange, config).run()
+            except Exception as e:
+                failed += 1
+                logger.error(f"Gap repair of {spec.symbol} {interval} failed: {e}")
+    if failed:
+        raise RuntimeError(f"{failed} of {total} series failed gap repair")
+    return repaired
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Audit and repair missing bars")
+    parser.add_argument("--symbol", default=None, help="one symbol instead of every crawled one")
+    parser.add_argument("--interval", choices=sorted(INTERVAL_COLLECTION_KEYS), default="1m")
+    parser.add_argument("--days", type=float, default=None, help="lookback window in days")
+    parser.add_argument("--audit-only", action="store_true")
+    args = parser.parse_args()
+
+    end = int(time.time() * 1000)
+    start = None if args.days is None else end - int(args.days * 24 * 60 * 60 * 1000)
+    specs = interval_specs(crawl_symbols(), args.interval)
+    if args.symbol:
+        specs = [spec for spec in specs if spec.symbol == args.symbol] or crawl_symbols({"symbol": args.symbol})
+    for spec in specs:
+        job = GapRepairJob(spec.symbol, args.interval, spec.exchange)
+        if args.audit_only:
+            first = start if start is not None else end - job.lookback_days * 86400000
+            gaps = job.audit(first, end - job.step_ms)
+            print(f"{spec.symbol}: {len(gaps)} gaps, {count_bars(gaps, job.step_ms)} missing bars")
+        else:
+            job.run(start_ms=start, end_ms=end)
+    WriteCoordinator().stop()
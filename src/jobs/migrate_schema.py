@@ -0,0 +1,183 @@
+import argparse
+import os
+import sys
+import time
+from datetime import datetime
+
+import pandas as pd
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from pymongo import ASCENDING, DeleteOne, UpdateOne
+
+from src.configs.config_interval import (
+    INTERVAL_COLLECTION_KEYS,
+    INTERVAL_MS,
+    get_interval_collection,
+)
+from src.configs.config_mongo import MongoDBConfig
+from src.configs.config_schema import (
+    F_INDICATORS,
+    F_SYMBOL,
+    F_UPDATED,
+    F_VERSION,
+    SCHEMA_VERSION,
+    bar_doc,
+    bar_key,
+    ensure_bar_indexes,
+)
+from src.configs.config_variable import DATA_CRAWL_CONFIG, SCHEMA_MIGRATION_CONFIG
+from src.log.logger_setup import LoggerSetup
+
+LEGACY_FIELDS = ("open", "high", "low", "close", "volume")
+
+
+def _parse_legacy_datetime(value):
+    # v1 stored "YYYY-MM-DD" (daily) or "YYYY-MM-DD HH:MM:SS" strings, naive UTC
+    if isinstance(value, datetime):
+        return value
+    if isinstance(value, str) and value:
+        return pd.Timestamp(value).to_pydatetime()
+    return None
+
+
+def legacy_bar_ms(doc: dict, interval: str):
+    """Bar open time of a v1 doc in epoch ms, snapped to the interval; None if unknown"""
+    step = INTERVAL_MS[interval]
+    dt = _parse_legacy_datetime(doc.get("datetime"))
+    if interval == "1d" and dt is not None:
+        # Daily timestamp_ms came from naive datetimes in server-local time; the date string is exact
+        return int(pd.Timestamp(dt.date()).value // 1_000_000)
+    ts_ms = doc.get("timestamp_ms")
+    if ts_ms is None and dt is not None:
+        ts_ms = int(pd.Timestamp(dt).value // 1_000_000)
+    if ts_ms is None:
+        return None
+    return (int(ts_ms) // step) * step
+
+
+def convert_legacy_doc(doc: dict, symbol: str, interval: str):
+    """Map a v1 document (long names, string dates, current_* fields) to a v2 bar doc"""
+    ts_ms = legacy_bar_ms(doc, interval)
+    if ts_ms is None:
+        return None
+
+    def value(name):
+        raw = doc.get(name)
+        if raw is None:
+            # Daily docs created by the realtime path only had current_* filled in
+            raw = doc.get(f"current_{name}")
+        return float(raw) if raw is not None else None
+
+    new_doc = bar_doc(doc.get("symbol") or symbol, interval, ts_ms, *(value(n) for n in LEGACY_FIELDS))
+    last_update = _parse_legacy_datetime(doc.get("last_update"))
+    if last_update is not None:
+        new_doc[F_UPDATED] = last_update
+    if doc.get("ind"):
+        new_doc[F_INDICATORS] = doc["ind"]
+    return new_doc
+
+
+class SchemaMigrationJob:
+    def __init__(self, intervals=None, config: dict = None):
+        self.logger = LoggerSetup.logger_setup("SchemaMigrationJob")
+        self.config = config or SCHEMA_MIGRATION_CONFIG
+        self.intervals = list(intervals or INTERVAL_COLLECTION_KEYS)
+        self.batch_size = self.config.get("batch_size", 1000)
+        self.pause_seconds = self.config.get("pause_seconds", 0.1)
+        self.symbol = DATA_CRAWL_CONFIG.get("symbol", "BTC.D")
+        self.mongo_client = MongoDBConfig.get_client("bulk")
+        self.state = self.mongo_client.get_database(DATA_CRAWL_CONFIG.get("db")).get_collection(
+            self.config.get("state_collection", "schema_migrations")
+        )
+
+    def _checkpoint(self, collection_name: str):
+        state = self.state.find_one({"_id": collection_name})
+        return state.get("last_id") if state else None
+
+    def _save_checkpoint(self, collection_name: str, last_id, migrated: int):
+        self.state.update_one(
+            {"_id": collection_name},
+            {
+                "$set": {"last_id": last_id, "target_version": SCHEMA_VERSION, "updated_at": datetime.utcnow()},
+                "$inc": {"migrated": migrated},
+            },
+            upsert=True,
+        )
+
+    def migrate_interval(self, interval: str):
+        collection = get_interval_collection(self.mongo_client, interval)
+        ensure_bar_indexes(collection)
+        last_id = self._checkpoint(collection.name)
+        migrated = skipped = 0
+
+        while True:
+            query = {F_VERSION: {"$ne": SCHEMA_VERSION}}
+            if last_id is not None:
+                query["_id"] = {"$gt": last_id}
+            batch = list(collection.find(query).sort("_id", ASCENDING).limit(self.batch_size))
+            if not batch:
+                break
+
+            ops = []
+            for doc in batch:
+                new_doc = convert_legacy_doc(doc, self.symbol, interval)
+                if new_doc is None:
+                    # Left in place; the checkpoint moves past it so it is not retried
+                    skipped += 1
+                    self.logger.warning(f"Cannot migrate {collection.name} _id={doc['_id']}: no timestamp")
+                    continue
+                # $setOnInsert: a v2 bar already written by the realtime path wins over legacy data
+                ops.append(
+                    UpdateOne(
+                        bar_key(new_doc[F_SYMBOL], interval, legacy_bar_ms(doc, interval)),
+                        {"$setOnInsert": new_doc},
+                        upsert=True,
+                    )
+                )
+                ops.append(DeleteOne({"_id": doc["_id"]}))
+
+            if ops:
+                # Ordered, so a legacy doc is only deleted after its v2 copy is written
+                collection.bulk_write(ops, ordered=True)
+            last_id = batch[-1]["_id"]
+            self._save_checkpoint(collection.name, last_id, len(ops) // 2)
+            migrated += len(ops) // 2
+            self.logger.info(f"Migrated {migrated} docs in {collection.name} (skipped {skipped})")
+
+            if len(batch) < self.batch_size:
+                break
+            time.sleep(self.pause_seconds)
+
+        return migrated
+
+    def run(self):
+        total = 0
+        for interval in self.intervals:
+            try:
+                total += self.migrate_interval(interval)
+            except Exception as e:
+                self.logger.error(f"Schema migration failed for interval {interval}: {e}")
+        self.logger.info(f"Schema migration finished: {total} docs rewritten to v{SCHEMA_VERSION}")
+        return total
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rewrite legacy bar documents to schema v2")
+    parser.add_argument("--interval", choices=sorted(INTERVAL_COLLECTION_KEYS), action="append")
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="print the v2 form of a few legacy docs per interval without writing",
+    )
+    args = parser.parse_args()
+
+    job = SchemaMigrationJob(intervals=args.interval)
+    if args.dry_run:
+        for interval in job.intervals:
+            collection = get_interval_collection(job.mongo_client, interval)
+            for doc in collection.find({F_VERSION: {"$ne": SCHEMA_VERSION}}).limit(3):
+                print(interval, doc, "->", convert_legacy_doc(doc, job.symbol, interval))
+        sys.exit(0)
+
+    job.run()
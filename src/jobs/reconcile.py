@@ -0,0 +1,319 @@
+import argparse
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from pymongo import ASCENDING
+
+from src.configs.config_interval import INTERVAL_MS, get_interval_collection
+from src.configs.config_mongo import MongoDBConfig
+from src.configs.config_schema import (
+    F_INTERVAL,
+    F_SOURCE,
+    F_SYMBOL,
+    F_TIME,
+    F_VERSION,
+    OHLCV_FIELDS,
+    SCHEMA_VERSION,
+    bar_doc,
+    ensure_bar_indexes,
+    ms_to_date,
+)
+from src.configs.config_symbols import crawl_symbols
+from src.configs.config_variable import DATA_CRAWL_CONFIG, RECONCILE_CONFIG
+from src.log.logger_setup import LoggerSetup
+from src.quality.quarantine import Quarantine
+from src.quality.validator import BarValidator, reasons_of
+from src.storage.base import BarWrite
+from src.storage.write_coordinator import WriteCoordinator
+from src.upstream.sources import TradingViewSource
+from src.upstream.tradingview_client import TradingViewClient
+from src.upstream.tv_bars import tv_interval
+
+_MIX_1 = np.uint64(0xBF58476D1CE4E5B9)
+_MIX_2 = np.uint64(0x94D049BB133111EB)
+
+
+def _mix(x: np.ndarray):
+    # splitmix64 finalizer; uint64 arithmetic wraps, which is what the hash wants
+    x = (x ^ (x >> np.uint64(30))) * _MIX_1
+    x = (x ^ (x >> np.uint64(27))) * _MIX_2
+    return x ^ (x >> np.uint64(31))
+
+
+def quantize(values: np.ndarray, decimals: int):
+    """(N, 5) OHLCV rounded to `decimals`, with one NaN bit pattern and no -0.0"""
+    rounded = np.round(np.asarray(values, dtype=np.float64), decimals) + 0.0
+    rounded[np.isnan(rounded)] = np.nan
+    return rounded
+
+
+def row_hashes(quantized: np.ndarray):
+    """One uint64 per row from the float bits of every column (vectorized, no per-row loop)"""
+    bits = np.ascontiguousarray(quantized).view(np.uint64).reshape(len(quantized), -1)
+    h = np.zeros(len(bits), dtype=np.uint64)
+    for k in range(bits.shape[1]):
+        h = _mix(h ^ _mix(bits[:, k] + np.uint64(k + 1)))
+    return h
+
+
+def diff_bars(stored_ts: np.ndarray, stored: np.ndarray, fetched_ts: np.ndarray, fetched: np.ndarray):
+    """
+    Compare quantized fetched rows with the stored ones on timestamp. Both ts arrays are
+    sorted. Returns (revised, stored_pos, added): indices into the fetched rows whose
+    hash differs from the stored bar at stored_pos, and fetched rows with no stored bar.
+    """
+    pos = np.searchsorted(stored_ts, fetched_ts)
+    found = pos < len(stored_ts)
+    found[found] = stored_ts[pos[found]] == fetched_ts[found]
+    differs = np.zeros(len(fetched_ts), dtype=bool)
+    if found.any():
+        differs[found] = row_hashes(fetched[found]) != row_hashes(stored[pos[found]])
+    revised = np.flatnonzero(differs)
+    return revised, pos[revised], np.flatnonzero(~found)
+
+
+def _value(x):
+    return None if np.isnan(x) else float(x)
+
+
+class ReconcileJob:
+    """
+    Picks up upstream revisions of recent bars: re-fetches the trailing window, compares it
+    with the stored bars by row hash and writes only the bars that differ (one submit
+    to the write coordinator as "historical"), each revision also recorded in the
+    revisions collection once the bars are stored. Rounding only decides what counts as a
+    revision: the upstream values are written as fetched. Cost follows the number of
+    changes, not the history length.
+    """
+
+    def __init__(self, symbol: str = None, interval: str = "1d", exchange: str = None, config: dict = None):
+        if interval not in INTERVAL_MS:
+            raise ValueError(f"Unsupported interval '{interval}'")
+
+        self.logger = LoggerSetup.logger_setup("ReconcileJob")
+        config = config or RECONCILE_CONFIG
+        self.symbol = symbol or DATA_CRAWL_CONFIG.get("symbol", "BTC.D")
+        self.exchange = exchange or "CRYPTOCAP"
+        self.interval = interval
+        self.step_ms = INTERVAL_MS[interval]
+        self.window_bars = config.get("window_bars", {}).get(interval, 30)
+        self.decimals = config.get("compare_decimals", 8)
+
+        self.mongo_client = MongoDBConfig.get_client("bulk")
+        self.collection = get_interval_collection(self.mongo_client, interval)
+        # (s, i, t) index serves the window range scan
+        ensure_bar_indexes(self.collection)
+        self.revisions = self.mongo_client.get_database(DATA_CRAWL_CONFIG.get("db")).get_collection(
+            config.get("revisions_collection", "bar_revisions")
+        )
+        try:
+            self.revisions.create_index(
+                [(F_SYMBOL, ASCENDING), (F_INTERVAL, ASCENDING), (F_TIME, ASCENDING)],
+                name="revision_bar",
+            )
+        except Exception as e:
+            self.logger.error(f"Failed to ensure revisions index: {e}")
+
+        # Price fields of closed candles belong to "historical" in the coordinator
+        self.sink = WriteCoordinator().for_source("historical")
+        self.tv_client = TradingViewClient()
+        self.validator = BarValidator(symbol=self.symbol)
+        self.quarantine = Quarantine()
+
+    def _fetch(self):
+        """Trailing window as (ts int64, (N, 5) OHLCV float64), oldest first"""
+        df = self.tv_client.get_hist(
+            symbol=self.symbol,
+            exchange=self.exchange,
+            interval=tv_interval(self.interval),
+            n_bars=self.window_bars,
+        )
+        if df is None or len(df) == 0:
+            return np.empty(0, dtype=np.int64), np.empty((0, 5))
+        # Same timestamp conversion as the historical extractor, so keys match
+        ts = np.array([int(idx.to_pydatetime().timestamp() * 1000) for idx in df.index], dtype=np.int64)
+        columns = {c.lower(): c for c in df.columns}
+        values = np.column_stack(
+            [
+                df[columns[name]].to_numpy(dtype=float) if name in columns else np.full(len(ts), np.nan)
+                for name in ("open", "high", "low", "close", "volume")
+            ]
+        )
+        order = np.argsort(ts, kind="stable")
+        return ts[order], values[order]
+
+    def load_stored(self, start_ms: int, end_ms: int):
+        """Stored bars in [start_ms, end_ms] as (ts, (N, 5) OHLCV); missing values are NaN"""
+        cursor = self.collection.aggregate(
+            [
+                {
+                    "$match": {
+                        F_SYMBOL: self.symbol,
+                        F_INTERVAL: self.interval,
+                        F_TIME: {"$gte": ms_to_date(start_ms), "$lte": ms_to_date(end_ms)},
+                    }
+                },
+                {"$sort": {F_TIME: ASCENDING}},
+                {"$project": {"_id": 0, "ms": {"$toLong": f"${F_TIME}"}, **{f: 1 for f in OHLCV_FIELDS}}},
+            ]
+        )
+        docs = list(cursor)
+        ts = np.fromiter((d["ms"] for d in docs), dtype=np.int64, count=len(docs))
+        values = np.array([[d.get(f) for f in OHLCV_FIELDS] for d in docs], dtype=np.float64).reshape(-1, 5)
+        return ts, values
+
+    def _record_revisions(self, docs: list):
+        try:
+            self.revisions.insert_many(docs, ordered=False)
+        except Exception as e:
+            self.logger.error(f"Failed to record {len(docs)} revisions of {self.symbol}: {e}")
+
+    def _write(self, ts: np.ndarray, values: np.ndarray, revisions: list):
+        writes = []
+        for t, row in zip(ts.tolist(), values):
+            fields = dict(zip(OHLCV_FIELDS, map(_value, row)))
+            fields[F_SOURCE] = TradingViewSource.name
+            writes.append(
+                BarWrite(self.symbol, self.interval, t, {"$set": fields, "$setOnInsert": {F_VERSION: SCHEMA_VERSION}})
+            )
+        # One submit: the coordinator's next flush stores every changed bar in one bulk write
+        self.sink.submit(writes, on_commit=lambda: self._record_revisions(revisions))
+        return len(writes)
+
+    def _revision_docs(self, kind: str, ts: np.ndarray, new: np.ndarray, old: np.ndarray = None, changed=None):
+        """changed: (N, 5) bool of the fields that differ after rounding (revised bars)"""
+        now = datetime.utcnow()
+        docs = []
+        for k, t in enumerate(ts.tolist()):
+            doc = {
+                F_SYMBOL: self.symbol,
+                F_INTERVAL: self.interval,
+                F_TIME: ms_to_date(t),
+                "kind": kind,
+                "new": dict(zip(OHLCV_FIELDS, map(_value, new[k]))),
+                "r_at": now,
+            }
+            if old is not None:
+                doc["old"] = dict(zip(OHLCV_FIELDS, map(_value, old[k])))
+                doc["fields"] = [f for f, c in zip(OHLCV_FIELDS, changed[k]) if c]
+            docs.append(doc)
+        return docs
+
+    def reconcile(self, now_ms: int = None, dry_run: bool = False):
+        """Fetch, diff and write the revised bars; returns a summary dict"""
+        started = time.perf_counter()
+        now_ms = now_ms if now_ms is not None else int(time.time() * 1000)
+        summary = {"symbol": self.symbol, "interval": self.interval, "fetched": 0, "revised": 0, "added": 0, "rejected": 0}
+
+        ts, values = self._fetch()
+        # The still-forming candle belongs to the realtime feed
+        closed = ts + self.step_ms <= now_ms
+        ts, values = ts[closed], values[closed]
+        summary["fetched"] = len(ts)
+        if not len(ts):
+            self.logger.warning(f"Upstream returned no closed {self.interval} bars for {self.symbol}")
+            return summary
+
+        # Whole window validated at once; a bad upstream row never overwrites a stored bar
+        codes = self.validator.validate(ts, *values.T)
+        if codes.any():
+            rejected = np.flatnonzero(codes)
+            self.quarantine.put(
+                [
+                    (bar_doc(self.symbol, self.interval, int(ts[i]), *map(_value, values[i])), reasons_of(int(codes[i])))
+                    for i in rejected
+                ],
+                "reconcile",
+            )
+            summary["rejected"] = len(rejected)
+            ts, values = ts[codes == 0], values[codes == 0]
+
+        stored_ts, stored = self.load_stored(int(ts[0]), int(ts[-1]))
+        fetched_q = quantize(values, self.decimals)
+        stored_q = quantize(stored, self.decimals)
+        revised, stored_pos, added = diff_bars(stored_ts, stored_q, ts, fetched_q)
+        summary["revised"], summary["added"] = len(revised), len(added)
+        diffed = time.perf_counter()
+
+        changed = np.sort(np.concatenate((revised, added)))
+        if len(changed) and not dry_run:
+            new_q, old_q = fetched_q[revised], stored_q[stored_pos]
+            fields = (new_q != old_q) & ~(np.isnan(new_q) & np.isnan(old_q))
+            docs = self._revision_docs("revised", ts[revised], values[revised], stored[stored_pos], fields)
+            docs += self._revision_docs("added", ts[added], values[added])
+            self._write(ts[changed], values[changed], docs)
+
+        self.logger.info(
+            f"Reconciled {len(ts)} {self.interval} bars of {self.symbol}: {len(revised)} revised, "
+            f"{len(added)} added, {summary['rejected']} rejected "
+            f"(diff {(diffed - started) * 1000:.0f}ms incl. fetch{', dry run' if dry_run else ''})"
+        )
+        return summary
+
+
+def reconcile_symbols(specs: list = None, config: dict = None, dry_run: bool = False):
+    """
+    Reconcile the historical series of every symbol, one after another (the job already
+    runs on the crawl scheduler's pool and every fetch spends the shared rate budget)
+    """
+    config = config or RECONCILE_CONFIG
+    specs = [spec for spec in (specs or crawl_symbols()) if spec.historical]
+    logger = LoggerSetup.logger_setup("ReconcileJob")
+    summaries = []
+    for spec in specs:
+        try:
+            job = ReconcileJob(spec.symbol, spec.interval, spec.exchange, config)
+            summaries.append(job.reconcile(dry_run=dry_run))
+        except Exception as e:
+            logger.error(f"Reconciliation of {spec.symbol} failed: {e}")
+    if len(summaries) < len(specs):
+        raise RuntimeError(f"{len(specs) - len(summaries)} of {len(specs)} symbols failed to reconcile")
+    return summaries
+
+
+def seconds_until_next_run(now: datetime = None, config: dict = None):
+    config = config or RECONCILE_CONFIG
+    now = now or datetime.utcnow()
+    run_at = now.replace(hour=config.get("run_hour_utc", 8), minute=0, second=0, microsecond=0)
+    if run_at <= now:
+        run_at += timedelta(days=1)
+    return (run_at - now).total_seconds()
+
+
+def benchmark(n_bars: int = 100_000, n_revised: int = 25, seed: int = 5):
+    """diff_bars over n_bars with n_revised changed rows; returns (seconds, revised found)"""
+    rng = np.random.default_rng(seed)
+    ts = np.arange(n_bars, dtype=np.int64) * 60000
+    stored = np.column_stack([50 + rng.normal(0, 1, n_bars) for _ in range(4)] + [np.full(n_bars, np.nan)])
+    fetched = stored.copy()
+    fetched[rng.choice(n_bars, n_revised, replace=False), 3] += 0.01
+    started = time.perf_counter()
+    revised, _, _ = diff_bars(ts, quantize(stored, 8), ts, quantize(fetched, 8))
+    return time.perf_counter() - started, len(revised)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rewrite recent bars that upstream revised")
+    parser.add_argument("--symbol", default=None, help="one symbol instead of every configured one")
+    parser.add_argument("--interval", choices=sorted(INTERVAL_MS), default="1d")
+    parser.add_argument("--dry-run", action="store_true", help="only report the differences")
+    parser.add_argument("--benchmark", action="store_true")
+    args = parser.parse_args()
+
+    if args.benchmark:
+        seconds, found = benchmark()
+        print(f"diff: 100,000 bars in {seconds * 1000:.1f} ms, {found} revised rows found")
+    else:
+        if args.symbol:
+            print(ReconcileJob(args.symbol, args.interval).reconcile(dry_run=args.dry_run))
+        else:
+            for summary in reconcile_symbols(dry_run=args.dry_run):
+                print(summary)
+        # Pending writes go out before the process exits
+        WriteCoordinator().stop()
@@ -0,0 +1,263 @@
+import argparse
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from pymongo import ASCENDING
+
+from src.configs.config_interval import (
+    INTERVAL_COLLECTION_KEYS,
+    INTERVAL_MS,
+    get_interval_collection,
+)
+from src.configs.config_mongo import MongoDBConfig
+from src.configs.config_schema import (
+    F_CLOSE,
+    F_HIGH,
+    F_INTERVAL,
+    F_LOW,
+    F_OPEN,
+    F_SYMBOL,
+    F_TIME,
+    F_VERSION,
+    F_VOLUME,
+    SCHEMA_VERSION,
+    date_to_ms,
+    ensure_bar_indexes,
+    ms_to_date,
+)
+from src.configs.config_symbols import crawl_symbols
+from src.configs.config_variable import DERIVED_SERIES_CONFIG, RETENTION_CONFIG
+from src.log.logger_setup import LoggerSetup
+
+DAY_MS = INTERVAL_MS["1d"]
+
+
+def retention_cutoff_ms(keep_days, now_ms: int):
+    """
+    Bars older than this are pruned. Aligned to whole days so a downsampled hour/day
+    bucket is never cut in half
+    """
+    return ((now_ms - int(keep_days * DAY_MS)) // DAY_MS) * DAY_MS
+
+
+def retention_symbols(specs: list = None, derived_config: dict = None):
+    """Every symbol that writes bars: the crawled ones plus the derived series when enabled"""
+    derived_config = derived_config or DERIVED_SERIES_CONFIG
+    symbols = [spec.symbol for spec in (specs or crawl_symbols())]
+    if derived_config.get("enabled", False):
+        symbols += list(derived_config.get("series", {}))
+    return list(dict.fromkeys(symbols))
+
+
+def delete_in_batches(collection, query: dict, batch_size: int, pause_seconds: float, logger=None, key: str = "_id"):
+    """
+    Delete matching docs by bounded batches instead of one blocking delete_many,
+    sleeping between batches so production writes keep their latency.
+    Batches walk `key` in order and resume after the last deleted value, so each batch
+    reads only its own docs. `key` must be unique among the matched docs: `_id`, or `t`
+    when the query pins one (s, i) of the unique (s, i, t) index.
+    """
+    deleted = 0
+    last = None
+    while True:
+        batch_query = dict(query)
+        if last is not None:
+            batch_query[key] = dict(query.get(key, {}), **{"$gt": last})
+        docs = list(collection.find(batch_query, {"_id": 1, key: 1}).sort(key, ASCENDING).limit(batch_size))
+        if not docs:
+            break
+        deleted += collection.delete_many({"_id": {"$in": [d["_id"] for d in docs]}}).deleted_count
+        last = docs[-1][key]
+        if logger:
+            logger.debug(f"Deleted batch of {len(docs)} docs ({deleted} total)")
+        if len(docs) < batch_size:
+            break
+        time.sleep(pause_seconds)
+    return deleted
+
+
+def build_downsample_pipeline(symbol: str, source_interval: str, start_ms: int, end_ms: int, target_interval: str, target_name: str, overwrite: bool):
+    """Server-side OHLCV rollup of [start_ms, end_ms) into target_interval buckets, merged into target_name"""
+    bucket_ms = INTERVAL_MS[target_interval]
+    ms = {"$toLong": f"${F_TIME}"}
+    return [
+        {
+            "$match": {
+                F_SYMBOL: symbol,
+                F_INTERVAL: source_interval,
+                F_TIME: {"$gte": ms_to_date(start_ms), "$lt": ms_to_date(end_ms)},
+            }
+        },
+        {"$sort": {F_TIME: 1}},
+        {
+            "$group": {
+                "_id": {"$subtract": [ms, {"$mod": [ms, bucket_ms]}]},
+                F_OPEN: {"$first": f"${F_OPEN}"},
+                F_HIGH: {"$max": f"${F_HIGH}"},
+                F_LOW: {"$min": f"${F_LOW}"},
+                F_CLOSE: {"$last": f"${F_CLOSE}"},
+                # Volume traded in the bucket; missing minute volumes count as 0
+                F_VOLUME: {"$sum": f"${F_VOLUME}"},
+            }
+        },
+        {
+            "$project": {
+                "_id": 0,
+                F_SYMBOL: {"$literal": symbol},
+                F_INTERVAL: {"$literal": target_interval},
+                F_TIME: {"$toDate": "$_id"},
+                F_OPEN: 1,
+                F_HIGH: 1,
+                F_LOW: 1,
+                F_CLOSE: 1,
+                F_VOLUME: 1,
+                F_VERSION: {"$literal": SCHEMA_VERSION},
+            }
+        },
+        {
+            "$merge": {
+                "into": target_name,
+                "on": [F_SYMBOL, F_INTERVAL, F_TIME],
+                "whenMatched": "merge" if overwrite else "keepExisting",
+                "whenNotMatched": "insert",
+            }
+        },
+    ]
+
+
+class RetentionJob:
+    """
+    Applies RETENTION_CONFIG to every symbol's bars: old bars are rolled up into the
+    coarser intervals first, then pruned in throttled batches (or expired by a TTL index).
+    """
+
+    def __init__(self, policies: dict = None, symbols: list = None):
+        self.logger = LoggerSetup.logger_setup("RetentionJob")
+        self.mongo_client = MongoDBConfig.get_client("bulk")
+        self.policies = policies or RETENTION_CONFIG.get("policies", {})
+        self.batch_size = RETENTION_CONFIG.get("delete_batch_size", 5000)
+        self.pause_seconds = RETENTION_CONFIG.get("delete_pause_seconds", 0.2)
+        self.symbols = symbols or retention_symbols()
+
+    def ensure_ttl_index(self, interval: str, ttl_field: str, keep_days):
+        """TTL only works on BSON Date fields such as "t"; other policies fall back to batched pruning"""
+        collection = get_interval_collection(self.mongo_client, interval)
+        collection.create_index(
+            [(ttl_field, ASCENDING)],
+            expireAfterSeconds=int(keep_days * 24 * 60 * 60),
+            name=f"ttl_{ttl_field}",
+        )
+        self.logger.info(f"TTL index on {collection.name}.{ttl_field} = {keep_days} days")
+
+    def downsample(self, symbol: str, source_interval: str, target_interval: str, end_ms: int):
+        source = get_interval_collection(self.mongo_client, source_interval)
+        target = get_interval_collection(self.mongo_client, target_interval)
+        # $merge needs a unique index on the "on" fields of the target
+        ensure_bar_indexes(target)
+
+        oldest = source.find_one(
+            {F_SYMBOL: symbol, F_INTERVAL: source_interval, F_TIME: {"$lt": ms_to_date(end_ms)}},
+            {"_id": 0, F_TIME: 1},
+            sort=[(F_TIME, ASCENDING)],
+        )
+        if not oldest:
+            return False
+
+        bucket_ms = INTERVAL_MS[target_interval]
+        start_ms = (date_to_ms(oldest[F_TIME]) // bucket_ms) * bucket_ms
+        # The daily collection is filled from TradingView daily candles; only fill its holes
+        overwrite = target_interval != "1d"
+        source.aggregate(
+            build_downsample_pipeline(
+                symbol, source_interval, start_ms, end_ms, target_interval, target.name, overwrite
+            ),
+            allowDiskUse=True,
+        )
+        self.logger.info(
+            f"Downsampled {symbol} {source.name} -> {target.name} up to t={ms_to_date(end_ms)} "
+            f"(overwrite={overwrite})"
+        )
+        return True
+
+    def prune(self, symbol: str, interval: str, cutoff_ms: int):
+        collection = get_interval_collection(self.mongo_client, interval)
+        deleted = delete_in_batches(
+            collection,
+            {F_SYMBOL: symbol, F_INTERVAL: interval, F_TIME: {"$lt": ms_to_date(cutoff_ms)}},
+            self.batch_size,
+            self.pause_seconds,
+            self.logger,
+            key=F_TIME,
+        )
+        self.logger.info(
+            f"Pruned {deleted} {symbol} docs older than t={ms_to_date(cutoff_ms)} from {collection.name}"
+        )
+        return deleted
+
+    def apply_policy(self, interval: str, policy: dict, now_ms: int):
+        keep_days = policy.get("keep_days")
+        if keep_days is None:
+            return 0
+
+        ttl_field = policy.get("ttl_field")
+        if ttl_field and policy.get("downsample_to"):
+            # The TTL monitor could expire raw bars before they are rolled up
+            self.logger.error(
+                f"Retention policy for {interval}: ttl_field cannot be combined with downsample_to, "
+                f"using batched pruning after the downsample instead"
+            )
+            ttl_field = None
+        if ttl_field:
+            self.ensure_ttl_index(interval, ttl_field, keep_days)
+
+        cutoff_ms = retention_cutoff_ms(keep_days, now_ms)
+        deleted = 0
+        for symbol in self.symbols:
+            for target in policy.get("downsample_to", []):
+                self.downsample(symbol, interval, target, cutoff_ms)
+            if not ttl_field:
+                deleted += self.prune(symbol, interval, cutoff_ms)
+        # With a TTL index Mongo's TTL monitor removes expired docs itself
+        return deleted
+
+    def run(self, now_ms: int = None):
+        now_ms = now_ms if now_ms is not None else int(time.time() * 1000)
+        total = 0
+        failed = []
+        # Finest intervals first so their rollups exist before coarser policies prune
+        for interval in sorted(self.policies, key=lambda i: INTERVAL_MS[i]):
+            try:
+                total += self.apply_policy(interval, self.policies[interval], now_ms)
+            except Exception as e:
+                failed.append(interval)
+                self.logger.error(f"Retention failed for interval {interval}: {e}")
+        if failed:
+            raise RuntimeError(f"Retention failed for intervals {failed}")
+        return total
+
+
+def seconds_until_next_run(now: datetime = None, config: dict = None):
+    config = config or RETENTION_CONFIG
+    now = now or datetime.utcnow()
+    run_at = now.replace(hour=config.get("run_hour_utc", 3), minute=0, second=0, microsecond=0)
+    if run_at <= now:
+        run_at += timedelta(days=1)
+    return (run_at - now).total_seconds()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Apply retention policies")
+    parser.add_argument("--interval", choices=sorted(INTERVAL_COLLECTION_KEYS), default=None)
+    parser.add_argument("--symbol", default=None, help="one symbol instead of every crawled one")
+    args = parser.parse_args()
+
+    job = RetentionJob(symbols=[args.symbol] if args.symbol else None)
+    if args.interval:
+        policy = job.policies.get(args.interval, {})
+        job.apply_policy(args.interval, policy, int(time.time() * 1000))
+    else:
+        job.run()
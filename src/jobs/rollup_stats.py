@@ -0,0 +1,541 @@
+import argparse
+import math
+import os
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from pymongo import ASCENDING, DESCENDING, UpdateOne
+from pymongo.errors import BulkWriteError
+
+from src.configs.config_interval import INTERVAL_MS, get_interval_collection
+from src.configs.config_mongo import MongoDBConfig
+from src.configs.config_schema import (
+    F_CLOSE,
+    F_HIGH,
+    F_INTERVAL,
+    F_LOW,
+    F_OPEN,
+    F_SYMBOL,
+    F_TIME,
+    F_VERSION,
+    SCHEMA_VERSION,
+    date_to_ms,
+    doc_ms,
+    ms_to_date,
+)
+from src.configs.config_symbols import crawl_symbols, interval_specs
+from src.configs.config_variable import DATA_CRAWL_CONFIG, DERIVED_SERIES_CONFIG, ROLLUP_STATS_CONFIG
+from src.log.logger_setup import LoggerSetup
+from src.publish.bar_bus import BarBus
+
+# Stats document: {"s", "p": period, "t": period start (Date, UTC), "o", "c", "h", "l",
+#  "n": bars, "sc": sum of closes, "nr": log returns, "sr2": sum of squared log returns,
+#  "lt": last bar folded in (Date), "_v"}; mean = sc / n, realized vol = sqrt(sr2)
+F_PERIOD = "p"
+F_COUNT = "n"
+F_SUM_CLOSE = "sc"
+F_RETURNS = "nr"
+F_SUM_SQ_RETURNS = "sr2"
+F_LAST_BAR = "lt"
+
+DAY_MS = INTERVAL_MS["1d"]
+WEEK_MS = 7 * DAY_MS
+# 1970-01-05 was a Monday: weeks start on Monday like $dateTrunc(startOfWeek="monday")
+_MONDAY_MS = 4 * DAY_MS
+
+
+def period_start(ts_ms: int, period: str):
+    """UTC start (epoch ms) of the day / week / month containing ts_ms"""
+    if period == "day":
+        return ts_ms - ts_ms % DAY_MS
+    if period == "week":
+        return ts_ms - (ts_ms - _MONDAY_MS) % WEEK_MS
+    if period == "month":
+        dt = ms_to_date(ts_ms)
+        return date_to_ms(datetime(dt.year, dt.month, 1))
+    raise ValueError(f"Unsupported period '{period}'")
+
+
+def next_period_start(ts_ms: int, period: str):
+    start = period_start(ts_ms, period)
+    if period == "month":
+        dt = ms_to_date(start)
+        return date_to_ms(datetime(dt.year + dt.month // 12, dt.month % 12 + 1, 1))
+    return start + (WEEK_MS if period == "week" else DAY_MS)
+
+
+def rollup_symbols(specs: list = None, config: dict = None, derived_config: dict = None):
+    """Symbols with source_interval bars: the crawled series of that interval plus derived ones"""
+    config = config or ROLLUP_STATS_CONFIG
+    derived_config = derived_config or DERIVED_SERIES_CONFIG
+    source_interval = config.get("source_interval", "1m")
+    symbols = [spec.symbol for spec in interval_specs(specs or crawl_symbols(), source_interval)]
+    if derived_config.get("enabled", False) and derived_config.get("interval", "1m") == source_interval:
+        symbols += list(derived_config.get("series", {}))
+    return list(dict.fromkeys(symbols))
+
+
+def fold_ops(folds: dict, version: int = SCHEMA_VERSION):
+    """
+    One upsert per stats document from the folds {(symbol, period, start ms): fold} of
+    a flush, so ops of one document never race inside an unordered bulk write. The
+    update only applies while the document's "lt" is older than the fold's first bar:
+    otherwise it matches nothing, the upsert hits the unique key and the fold is skipped.
+    """
+    ops = []
+    for (symbol, period, start_ms), fold in folds.items():
+        inc = {F_COUNT: fold[F_COUNT], F_SUM_CLOSE: fold[F_SUM_CLOSE]}
+        if fold[F_RETURNS]:
+            inc.update({F_RETURNS: fold[F_RETURNS], F_SUM_SQ_RETURNS: fold[F_SUM_SQ_RETURNS]})
+        update = {
+            "$inc": inc,
+            "$set": {F_CLOSE: fold[F_CLOSE]},
+            "$max": {F_LAST_BAR: ms_to_date(fold["last_ts"])},
+            "$setOnInsert": {F_OPEN: fold[F_OPEN], F_VERSION: version},
+        }
+        if fold[F_HIGH] is not None:
+            update["$max"][F_HIGH] = fold[F_HIGH]
+        if fold[F_LOW] is not None:
+            update["$min"] = {F_LOW: fold[F_LOW]}
+        ops.append(
+            UpdateOne(
+                {
+                    F_SYMBOL: symbol,
+                    F_PERIOD: period,
+                    F_TIME: ms_to_date(start_ms),
+                    F_LAST_BAR: {"$not": {"$gte": ms_to_date(fold["first_ts"])}},
+                },
+                update,
+                upsert=True,
+            )
+        )
+    return ops
+
+
+def stats_collection(mongo_client, config: dict = None):
+    config = config or ROLLUP_STATS_CONFIG
+    return mongo_client.get_database(DATA_CRAWL_CONFIG.get("db")).get_collection(
+        config.get("collection", "bar_stats")
+    )
+
+
+def ensure_stats_indexes(collection):
+    # Unique key: O(1) lookups, the incremental updater's idempotency guard and $merge "on"
+    collection.create_index(
+        [(F_SYMBOL, ASCENDING), (F_PERIOD, ASCENDING), (F_TIME, ASCENDING)],
+        unique=True,
+        name="stats_key",
+    )
+
+
+def stats_view(doc: dict):
+    """Analytics fields of one stats document"""
+    n, o, c = doc.get(F_COUNT) or 0, doc.get(F_OPEN), doc.get(F_CLOSE)
+    return {
+        "symbol": doc[F_SYMBOL],
+        "period": doc[F_PERIOD],
+        "start": doc[F_TIME],
+        "bars": n,
+        "open": o,
+        "close": c,
+        "min": doc.get(F_LOW),
+        "max": doc.get(F_HIGH),
+        "mean": doc[F_SUM_CLOSE] / n if n else None,
+        "realized_vol": math.sqrt(doc.get(F_SUM_SQ_RETURNS) or 0.0) if doc.get(F_RETURNS) else None,
+        "change": c - o if o is not None and c is not None else None,
+        "change_pct": (c - o) / o * 100 if o and c is not None else None,
+    }
+
+
+def build_rollup_pipeline(symbol: str, source_interval: str, period_starts: dict, end_ms: int, target_name: str):
+    """
+    Server-side rebuild of the stats of every period in period_starts {period: first
+    bucket start} up to end_ms, from the source bars; merged into target_name by (s, p, t).
+    Needs MongoDB 5.0+ ($setWindowFields, $dateTrunc).
+    """
+    step_ms = INTERVAL_MS[source_interval]
+    # One bar before the range so the first return has its previous close
+    start_ms = min(period_starts.values()) - step_ms
+    buckets = []
+    for period in period_starts:
+        trunc = {"date": f"${F_TIME}", "unit": period}
+        if period == "week":
+            trunc["startOfWeek"] = "monday"
+        buckets.append({F_PERIOD: period, F_TIME: {"$dateTrunc": trunc}})
+    return [
+        {
+            "$match": {
+                F_SYMBOL: symbol,
+                F_INTERVAL: source_interval,
+                # Closed bars only, like the updater which folds a bar once the next one commits
+                F_TIME: {"$gte": ms_to_date(start_ms), "$lte": ms_to_date(end_ms - step_ms)},
+                F_CLOSE: {"$ne": None},
+            }
+        },
+        {
+            "$setWindowFields": {
+                "sortBy": {F_TIME: 1},
+                "output": {"pc": {"$shift": {"output": f"${F_CLOSE}", "by": -1}}},
+            }
+        },
+        {
+            "$set": {
+                "r": {
+                    "$cond": [
+                        {"$and": [{"$gt": ["$pc", 0]}, {"$gt": [f"${F_CLOSE}", 0]}]},
+                        {"$ln": {"$divide": [f"${F_CLOSE}", "$pc"]}},
+                        None,
+                    ]
+                },
+                "b": buckets,
+            }
+        },
+        {"$unwind": "$b"},
+        # Only whole periods of the range are replaced
+        {
+            "$match": {
+                "$or": [
+                    {f"b.{F_PERIOD}": period, f"b.{F_TIME}": {"$gte": ms_to_date(start)}}
+                    for period, start in period_starts.items()
+                ]
+            }
+        },
+        {"$sort": {F_TIME: 1}},
+        {
+            "$group": {
+                "_id": {F_PERIOD: f"$b.{F_PERIOD}", F_TIME: f"$b.{F_TIME}"},
+                F_OPEN: {"$first": f"${F_OPEN}"},
+                F_CLOSE: {"$last": f"${F_CLOSE}"},
+                F_HIGH: {"$max": f"${F_HIGH}"},
+                F_LOW: {"$min": f"${F_LOW}"},
+                F_COUNT: {"$sum": 1},
+                F_SUM_CLOSE: {"$sum": f"${F_CLOSE}"},
+                F_RETURNS: {"$sum": {"$cond": [{"$eq": ["$r", None]}, 0, 1]}},
+                F_SUM_SQ_RETURNS: {"$sum": {"$multiply": ["$r", "$r"]}},
+                F_LAST_BAR: {"$max": f"${F_TIME}"},
+            }
+        },
+        {
+            "$project": {
+                "_id": 0,
+                F_SYMBOL: {"$literal": symbol},
+                F_PERIOD: f"$_id.{F_PERIOD}",
+                F_TIME: f"$_id.{F_TIME}",
+                F_OPEN: 1,
+                F_CLOSE: 1,
+                F_HIGH: 1,
+                F_LOW: 1,
+                F_COUNT: 1,
+                F_SUM_CLOSE: 1,
+                F_RETURNS: 1,
+                F_SUM_SQ_RETURNS: 1,
+                F_LAST_BAR: 1,
+                F_VERSION: {"$literal": SCHEMA_VERSION},
+            }
+        },
+        {
+            "$merge": {
+                "into": target_name,
+                "on": [F_SYMBOL, F_PERIOD, F_TIME],
+                "whenMatched": "replace",
+                "whenNotMatched": "insert",
+            }
+        },
+    ]
+
+
+class RollupStatsUpdater:
+    """
+    Keeps the stats collection current as bars commit: subscribes to the BarBus, holds
+    each symbol's latest (still revisable) bar in memory and folds it into every period
+    once a newer bar arrives. Folds of one stats document are combined in memory and
+    written by the updater's own thread as one $inc/$min/$max upsert per document and
+    flush (publish() must not block). Each update only applies while its bars are newer
+    than the document's "lt", so replays and restarts never count a bar twice. The last
+    folded bar of every crawled symbol is loaded in start(), before bars arrive.
+    """
+
+    def __init__(self, config: dict = None, symbols: list = None):
+        self.logger = LoggerSetup.logger_setup("RollupStatsUpdater")
+        config = config or ROLLUP_STATS_CONFIG
+        self.symbols = symbols or rollup_symbols(config=config)
+        self.source_interval = config.get("source_interval", "1m")
+        self.step_ms = INTERVAL_MS[self.source_interval]
+        self.periods = config.get("periods", ["day", "week", "month"])
+        self.flush_seconds = config.get("flush_seconds", 5)
+        self.flush_batch = config.get("flush_batch", 300)
+
+        self.mongo_client = MongoDBConfig.get_client("realtime")
+        self.collection = stats_collection(self.mongo_client, config)
+        try:
+            ensure_stats_indexes(self.collection)
+        except Exception as e:
+            self.logger.error(f"Failed to ensure stats index: {e}")
+
+        self.bus = BarBus()
+        self._subscription = None
+        # symbol -> {"bar": (ts, o, h, l, c) not folded yet, "last_ts", "last_close"}
+        self._state = {}
+        # (symbol, period, period start ms) -> fold of the bars since the last flush
+        self._folds = {}
+        self._pending_bars = 0
+        # symbol -> bars received before its state was loaded
+        self._unloaded = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self.running = False
+        self.thread = None
+        self.folded = 0
+        self.skipped = 0
+
+    def _load_state(self, symbol: str):
+        """Last folded bar of a symbol, so a restart neither re-counts nor loses a return"""
+        state = {"bar": None, "last_ts": None, "last_close": None}
+        try:
+            doc = self.collection.find_one(
+                {F_SYMBOL: symbol, F_PERIOD: self.periods[0]},
+                {"_id": 0, F_LAST_BAR: 1, F_CLOSE: 1},
+                sort=[(F_TIME, DESCENDING)],
+            )
+            if doc and doc.get(F_LAST_BAR) is not None:
+                state["last_ts"] = date_to_ms(doc[F_LAST_BAR])
+                state["last_close"] = doc.get(F_CLOSE)
+        except Exception as e:
+            self.logger.error(f"Failed to load stats state of {symbol}: {e}")
+        return state
+
+    def _fold_bar(self, symbol: str, bar: tuple, prev_close):
+        """Add one final bar to the pending fold of every period (caller holds the lock)"""
+        ts, o, h, l, c = bar
+        r = None
+        if prev_close and prev_close > 0 and c > 0:
+            r = math.log(c / prev_close)
+        for period in self.periods:
+            key = (symbol, period, period_start(ts, period))
+            fold = self._folds.get(key)
+            if fold is None:
+                fold = self._folds[key] = {
+                    "first_ts": ts, F_OPEN: o if o is not None else c, F_HIGH: None, F_LOW: None,
+                    F_COUNT: 0, F_SUM_CLOSE: 0.0, F_RETURNS: 0, F_SUM_SQ_RETURNS: 0.0,
+                }
+            fold["last_ts"], fold[F_CLOSE] = ts, c
+            if h is not None:
+                fold[F_HIGH] = h if fold[F_HIGH] is None else max(fold[F_HIGH], h)
+            if l is not None:
+                fold[F_LOW] = l if fold[F_LOW] is None else min(fold[F_LOW], l)
+            fold[F_COUNT] += 1
+            fold[F_SUM_CLOSE] += c
+            if r is not None:
+                fold[F_RETURNS] += 1
+                fold[F_SUM_SQ_RETURNS] += r * r
+        self._pending_bars += 1
+
+    def _observe_bar(self, symbol: str, bar: tuple):
+        """Track one committed bar of a loaded symbol (caller holds the lock)"""
+        state = self._state[symbol]
+        pending = state["bar"]
+        if state["last_ts"] is not None and bar[0] <= state["last_ts"]:
+            # Revision of a bar already folded in; the rebuild picks it up
+            return
+        if pending is not None and bar[0] > pending[0]:
+            # A newer bar committed: the pending one is final
+            self._fold_bar(symbol, pending, state["last_close"])
+            state["last_ts"], state["last_close"] = pending[0], pending[4]
+            self.folded += 1
+        if pending is None or bar[0] >= pending[0]:
+            state["bar"] = bar
+
+    def observe(self, doc: dict):
+        """BarBus callback: in-memory only, the reads and writes happen on the updater thread"""
+        if doc.get(F_INTERVAL) != self.source_interval or doc.get(F_CLOSE) is None:
+            return
+        symbol = doc[F_SYMBOL]
+        bar = (doc_ms(doc), doc.get(F_OPEN), doc.get(F_HIGH), doc.get(F_LOW), doc[F_CLOSE])
+        with self._lock:
+            if symbol not in self._state:
+                # Not preloaded in start() (e.g. a replay): held until the updater loads its state
+                self._unloaded.setdefault(symbol, []).append(bar)
+                full = True
+            else:
+                self._observe_bar(symbol, bar)
+                full = self._pending_bars >= self.flush_batch
+        if full:
+            self._wake.set()
+
+    def _load_unloaded(self):
+        with self._lock:
+            symbols = list(self._unloaded)
+        for symbol in symbols:
+            state = self._load_state(symbol)
+            with self._lock:
+                self._state[symbol] = state
+                for bar in self._unloaded.pop(symbol, []):
+                    self._observe_bar(symbol, bar)
+
+    def flush(self):
+        if self._unloaded:
+            self._load_unloaded()
+        with self._lock:
+            folds, self._folds = self._folds, {}
+            self._pending_bars = 0
+        if not folds:
+            return 0
+        ops = fold_ops(folds)
+        try:
+            # One op per stats document, so the order between them does not matter
+            self.collection.bulk_write(ops, ordered=False)
+        except BulkWriteError as e:
+            errors = e.details.get("writeErrors", [])
+            duplicates = sum(1 for err in errors if err.get("code") == 11000)
+            self.skipped += duplicates
+            if duplicates < len(errors):
+                self.logger.error(f"Failed to write {len(errors) - duplicates} stats updates: {errors[0]}")
+        except Exception as e:
+            self.logger.error(f"Failed to write {len(ops)} stats updates: {e}")
+            return 0
+        return len(ops)
+
+    def _run_loop(self):
+        while self.running:
+            self._wake.wait(self.flush_seconds)
+            self._wake.clear()
+            self.flush()
+
+    def preload(self):
+        """Last folded bar of every known symbol, read before subscribing"""
+        for symbol in self.symbols:
+            if symbol not in self._state:
+                self._state[symbol] = self._load_state(symbol)
+        return len(self._state)
+
+    def start(self):
+        if self.running:
+            return True
+        self.running = True
+        self.preload()
+        self._subscription = self.bus.subscribe(self.observe)
+        self.thread = threading.Thread(target=self._run_loop, name="rollup-stats")
+        self.thread.daemon = True
+        self.thread.start()
+        self.logger.info(f"Rollup stats updater started ({self.periods} of {self.source_interval} bars)")
+        return True
+
+    def stop(self):
+        self.running = False
+        if self._subscription is not None:
+            self.bus.unsubscribe(self._subscription)
+            self._subscription = None
+        self._wake.set()
+        if self.thread and self.thread.is_alive():
+            self.thread.join(timeout=2)
+        self.flush()
+        self.logger.info(f"Rollup stats updater stopped ({self.folded} bars folded, {self.skipped} already counted)")
+
+
+class RollupStatsJob:
+    """Rebuild (one aggregation pushed to the server) and O(1) lookups of the stats collection"""
+
+    def __init__(self, symbol: str, config: dict = None):
+        self.logger = LoggerSetup.logger_setup("RollupStatsJob")
+        config = config or ROLLUP_STATS_CONFIG
+        self.symbol = symbol
+        self.source_interval = config.get("source_interval", "1m")
+        self.periods = config.get("periods", ["day", "week", "month"])
+        self.lookback_days = config.get("rebuild_lookback_days", 30)
+
+        self.mongo_client = MongoDBConfig.get_client("bulk")
+        self.source = get_interval_collection(self.mongo_client, self.source_interval)
+        self.collection = stats_collection(self.mongo_client, config)
+        ensure_stats_indexes(self.collection)
+
+    def rebuild(self, start_ms: int = None, end_ms: int = None):
+        """Recompute every whole period between start_ms and end_ms from the source bars"""
+        end_ms = end_ms if end_ms is not None else int(time.time() * 1000)
+        if start_ms is None:
+            start_ms = end_ms - self.lookback_days * DAY_MS
+        # A period partly before start_ms keeps its stored stats (its bars may be pruned)
+        period_starts = {
+            period: start_ms if period_start(start_ms, period) == start_ms else next_period_start(start_ms, period)
+            for period in self.periods
+        }
+        period_starts = {p: s for p, s in period_starts.items() if s < end_ms}
+        if not period_starts:
+            self.logger.warning("No whole period in the rebuild range")
+            return False
+
+        started = time.perf_counter()
+        self.source.aggregate(
+            build_rollup_pipeline(self.symbol, self.source_interval, period_starts, end_ms, self.collection.name),
+            allowDiskUse=True,
+        )
+        self.logger.info(
+            f"Rebuilt {self.symbol} stats for {sorted(period_starts)} from {self.source.name} "
+            f"since {ms_to_date(min(period_starts.values()))} in {time.perf_counter() - started:.2f}s"
+        )
+        return True
+
+    def get(self, period: str, ts_ms: int):
+        """Stats of the period containing ts_ms (one indexed lookup)"""
+        doc = self.collection.find_one(
+            {F_SYMBOL: self.symbol, F_PERIOD: period, F_TIME: ms_to_date(period_start(ts_ms, period))},
+            {"_id": 0},
+        )
+        return stats_view(doc) if doc else None
+
+    def latest(self, period: str, limit: int = 30):
+        """The last `limit` periods, newest first"""
+        cursor = (
+            self.collection.find({F_SYMBOL: self.symbol, F_PERIOD: period}, {"_id": 0})
+            .sort(F_TIME, DESCENDING)
+            .limit(limit)
+        )
+        return [stats_view(doc) for doc in cursor]
+
+
+def rebuild_symbols(symbols: list = None, config: dict = None, start_ms: int = None, end_ms: int = None):
+    """Rebuild the stats of every symbol, one after another; corrects revised or repaired bars"""
+    config = config or ROLLUP_STATS_CONFIG
+    symbols = symbols or rollup_symbols(config=config)
+    logger = LoggerSetup.logger_setup("RollupStatsJob")
+    failed = []
+    for symbol in symbols:
+        try:
+            RollupStatsJob(symbol, config).rebuild(start_ms=start_ms, end_ms=end_ms)
+        except Exception as e:
+            failed.append(symbol)
+            logger.error(f"Stats rebuild of {symbol} failed: {e}")
+    if failed:
+        raise RuntimeError(f"Stats rebuild failed for {failed}")
+    return len(symbols)
+
+
+def seconds_until_next_run(now: datetime = None, config: dict = None):
+    config = config or ROLLUP_STATS_CONFIG
+    now = now or datetime.utcnow()
+    run_at = now.replace(hour=config.get("rebuild_hour_utc", 9), minute=0, second=0, microsecond=0)
+    if run_at <= now:
+        run_at += timedelta(days=1)
+    return (run_at - now).total_seconds()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild or show the per-period bar stats")
+    parser.add_argument("--symbol", default=None, help="one symbol instead of every crawled one")
+    parser.add_argument("--rebuild", action="store_true")
+    parser.add_argument("--days", type=float, default=None, help="rebuild lookback window in days")
+    parser.add_argument("--period", choices=["day", "week", "month"], default="day")
+    parser.add_argument("--limit", type=int, default=10)
+    args = parser.parse_args()
+
+    symbols = [args.symbol] if args.symbol else rollup_symbols()
+    if args.rebuild:
+        end = int(time.time() * 1000)
+        start = None if args.days is None else end - int(args.days * DAY_MS)
+        rebuild_symbols(symbols, start_ms=start, end_ms=end)
+    for symbol in symbols:
+        for row in RollupStatsJob(symbol).latest(args.period, args.limit):
+            print(row)
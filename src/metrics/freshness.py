@@ -0,0 +1,100 @@
+import os
+import sys
+import threading
+from collections import deque
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from src.configs.config_variable import FRESHNESS_CONFIG
+
+MINUTE_MS = 60 * 1000
+
+STAGES = ("upstream_to_fetch", "fetch_to_commit", "end_to_end")
+
+
+class FreshnessTracker:
+    """
+    How stale bars are when they land, per symbol.
+
+    Every bar carries three timestamps: its upstream close (open time + interval), the
+    end of the fetch that returned it (Bar.fetched_ms) and the storage commit. A bar is
+    sampled once, the first time it is committed after closing: the open bar is still
+    moving, and catch-up bars older than catchup_cutoff_seconds say "outage", not latency.
+    """
+
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    # Singleton instance
+    def __new__(cls):
+        with cls._instance_lock:
+            if cls._instance is None:
+                cls._instance = super().__new__(cls)
+                cls._instance._init_tracker()
+        return cls._instance
+
+    def _init_tracker(self, config: dict = None):
+        config = config or FRESHNESS_CONFIG
+        self.window = config.get("window", 120)
+        self.catchup_cutoff_ms = config.get("catchup_cutoff_seconds", 600) * 1000
+        # symbol -> {"last_ts": newest sampled bar, stage: deque of seconds}
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def record(self, symbol: str, bar_ts_ms: int, fetched_ms: int, committed_ms: int, interval_ms: int = MINUTE_MS):
+        """Sample one committed bar; returns True when it counted"""
+        if fetched_ms is None:
+            return False
+        close_ms = bar_ts_ms + interval_ms
+        if close_ms > fetched_ms or fetched_ms - close_ms > self.catchup_cutoff_ms:
+            return False
+        with self._lock:
+            series = self._series.get(symbol)
+            if series is None:
+                series = {"last_ts": None}
+                series.update({stage: deque(maxlen=self.window) for stage in STAGES})
+                self._series[symbol] = series
+            if series["last_ts"] is not None and bar_ts_ms <= series["last_ts"]:
+                return False
+            series["last_ts"] = bar_ts_ms
+            series["upstream_to_fetch"].append((fetched_ms - close_ms) / 1000)
+            series["fetch_to_commit"].append((committed_ms - fetched_ms) / 1000)
+            series["end_to_end"].append((committed_ms - close_ms) / 1000)
+        return True
+
+    def _samples(self, symbol: str, stage: str):
+        with self._lock:
+            series = self._series.get(symbol)
+            return np.fromiter(series[stage], dtype=np.float64) if series else np.empty(0)
+
+    def percentiles(self, symbol: str):
+        """{stage: {p50_s, p95_s, p99_s, count}} of one symbol"""
+        out = {}
+        for stage in STAGES:
+            samples = self._samples(symbol, stage)
+            if not len(samples):
+                continue
+            p50, p95, p99 = np.percentile(samples, [50, 95, 99])
+            out[stage] = {"p50_s": float(p50), "p95_s": float(p95), "p99_s": float(p99), "count": len(samples)}
+        return out
+
+    def symbols(self):
+        with self._lock:
+            return list(self._series)
+
+    def stats(self):
+        return {symbol: self.percentiles(symbol) for symbol in self.symbols()}
+
+    def breaches(self, slo_seconds: float, percentile: float = 95, min_samples: int = 20):
+        """[(symbol, p<percentile> end-to-end seconds, samples)] over the SLO"""
+        out = []
+        for symbol in self.symbols():
+            samples = self._samples(symbol, "end_to_end")
+            if len(samples) < min_samples:
+                continue
+            value = float(np.percentile(samples, percentile))
+            if value > slo_seconds:
+                out.append((symbol, value, len(samples)))
+        return out
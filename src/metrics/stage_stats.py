@@ -0,0 +1,42 @@
+from collections import deque
+
+import numpy as np
+
+
+class StageStats:
+    """Throughput, latency and drop/error counters of one processing stage"""
+
+    __slots__ = ("count", "total_s", "max_s", "dropped", "errors", "samples")
+
+    def __init__(self, sample_size: int = 0):
+        self.count = 0
+        self.total_s = 0.0
+        self.max_s = 0.0
+        self.dropped = 0
+        self.errors = 0
+        # Latest latencies kept for percentiles (bounded, so memory stays flat)
+        self.samples = deque(maxlen=sample_size) if sample_size else None
+
+    def record(self, seconds: float, n: int = 1):
+        self.count += n
+        self.total_s += seconds
+        if seconds > self.max_s:
+            self.max_s = seconds
+        if self.samples is not None:
+            self.samples.append(seconds)
+
+    def as_dict(self, uptime_s: float):
+        out = {
+            "count": self.count,
+            "per_sec": self.count / uptime_s if uptime_s > 0 else 0.0,
+            "avg_ms": self.total_s / self.count * 1000 if self.count else 0.0,
+            "max_ms": self.max_s * 1000,
+            "dropped": self.dropped,
+            "errors": self.errors,
+        }
+        if self.samples:
+            p50, p95, p99 = np.percentile(np.fromiter(self.samples, dtype=np.float64), [50, 95, 99])
+            out.update(
+                {"p50_ms": float(p50) * 1000, "p95_ms": float(p95) * 1000, "p99_ms": float(p99) * 1000}
+            )
+        return out
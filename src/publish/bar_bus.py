@@ -0,0 +1,60 @@
+import itertools
+import os
+import sys
+import threading
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from src.configs.config_schema import F_INTERVAL, F_SYMBOL, F_TIME
+from src.log.logger_setup import LoggerSetup
+
+
+class BarBus:
+    """
+    In-process pub/sub for committed bars.
+    publish() never blocks: subscribers must hand the bar off (e.g. to an event loop) and return.
+    """
+
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    # Singleton instance
+    def __new__(cls):
+        with cls._instance_lock:
+            if cls._instance is None:
+                cls._instance = super().__new__(cls)
+                cls._instance._init_bus()
+        return cls._instance
+
+    def _init_bus(self):
+        self.logger = LoggerSetup.logger_setup("BarBus")
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        # Copy-on-write tuple so publish() iterates without taking the lock
+        self._subscribers = ()
+        # (symbol, interval) -> newest bar published (older ones, e.g. repaired gaps, don't replace it)
+        self._latest = {}
+
+    def subscribe(self, callback):
+        token = next(self._ids)
+        with self._lock:
+            self._subscribers = self._subscribers + ((token, callback),)
+        return token
+
+    def unsubscribe(self, token):
+        with self._lock:
+            self._subscribers = tuple(s for s in self._subscribers if s[0] != token)
+
+    def latest(self, symbol: str, interval: str = "1m"):
+        return self._latest.get((symbol, interval))
+
+    def publish(self, bar: dict):
+        key = (bar.get(F_SYMBOL), bar.get(F_INTERVAL))
+        previous = self._latest.get(key)
+        if previous is None or bar.get(F_TIME) >= previous.get(F_TIME):
+            self._latest[key] = bar
+        for _, callback in self._subscribers:
+            try:
+                callback(bar)
+            except Exception as e:
+                self.logger.error(f"Bar subscriber failed: {e}")
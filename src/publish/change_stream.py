@@ -0,0 +1,72 @@
+import os
+import sys
+import threading
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from src.configs.config_interval import get_interval_collection
+from src.configs.config_mongo import MongoDBConfig
+from src.log.logger_setup import LoggerSetup
+from src.publish.bar_bus import BarBus
+
+
+class ChangeStreamPublisher:
+    """
+    Tails Mongo change streams of the bar collections and republishes every
+    committed bar on the BarBus. Needs a replica set; resumes from the last token.
+    """
+
+    def __init__(self, intervals=("1m", "1d")):
+        self.logger = LoggerSetup.logger_setup("ChangeStreamPublisher")
+        self.mongo_client = MongoDBConfig.get_client("monitor")
+        self.intervals = intervals
+        self.bus = BarBus()
+        self.running = False
+        self.threads = []
+        self._resume_tokens = {}
+
+    def _watch(self, interval: str):
+        collection = get_interval_collection(self.mongo_client, interval)
+        pipeline = [{"$match": {"operationType": {"$in": ["insert", "update", "replace"]}}}]
+        while self.running:
+            try:
+                with collection.watch(
+                    pipeline,
+                    full_document="updateLookup",
+                    resume_after=self._resume_tokens.get(interval),
+                    max_await_time_ms=1000,
+                ) as stream:
+                    while self.running and stream.alive:
+                        change = stream.try_next()
+                        if change is None:
+                            continue
+                        self._resume_tokens[interval] = stream.resume_token
+                        doc = change.get("fullDocument")
+                        if doc:
+                            # v2 docs already carry symbol/interval ("s"/"i")
+                            doc.pop("_id", None)
+                            self.bus.publish(doc)
+            except Exception as e:
+                self.logger.error(f"Change stream on {collection.name} failed: {e}")
+                time.sleep(5)
+
+    def start(self):
+        if self.running:
+            return True
+        self.running = True
+        self.threads = []
+        for interval in self.intervals:
+            thread = threading.Thread(target=self._watch, args=(interval,))
+            thread.daemon = True
+            thread.start()
+            self.threads.append(thread)
+        self.logger.info(f"Change stream publisher started for {list(self.intervals)}")
+        return True
+
+    def stop(self):
+        self.running = False
+        for thread in self.threads:
+            if thread.is_alive():
+                thread.join(timeout=2)
+        self.logger.info("Change stream publisher stopped")
@@ -0,0 +1,233 @@
+import asyncio
+import json
+import os
+import sys
+import threading
+import time
+from collections import deque
+from urllib.parse import parse_qs, urlsplit
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from src.configs.config_schema import F_INTERVAL, F_SYMBOL
+from src.configs.config_variable import DATA_CRAWL_CONFIG, PUBLISH_CONFIG
+from src.log.logger_setup import LoggerSetup
+from src.metrics.freshness import FreshnessTracker
+from src.publish.bar_bus import BarBus
+
+
+def encode_event(bar: dict):
+    return f"event: bar\ndata: {json.dumps(bar, default=str)}\n\n".encode()
+
+
+class _Client:
+    __slots__ = ("buffer", "event", "dropped", "peer", "symbol", "interval")
+
+    def __init__(self, maxlen: int, peer, symbol: str, interval: str = None):
+        # deque(maxlen) gives drop-oldest backpressure for free
+        self.buffer = deque(maxlen=maxlen)
+        self.event = asyncio.Event()
+        self.dropped = 0
+        self.peer = peer
+        # Only bars of this symbol (and interval, None = every interval) are queued
+        self.symbol = symbol
+        self.interval = interval
+
+    def wants(self, symbol: str, interval: str):
+        return symbol == self.symbol and (self.interval is None or interval == self.interval)
+
+    def push(self, payload: bytes):
+        if len(self.buffer) == self.buffer.maxlen:
+            self.dropped += 1
+        self.buffer.append(payload)
+        self.event.set()
+
+
+class SSEServer:
+    """
+    Server-Sent Events fan-out of committed bars.
+    GET /stream?symbol=BTC.D[&interval=1m]  -> text/event-stream of that symbol's bars
+    GET /latest?symbol=BTC.D[&interval=1m]  -> its newest 1m (or given interval) bar as JSON,
+                                               served from memory, never from Mongo
+    symbol defaults to the main symbol. Each bar is encoded once and appended to the
+    bounded buffer of every client subscribed to its symbol, on the event loop.
+    """
+
+    def __init__(self, host: str = None, port: int = None, client_buffer: int = None):
+        self.logger = LoggerSetup.logger_setup("SSEServer")
+        self.host = host or PUBLISH_CONFIG.get("host", "0.0.0.0")
+        self.port = port if port is not None else PUBLISH_CONFIG.get("port", 8765)
+        self.client_buffer = client_buffer or PUBLISH_CONFIG.get("client_buffer", 256)
+        self.heartbeat_seconds = PUBLISH_CONFIG.get("heartbeat_seconds", 15)
+        self.default_symbol = DATA_CRAWL_CONFIG.get("symbol", "BTC.D")
+
+        self.bus = BarBus()
+        self.loop = None
+        self.server = None
+        self.thread = None
+        self.running = False
+        self._clients = set()
+        self._subscription = None
+        self._ready = threading.Event()
+
+        self.published = 0
+
+    def _on_bar(self, bar: dict):
+        # Called from producer threads: encode there, hand off to the loop without blocking
+        if self.loop is None:
+            return
+        payload = encode_event(bar)
+        self.loop.call_soon_threadsafe(self._fan_out, bar.get(F_SYMBOL), bar.get(F_INTERVAL), payload)
+
+    def _fan_out(self, symbol: str, interval: str, payload: bytes):
+        self.published += 1
+        for client in self._clients:
+            if client.wants(symbol, interval):
+                client.push(payload)
+
+    async def _read_request(self, reader):
+        request_line = await reader.readline()
+        # Drain headers; we don't need any of them
+        while True:
+            line = await reader.readline()
+            if not line or line in (b"\r\n", b"\n"):
+                break
+        parts = request_line.decode(errors="ignore").split()
+        if len(parts) < 2:
+            return None, None, {}
+        url = urlsplit(parts[1])
+        query = {name: values[-1] for name, values in parse_qs(url.query).items()}
+        return parts[0], url.path, query
+
+    async def _send_simple(self, writer, status: str, body: bytes, content_type: str):
+        writer.write(
+            (
+                f"HTTP/1.1 {status}\r\nContent-Type: {content_type}\r\n"
+                f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n"
+            ).encode()
+            + body
+        )
+        await writer.drain()
+
+    async def _handle(self, reader, writer):
+        peer = writer.get_extra_info("peername")
+        client = None
+        try:
+            method, path, query = await self._read_request(reader)
+            if method != "GET":
+                await self._send_simple(writer, "405 Method Not Allowed", b"", "text/plain")
+                return
+            symbol = query.get("symbol") or self.default_symbol
+            if path == "/latest":
+                bar = self.bus.latest(symbol, query.get("interval") or "1m")
+                body = json.dumps(bar, default=str).encode()
+                await self._send_simple(writer, "200 OK", body, "application/json")
+                return
+            if path == "/freshness":
+                # p50/p95/p99 bar close -> fetch -> commit latency per symbol
+                body = json.dumps(FreshnessTracker().stats()).encode()
+                await self._send_simple(writer, "200 OK", body, "application/json")
+                return
+            if path != "/stream":
+                await self._send_simple(writer, "404 Not Found", b"", "text/plain")
+                return
+
+            writer.write(
+                b"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\n"
+                b"Cache-Control: no-cache\r\nConnection: keep-alive\r\n\r\n"
+            )
+            await writer.drain()
+
+            client = _Client(self.client_buffer, peer, symbol, query.get("interval"))
+            self._clients.add(client)
+            self.logger.info(f"SSE client connected {peer} for {symbol} ({len(self._clients)} total)")
+
+            while self.running:
+                try:
+                    await asyncio.wait_for(client.event.wait(), self.heartbeat_seconds)
+                except asyncio.TimeoutError:
+                    writer.write(b": keep-alive\n\n")
+                    await writer.drain()
+                    continue
+                client.event.clear()
+                while client.buffer:
+                    writer.write(client.buffer.popleft())
+                # A slow client only ever blocks its own coroutine
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.CancelledError):
+            # Cancelled on shutdown; finish normally so the stream callback stays quiet
+            pass
+        except Exception as e:
+            self.logger.error(f"SSE client {peer} error: {e}")
+        finally:
+            if client is not None:
+                self._clients.discard(client)
+                self.logger.info(
+                    f"SSE client disconnected {peer} (dropped {client.dropped} bars)"
+                )
+            writer.close()
+
+    def _run(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        try:
+            self.server = self.loop.run_until_complete(
+                asyncio.start_server(self._handle, self.host, self.port)
+            )
+            self.logger.info(f"SSE server listening on {self.host}:{self.port}")
+        except Exception as e:
+            self.logger.error(f"Failed to start SSE server: {e}")
+            self.running = False
+            self._ready.set()
+            return
+        self._ready.set()
+        self.loop.run_forever()
+
+        self.server.close()
+        pending = asyncio.all_tasks(self.loop)
+        for task in pending:
+            task.cancel()
+        self.loop.run_until_complete(asyncio.gather(*pending, return_exceptions=True))
+        self.loop.close()
+
+    def stats(self):
+        return {
+            "clients": len(self._clients),
+            "published": self.published,
+            "dropped": sum(c.dropped for c in list(self._clients)),
+            "max_buffered": max((len(c.buffer) for c in list(self._clients)), default=0),
+        }
+
+    def start(self):
+        if self.running:
+            return True
+        self.running = True
+        self._ready.clear()
+        self.thread = threading.Thread(target=self._run)
+        self.thread.daemon = True
+        self.thread.start()
+        self._ready.wait(timeout=5)
+        if self.running:
+            self._subscription = self.bus.subscribe(self._on_bar)
+        return self.running
+
+    def stop(self):
+        self.running = False
+        if self._subscription is not None:
+            self.bus.unsubscribe(self._subscription)
+            self._subscription = None
+        if self.loop is not None and self.loop.is_running():
+            self.loop.call_soon_threadsafe(self.loop.stop)
+        if self.thread and self.thread.is_alive():
+            self.thread.join(timeout=2)
+        self.logger.info("SSE server stopped")
+
+
+if __name__ == "__main__":
+    server = SSEServer()
+    server.start()
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        server.stop()
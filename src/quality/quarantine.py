@@ -0,0 +1,54 @@
+import os
+import sys
+from datetime import datetime
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from pymongo import ASCENDING
+
+from src.configs.config_mongo import MongoDBConfig
+from src.configs.config_schema import F_INTERVAL, F_SYMBOL, F_TIME, bar_doc
+from src.configs.config_variable import DATA_CRAWL_CONFIG, QUALITY_CONFIG
+from src.log.logger_setup import LoggerSetup
+
+
+class Quarantine:
+    """Rejected bars kept for review in their own collection, with the reasons and the producer"""
+
+    def __init__(self, profile: str = "bulk"):
+        self.logger = LoggerSetup.logger_setup("Quarantine")
+        self.mongo_client = MongoDBConfig.get_client(profile)
+        self.collection = self.mongo_client.get_database(
+            DATA_CRAWL_CONFIG.get("db")
+        ).get_collection(QUALITY_CONFIG.get("quarantine_collection", "bars_quarantine"))
+        try:
+            self.collection.create_index(
+                [(F_SYMBOL, ASCENDING), (F_INTERVAL, ASCENDING), (F_TIME, ASCENDING)],
+                name="quarantine_bar",
+            )
+        except Exception as e:
+            self.logger.error(f"Failed to ensure quarantine index: {e}")
+
+    def put(self, rejected: list, source: str):
+        """Store [(bar doc, reasons)]; returns the number stored (0 on failure, never raises)"""
+        if not rejected:
+            return 0
+        now = datetime.utcnow()
+        docs = []
+        for doc, reasons in rejected:
+            entry = {k: v for k, v in doc.items() if k != "_id"}
+            entry.update({"reasons": reasons, "src": source, "q_at": now})
+            docs.append(entry)
+        try:
+            self.collection.insert_many(docs, ordered=False)
+            self.logger.warning(
+                f"Quarantined {len(docs)} bars from {source}: {sorted({r for _, rs in rejected for r in rs})}"
+            )
+            return len(docs)
+        except Exception as e:
+            self.logger.error(f"Failed to quarantine {len(docs)} bars from {source}: {e}")
+            return 0
+
+    def put_bar(self, symbol: str, interval: str, bar, reasons: list, source: str):
+        doc = bar_doc(symbol, interval, bar.ts_ms, bar.open, bar.high, bar.low, bar.close, bar.volume)
+        return self.put([(doc, reasons)], source)
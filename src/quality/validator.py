@@ -0,0 +1,220 @@
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from src.configs.config_schema import OHLCV_FIELDS, doc_ms
+from src.configs.config_symbols import quality_bounds
+from src.configs.config_variable import DATA_CRAWL_CONFIG, QUALITY_CONFIG
+
+# One bit per failed check; a row is valid when its code is 0
+NAN = 1
+HIGH_BELOW_LOW = 2
+OUTSIDE_HIGH_LOW = 4
+OUT_OF_RANGE = 8
+ZERO_VOLUME = 16
+NON_MONOTONIC = 32
+SPIKE = 64
+
+REASONS = (
+    (NAN, "nan"),
+    (HIGH_BELOW_LOW, "high_below_low"),
+    (OUTSIDE_HIGH_LOW, "open_close_outside_high_low"),
+    (OUT_OF_RANGE, "out_of_range"),
+    (ZERO_VOLUME, "zero_volume"),
+    (NON_MONOTONIC, "non_monotonic_time"),
+    (SPIKE, "spike"),
+)
+
+
+def reasons_of(code: int):
+    return [name for bit, name in REASONS if code & bit]
+
+
+def _flag(codes: np.ndarray, mask: np.ndarray, bit: int):
+    # bool -> uint8 is a free view; one multiply per check instead of a where + cast
+    codes |= mask.view(np.uint8) * np.uint8(bit)
+
+
+def _trailing_stats(x: np.ndarray, window: int):
+    """Mean/std/count of the `window` finite values before each position (O(n) with cumsums)"""
+    finite = np.isfinite(x)
+    x0 = np.where(finite, x, 0.0)
+    n_rows = len(x)
+    head = np.zeros(min(window, n_rows))
+
+    def trailing_sum(values):
+        # cumsum shifted by one (values before i) minus the same shifted by window
+        total = np.concatenate(([0.0], np.cumsum(values)[:-1]))
+        return total - np.concatenate((head, total[: max(0, n_rows - window)]))
+
+    n = trailing_sum(finite.astype(np.float64))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = trailing_sum(x0) / n
+        var = trailing_sum(x0 * x0) / n - mean * mean
+    return mean, np.sqrt(np.maximum(var, 0.0)), n
+
+
+class BarValidator:
+    """
+    Data-quality gate in front of every bar write. All checks run as NumPy expressions
+    over the whole batch (~0.1 s per million rows, noise next to writing them):
+
+      nan / high < low / open or close outside [low, high] / price out of range /
+      zero volume / timestamps not strictly increasing / spike: close-to-close log
+      return with a z-score above spike_z against the trailing spike_window returns
+      (and at least min_spike_pct), where the bar reverting a spike is not flagged again.
+
+    validate() returns one code per row (bit mask, 0 = valid, see reasons_of).
+    The price range and zero-volume check are per symbol (config_symbols.quality_bounds):
+    dominance series must stay in (0, 100], market caps only above 0 unless configured.
+    """
+
+    def __init__(self, config: dict = None, symbol: str = None):
+        config = config or QUALITY_CONFIG
+        self.enabled = config.get("enabled", True)
+        min_value, max_value, self.reject_zero_volume = quality_bounds(
+            symbol or DATA_CRAWL_CONFIG.get("symbol", "BTC.D"), config
+        )
+        self.min_value = -np.inf if min_value is None else min_value
+        self.max_value = np.inf if max_value is None else max_value
+        self.spike_window = config.get("spike_window", 60)
+        self.spike_min_periods = config.get("spike_min_periods", 10)
+        self.spike_z = config.get("spike_z", 12.0)
+        self.min_spike = np.log1p(config.get("min_spike_pct", 1.0) / 100)
+
+    def validate(self, ts, o, h, l, c, v, history_close=None, history_ts=None, allow_revision=False):
+        """
+        Codes for a batch sorted by time. history_close / history_ts are the accepted
+        bars right before the batch (spike context and the monotonic check); with
+        allow_revision the first row may repeat the last history timestamp (live tick).
+        """
+        ts = np.asarray(ts, dtype=np.int64)
+        o, h, l, c = (np.asarray(x, dtype=np.float64) for x in (o, h, l, c))
+        v = np.asarray(v, dtype=np.float64)
+        codes = np.zeros(len(ts), dtype=np.uint8)
+        if not self.enabled or len(ts) == 0:
+            return codes
+
+        # NaN/inf in any price makes the sum non-finite: one pass instead of four
+        _flag(codes, ~np.isfinite(o + h + l + c), NAN)
+        with np.errstate(invalid="ignore"):
+            _flag(codes, h < l, HIGH_BELOW_LOW)
+            tol = np.abs(h) * 1e-9
+            outside = (o > h + tol) | (o < l - tol) | (c > h + tol) | (c < l - tol)
+            _flag(codes, outside, OUTSIDE_HIGH_LOW)
+            # open/close are inside [low, high] or already flagged, so the extremes suffice
+            _flag(codes, (l <= self.min_value) | (h > self.max_value), OUT_OF_RANGE)
+            if self.reject_zero_volume:
+                _flag(codes, v == 0, ZERO_VOLUME)
+
+        # Strictly increasing time, continuing from the history
+        prev_ts = np.empty_like(ts)
+        prev_ts[1:] = ts[:-1]
+        prev_ts[0] = history_ts if history_ts is not None else np.iinfo(np.int64).min
+        stale = ts <= prev_ts
+        if allow_revision and history_ts is not None and ts[0] == history_ts:
+            stale[0] = False
+        _flag(codes, stale, NON_MONOTONIC)
+
+        codes |= self._spikes(c, codes, history_close)
+        return codes
+
+    def _spikes(self, c: np.ndarray, codes: np.ndarray, history_close=None):
+        hist = np.asarray(history_close if history_close is not None else [], dtype=np.float64)
+        n_hist = len(hist)
+        closes = np.concatenate((hist, c))
+        # Rows failing other checks do not set the reference level
+        closes[n_hist:][codes != 0] = np.nan
+        with np.errstate(invalid="ignore", divide="ignore"):
+            log_c = np.where(closes > 0, np.log(closes), np.nan)
+        ret = np.empty_like(log_c)
+        ret[0] = np.nan
+        ret[1:] = np.diff(log_c)
+        mean, std, n = _trailing_stats(ret, self.spike_window)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            z = np.abs(ret - mean) / std
+            spike = (n >= self.spike_min_periods) & (z >= self.spike_z) & (np.abs(ret) >= self.min_spike)
+            # Bar i+1 returning to the level before a bad tick i is the revert, not a new spike
+            back = np.empty_like(log_c)
+            back[:2] = np.nan
+            back[2:] = log_c[2:] - log_c[:-2]
+            revert = np.zeros_like(spike)
+            revert[1:] = spike[:-1] & (np.abs(back[1:]) < self.min_spike)
+        spike &= ~revert
+        return spike[n_hist:].view(np.uint8) * np.uint8(SPIKE)
+
+    def validate_docs(self, docs: list, **kwargs):
+        """Split v2 bar docs into (valid docs, [(doc, reasons)]) with one vectorized pass"""
+        if not docs:
+            return [], []
+        ts = np.fromiter((doc_ms(d) for d in docs), dtype=np.int64, count=len(docs))
+        columns = [
+            np.array([np.nan if d.get(f) is None else d[f] for d in docs], dtype=np.float64)
+            for f in OHLCV_FIELDS
+        ]
+        codes = self.validate(ts, *columns, **kwargs)
+        rejected_idx = np.flatnonzero(codes)
+        if not len(rejected_idx):
+            return docs, []
+        rejected = [(docs[i], reasons_of(int(codes[i]))) for i in rejected_idx]
+        valid = [docs[i] for i in np.flatnonzero(codes == 0)]
+        return valid, rejected
+
+    def check_bar(self, bar, recent=None):
+        """
+        Reasons to reject one live Bar, checked against the in-memory recent window
+        (RecentBars). A repeated timestamp is a revision of the latest bar.
+        """
+        history_close = history_ts = None
+        if recent is not None and len(recent):
+            window = recent.window(self.spike_window + 1)
+            history_ts = int(window["timestamp_ms"][-1])
+            history_close = window["close"]
+            if history_ts == bar.ts_ms:
+                # Revising the latest bar: compare with the ones before it
+                history_close = history_close[:-1]
+        codes = self.validate(
+            [bar.ts_ms],
+            [np.nan if bar.open is None else bar.open],
+            [np.nan if bar.high is None else bar.high],
+            [np.nan if bar.low is None else bar.low],
+            [np.nan if bar.close is None else bar.close],
+            [np.nan if bar.volume is None else bar.volume],
+            history_close=history_close,
+            history_ts=history_ts,
+            allow_revision=True,
+        )
+        return reasons_of(int(codes[0]))
+
+
+def benchmark(n_rows: int = 1_000_000, seed: int = 7):
+    """Validate n_rows synthetic minute bars (with injected bad rows); returns (seconds, rejected)"""
+    rng = np.random.default_rng(seed)
+    ts = 1_700_000_000_000 + np.arange(n_rows, dtype=np.int64) * 60000
+    c = 58.0 * np.exp(np.cumsum(rng.normal(0, 1e-4, n_rows)))
+    o = np.roll(c, 1)
+    o[0] = c[0]
+    h = np.maximum(o, c) * (1 + 5e-5)
+    l = np.minimum(o, c) * (1 - 5e-5)
+    v = np.full(n_rows, 5e10)
+    bad = rng.choice(n_rows, size=100, replace=False)
+    c[bad[:25]] *= 1.5
+    h[bad[:25]] = np.maximum(h[bad[:25]], c[bad[:25]])
+    h[bad[25:50]] = l[bad[25:50]] * 0.99
+    c[bad[50:75]] = np.nan
+    v[bad[75:]] = 0
+
+    validator = BarValidator()
+    started = time.perf_counter()
+    codes = validator.validate(ts, o, h, l, c, v)
+    elapsed = time.perf_counter() - started
+    return elapsed, int(np.count_nonzero(codes))
+
+
+if __name__ == "__main__":
+    seconds, rejected = benchmark()
+    print(f"validated 1,000,000 bars in {seconds * 1000:.1f} ms, rejected {rejected} (100 injected)")
@@ -0,0 +1,341 @@
+import os
+import sys
+import threading
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from src.configs.config_mongo import MongoDBConfig
+from src.configs.config_variable import (
+    DERIVED_SERIES_CONFIG,
+    GAP_REPAIR_CONFIG,
+    PUBLISH_CONFIG,
+    RECONCILE_CONFIG,
+    RETENTION_CONFIG,
+    ROLLUP_STATS_CONFIG,
+    SUPERVISOR_CONFIG,
+    TELEGRAM_CONFIG,
+)
+from src.extract.crawl_scheduler import CrawlScheduler
+from src.extract.extract_derived_series import ExtractDerivedSeries
+from src.jobs import gap_repair, reconcile, retention, rollup_stats
+from src.jobs.rollup_stats import RollupStatsUpdater
+from src.log.logger_setup import LoggerSetup
+from src.publish.change_stream import ChangeStreamPublisher
+from src.publish.sse_server import SSEServer
+from src.storage.write_coordinator import WriteCoordinator
+from src.tele_bot.tele_message import TelegramMonitor
+from src.upstream.rate_limiter import backoff_delay
+from src.upstream.tradingview_client import TradingViewClient
+
+try:
+    _CLK_TCK = os.sysconf("SC_CLK_TCK")
+except (AttributeError, ValueError, OSError):
+    _CLK_TCK = None
+
+
+def thread_cpu_seconds(thread: threading.Thread):
+    """user + system CPU seconds of a live thread (Linux /proc); None elsewhere or once it exited"""
+    if _CLK_TCK is None or thread.native_id is None:
+        return None
+    try:
+        with open(f"/proc/self/task/{thread.native_id}/stat") as f:
+            # comm (field 2) may contain spaces; utime/stime are fields 14/15
+            fields = f.read().rsplit(")", 1)[1].split()
+        return (int(fields[11]) + int(fields[12])) / _CLK_TCK
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class _Service:
+    """A component that owns its thread(s): start()/stop() plus `thread` or `threads`"""
+
+    __slots__ = ("name", "component", "restarts", "failures", "started_at", "restart_at")
+
+    def __init__(self, name: str, component):
+        self.name = name
+        self.component = component
+        self.restarts = 0
+        self.failures = 0
+        self.started_at = None
+        self.restart_at = None
+
+    def threads(self):
+        threads = list(getattr(self.component, "threads", None) or [])
+        thread = getattr(self.component, "thread", None)
+        if thread is not None:
+            threads.append(thread)
+        return threads
+
+    def alive(self):
+        threads = self.threads()
+        return bool(threads) and all(thread.is_alive() for thread in threads)
+
+    def stats(self, now: float):
+        cpu = [thread_cpu_seconds(thread) for thread in self.threads()]
+        return {
+            "alive": self.alive(),
+            "threads": len(cpu),
+            "cpu_s": sum(c for c in cpu if c is not None),
+            "restarts": self.restarts,
+            "uptime_s": now - self.started_at if self.started_at is not None else None,
+        }
+
+
+class Supervisor:
+    """
+    Owns the extraction process. Shared components are created once here: the
+    TradingViewClient (one upstream session and rate budget), the per-profile Mongo
+    clients and the TelegramMonitor. Work runs as:
+
+    - jobs: realtime/historical of every symbol, the derived series poll, the daily
+      reconciliation, retention and stats rebuild, gap repair and the Telegram monitor's
+      data checks, on the crawl scheduler's bounded pool; a failing job is rescheduled with backoff;
+    - services: components with their own thread (write coordinator flusher, rollup stats
+      updater, SSE server, change streams); a dead thread is restarted with backoff.
+
+    run() is the watchdog on the calling thread: it restarts what died, reports stalled or
+    repeatedly failing workers (log + Telegram) and logs per-worker CPU time and liveness.
+    """
+
+    def __init__(self, config: dict = None):
+        self.logger = LoggerSetup.logger_setup("Supervisor")
+        config = config or SUPERVISOR_CONFIG
+        self.check_seconds = config.get("check_seconds", 5)
+        self.restart_base = config.get("restart_base_seconds", 5)
+        self.restart_max = config.get("restart_max_seconds", 300)
+        self.stall_seconds = config.get("stall_seconds", 600)
+        self.alert_after_errors = config.get("alert_after_errors", 3)
+        self.report_seconds = config.get("report_seconds", 300)
+
+        # Shared components: every worker uses these same instances
+        self.tv_client = TradingViewClient()
+        self.telegram_monitor = TelegramMonitor()
+        self.scheduler = CrawlScheduler(telegram_monitor=self.telegram_monitor)
+        self.derived_extractor = None
+        self.services = []
+
+        self.running = False
+        self._stop_event = threading.Event()
+        # workers currently reported as stalled / failing, so each episode alerts once
+        self._unhealthy = {}
+        self._last_report = None
+
+    # ---- workers ----
+
+    def add_service(self, name: str, component):
+        service = _Service(name, component)
+        self.services.append(service)
+        if self.running:
+            self._start_service(service)
+        return service
+
+    def _start_service(self, service: _Service):
+        try:
+            if service.component.start() is False:
+                raise RuntimeError("start() returned False")
+            service.started_at = time.time()
+            return True
+        except Exception as e:
+            self.logger.error(f"Service {service.name} failed to start: {e}")
+            return False
+
+    def _derived_step(self, extractor: ExtractDerivedSeries):
+        state = {"backfilled": False}
+
+        def step():
+            if not state["backfilled"]:
+                extractor.backfill()
+                state["backfilled"] = True
+            else:
+                extractor.poll_once()
+            return extractor.poll_interval_seconds
+
+        return step
+
+    def _reconcile_step(self):
+        reconcile.reconcile_symbols(self.scheduler.specs)
+        return reconcile.seconds_until_next_run()
+
+    def _retention_step(self):
+        retention.RetentionJob(symbols=retention.retention_symbols(self.scheduler.specs)).run()
+        return retention.seconds_until_next_run()
+
+    def _rollup_rebuild_step(self):
+        rollup_stats.rebuild_symbols(rollup_stats.rollup_symbols(self.scheduler.specs))
+        return rollup_stats.seconds_until_next_run()
+
+    def _gap_repair_step(self):
+        gap_repair.repair_symbols(self.scheduler.specs)
+        return GAP_REPAIR_CONFIG.get("run_every_seconds", 6 * 60 * 60)
+
+    def _build_workers(self):
+        # Batched writer of every extractor: flushes pending candles every flush_interval_seconds
+        self.add_service("write_coordinator", WriteCoordinator())
+
+        if DERIVED_SERIES_CONFIG.get("enabled", False):
+            # Cùng worker pool và rate budget TradingView với các symbol khác
+            self.derived_extractor = ExtractDerivedSeries()
+            self.scheduler.add_job("derived", self._derived_step(self.derived_extractor))
+
+        if RECONCILE_CONFIG.get("enabled", False):
+            # Nến gần đây bị TradingView sửa lại: so sánh và chỉ ghi các nến khác, mỗi ngày một lần
+            self.scheduler.add_job("reconcile", self._reconcile_step, delay=reconcile.seconds_until_next_run())
+
+        if RETENTION_CONFIG.get("enabled", False):
+            # Downsample rồi xoá nến cũ theo batch của mọi symbol, mỗi ngày một lần
+            self.scheduler.add_job("retention", self._retention_step, delay=retention.seconds_until_next_run())
+
+        if GAP_REPAIR_CONFIG.get("enabled", False):
+            # Audit nến bị thiếu của mọi symbol và lấp lại qua write coordinator
+            self.scheduler.add_job(
+                "gap_repair", self._gap_repair_step, delay=GAP_REPAIR_CONFIG.get("run_every_seconds", 6 * 60 * 60)
+            )
+
+        if ROLLUP_STATS_CONFIG.get("enabled", False):
+            # Stats ngày/tuần/tháng cập nhật mỗi khi nến commit (nhận qua BarBus)
+            symbols = rollup_stats.rollup_symbols(self.scheduler.specs)
+            self.add_service("rollup_stats", RollupStatsUpdater(symbols=symbols))
+            if ROLLUP_STATS_CONFIG.get("rebuild_enabled", False):
+                # Rebuild từ nến nguồn mỗi ngày: nến bị sửa/lấp lại sau khi đã fold cũng vào stats
+                self.scheduler.add_job(
+                    "rollup_rebuild", self._rollup_rebuild_step, delay=rollup_stats.seconds_until_next_run()
+                )
+
+        if PUBLISH_CONFIG.get("enabled", False):
+            if PUBLISH_CONFIG.get("source") == "change_stream":
+                self.add_service("change_stream", ChangeStreamPublisher())
+            self.add_service("sse", SSEServer())
+
+    # ---- watchdog ----
+
+    def _notify(self, message: str):
+        monitor = self.telegram_monitor
+        if monitor.bot_token and monitor.chat_id:
+            monitor.send_telegram_message(f"<b>BTC Dominance Worker</b>\n\n{message}")
+
+    def _set_health(self, name: str, problem: str):
+        """Log and alert once when a worker turns unhealthy, and once when it recovers"""
+        if problem is not None and name not in self._unhealthy:
+            self._unhealthy[name] = problem
+            self.logger.error(f"Worker {name} unhealthy: {problem}")
+            self._notify(f"Worker <b>{name}</b> unhealthy: {problem}")
+        elif problem is None and name in self._unhealthy:
+            del self._unhealthy[name]
+            self.logger.info(f"Worker {name} recovered")
+            self._notify(f"Worker <b>{name}</b> recovered")
+
+    def _check_services(self, now: float):
+        for service in self.services:
+            if service.alive():
+                self._set_health(service.name, None)
+                if service.failures and now - service.started_at > self.restart_max:
+                    # Stable again: the next crash starts from the base backoff
+                    service.failures = 0
+                continue
+            if service.restart_at is None:
+                delay = self.restart_base + backoff_delay(service.failures, base=self.restart_base, cap=self.restart_max)
+                service.restart_at = now + delay
+                service.failures += 1
+                self._set_health(service.name, f"thread died, restart #{service.failures} in {delay:.0f}s")
+                continue
+            if now < service.restart_at:
+                continue
+            try:
+                service.component.stop()
+            except Exception as e:
+                self.logger.warning(f"Service {service.name} did not stop cleanly: {e}")
+            service.restart_at = None
+            service.restarts += 1
+            if self._start_service(service):
+                self.logger.info(f"Service {service.name} restarted ({service.restarts} restarts)")
+
+    def _check_jobs(self):
+        self.scheduler.restart_dispatcher()
+        for name, stats in self.scheduler.job_stats().items():
+            problem = None
+            if stats["running_s"] is not None and stats["running_s"] > self.stall_seconds:
+                problem = f"running for {stats['running_s']:.0f}s"
+            elif stats["overdue_s"] > self.stall_seconds:
+                problem = f"overdue by {stats['overdue_s']:.0f}s (worker pool saturated)"
+            elif stats["consecutive_errors"] >= self.alert_after_errors:
+                problem = f"failed {stats['consecutive_errors']} times in a row: {stats['last_error']}"
+            self._set_health(name, problem)
+
+    def check(self):
+        """One watchdog pass"""
+        now = time.time()
+        try:
+            self._check_services(now)
+            self._check_jobs()
+        except Exception as e:
+            self.logger.error(f"Supervisor check failed: {e}")
+        if self._last_report is None or now - self._last_report >= self.report_seconds:
+            self._last_report = now
+            self.logger.info(f"Supervisor stats: {self.stats()}")
+
+    # ---- lifecycle ----
+
+    def stats(self):
+        now = time.time()
+        pool_cpu = [thread_cpu_seconds(thread) for thread in self.scheduler.pool_threads()]
+        workers = {name: dict(stats, kind="job") for name, stats in self.scheduler.job_stats().items()}
+        for service in self.services:
+            workers[service.name] = dict(service.stats(now), kind="service")
+        return {
+            "process_cpu_s": time.process_time(),
+            "threads": threading.active_count(),
+            "pool": {
+                "size": self.scheduler.workers,
+                "threads": len(pool_cpu),
+                "cpu_s": sum(c for c in pool_cpu if c is not None),
+                "dispatcher_alive": self.scheduler.dispatcher_alive(),
+            },
+            "workers": workers,
+            "unhealthy": dict(self._unhealthy),
+            "scheduler": self.scheduler.stats(),
+            "upstream_breaker": self.tv_client.breaker.state,
+            "mongo_pools": MongoDBConfig.pool_stats(),
+        }
+
+    def start(self):
+        if self.running:
+            return True
+        self.running = True
+        self._stop_event.clear()
+        if TELEGRAM_CONFIG.get("monitor_enabled", False) and self.telegram_monitor.start():
+            # Kiểm tra absence/freshness định kỳ kể cả khi realtime job bị treo; job được watchdog theo dõi
+            monitor = self.telegram_monitor
+            self.scheduler.add_job("telegram_monitor", monitor.check_step, delay=monitor.check_interval)
+        self._build_workers()
+        for service in self.services:
+            self._start_service(service)
+        self.scheduler.start()
+        self.logger.info(
+            f"Supervisor started: {len(self.scheduler.jobs)} jobs on {self.scheduler.workers} workers, "
+            f"{len(self.services)} services"
+        )
+        return True
+
+    def run(self):
+        """Start everything and watch it on the calling thread until stop()"""
+        self.start()
+        while self.running:
+            self._stop_event.wait(self.check_seconds)
+            if self.running:
+                self.check()
+
+    def stop(self):
+        self.running = False
+        self._stop_event.set()
+        self.scheduler.stop()
+        if self.derived_extractor is not None:
+            self.derived_extractor.sink.flush()
+        for service in self.services:
+            try:
+                service.component.stop()
+            except Exception as e:
+                self.logger.warning(f"Service {service.name} did not stop cleanly: {e}")
+        self.telegram_monitor.stop()
+        self.logger.info(f"Supervisor stopped: {self.stats()}")
+        MongoDBConfig.client_close()
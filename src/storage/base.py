@@ -0,0 +1,100 @@
+from collections import namedtuple
+from datetime import datetime
+
+from src.configs.config_schema import F_INTERVAL, F_SYMBOL, date_to_ms, doc_ms
+
+# One write against one bar: `update` uses Mongo update operators
+# ("$set", "$setOnInsert", "$max", "$min") so every sink applies the same semantics.
+BarWrite = namedtuple("BarWrite", ["symbol", "interval", "ts_ms", "update"])
+
+SUPPORTED_OPERATORS = ("$set", "$setOnInsert", "$max", "$min")
+
+
+def _pick(fn, a, b):
+    # $max / $min ignore a missing value
+    if a is None:
+        return b
+    if b is None:
+        return a
+    return fn(a, b)
+
+
+def _fold(first_op: str, first, op: str, value):
+    """(operator, value) with the effect of `first_op first` followed by `op value` on one field"""
+    if op == "$set":
+        return op, value
+    if first_op == "$set":
+        # The value is known: a following $max / $min is evaluated now, $setOnInsert is a no-op
+        if op == "$max":
+            return "$set", _pick(max, first, value)
+        if op == "$min":
+            return "$set", _pick(min, first, value)
+        return first_op, first
+    if op == first_op:
+        if op == "$max":
+            return op, _pick(max, first, value)
+        if op == "$min":
+            return op, _pick(min, first, value)
+        # the first insert wins
+        return first_op, first
+    if op == "$setOnInsert":
+        # The field is already written when the bar is inserted
+        return first_op, first
+    # $max after $min (or either after $setOnInsert) is not one operator: the later one wins
+    return op, value
+
+
+def merge_updates(first: dict, second: dict):
+    """
+    Combine two updates of the same bar into one, as if applied in order. Operators are
+    replayed per field, so every field ends up under exactly one operator ($set then $max
+    becomes $set of the max) and the result can go to Mongo as is.
+    """
+    fields = {}
+    for update in (first, second):
+        for op, values in update.items():
+            for field, value in values.items():
+                previous = fields.get(field)
+                fields[field] = (op, value) if previous is None else _fold(*previous, op, value)
+    merged = {}
+    for field, (op, value) in fields.items():
+        merged.setdefault(op, {})[field] = value
+    return merged
+
+
+def upsert_write(doc: dict):
+    """BarWrite replacing the fields of a full v2 bar doc"""
+    return BarWrite(doc[F_SYMBOL], doc[F_INTERVAL], doc_ms(doc), {"$set": doc})
+
+
+def plain_value(value):
+    # Embedded stores keep Dates as epoch ms
+    if isinstance(value, datetime):
+        return date_to_ms(value)
+    return value
+
+
+class BarSink:
+    """Destination for bar writes. Subclasses implement write(); flush/close are optional."""
+
+    name = "sink"
+
+    def write(self, writes: list):
+        """Apply a batch of BarWrite; returns the number of writes applied"""
+        raise NotImplementedError
+
+    def submit(self, writes: list, on_commit=None):
+        """Like write(), but the sink may store them later; on_commit() runs once they are stored"""
+        count = self.write(writes)
+        if on_commit is not None:
+            on_commit()
+        return count
+
+    def upsert_docs(self, docs: list):
+        return self.write([upsert_write(doc) for doc in docs])
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.flush()
@@ -0,0 +1,115 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from src.configs.config_schema import bar_doc
+from src.configs.config_variable import DATA_CRAWL_CONFIG
+from src.log.logger_setup import LoggerSetup
+from src.storage.base import BarSink
+
+logger = LoggerSetup.logger_setup("StorageSinks")
+
+
+class FanoutSink(BarSink):
+    """Writes every batch to several sinks; only the primary (first) sink's errors propagate"""
+
+    name = "fanout"
+
+    def __init__(self, sinks: list):
+        self.sinks = sinks
+
+    def write(self, writes: list):
+        written = self.sinks[0].write(writes)
+        for sink in self.sinks[1:]:
+            try:
+                sink.write(writes)
+            except Exception as e:
+                logger.error(f"Secondary sink {sink.name} failed on {len(writes)} writes: {e}")
+        return written
+
+    def flush(self):
+        for sink in self.sinks:
+            sink.flush()
+
+    def close(self):
+        for sink in self.sinks:
+            sink.close()
+
+
+def _create(name: str, mongo_profile: str, config: dict):
+    if name == "mongo":
+        from src.storage.mongo_sink import MongoSink
+
+        return MongoSink(mongo_profile)
+    if name == "sqlite":
+        from src.storage.sqlite_sink import SQLiteSink
+
+        return SQLiteSink(config.get("sqlite_path", "data/btc_dominance.sqlite"))
+    if name == "parquet":
+        from src.storage.parquet_sink import ParquetSink
+
+        return ParquetSink(
+            config.get("parquet_dir", "data/parquet"),
+            flush_rows=config.get("parquet_flush_rows", 1000),
+            flush_seconds=config.get("parquet_flush_seconds", 300),
+        )
+    raise ValueError(f"Unknown storage sink '{name}'")
+
+
+def build_sink(names: list = None, mongo_profile: str = "default", config: dict = None):
+    """Sink (or fan-out of sinks) selected by DATA_CRAWL_CONFIG["sinks"]"""
+    config = config or DATA_CRAWL_CONFIG
+    names = names or config.get("sinks") or ["mongo"]
+    sinks = []
+    for name in names:
+        try:
+            sinks.append(_create(name, mongo_profile, config))
+        except ImportError as e:
+            # Optional backend not installed: keep crawling into the others
+            logger.error(f"Storage sink '{name}' unavailable: {e}")
+    if not sinks:
+        raise RuntimeError(f"No usable storage sink in {names}")
+    return sinks[0] if len(sinks) == 1 else FanoutSink(sinks)
+
+
+def benchmark(names: list, n_bars: int, batch_size: int):
+    """Write n_bars synthetic minute bars to each backend; returns {name: bars/s}"""
+    results = {}
+    start_ms = 1_600_000_000_000 - 1_600_000_000_000 % 60000
+    with tempfile.TemporaryDirectory() as tmp:
+        config = dict(DATA_CRAWL_CONFIG)
+        config["sqlite_path"] = os.path.join(tmp, "bench.sqlite")
+        config["parquet_dir"] = os.path.join(tmp, "parquet")
+        for name in names:
+            try:
+                sink = _create(name, "bulk", config)
+            except ImportError as e:
+                print(f"{name:>8}: skipped ({e})")
+                continue
+            started = time.perf_counter()
+            for first in range(0, n_bars, batch_size):
+                docs = [
+                    bar_doc("BENCH", "1m", start_ms + k * 60000, 50.0, 50.5, 49.5, 50.1, 0.0)
+                    for k in range(first, min(first + batch_size, n_bars))
+                ]
+                sink.upsert_docs(docs)
+            sink.close()
+            elapsed = time.perf_counter() - started
+            results[name] = n_bars / elapsed
+            print(f"{name:>8}: {n_bars} bars in {elapsed:.2f}s ({results[name]:,.0f} bars/s)")
+            if name == "mongo":
+                sink.collection("1m").delete_many({"s": "BENCH"})
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare storage sink write throughput")
+    parser.add_argument("--sinks", nargs="+", default=["sqlite", "parquet"])
+    parser.add_argument("--bars", type=int, default=100000)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+    benchmark(args.sinks, args.bars, args.batch_size)
@@ -0,0 +1,39 @@
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from pymongo import UpdateOne
+
+from src.configs.config_interval import get_interval_collection
+from src.configs.config_mongo import MongoDBConfig
+from src.configs.config_schema import bar_key, ensure_bar_indexes
+from src.storage.base import BarSink
+
+
+class MongoSink(BarSink):
+    """Bars in the per-interval Mongo collections, one unordered bulk_write per interval"""
+
+    name = "mongo"
+
+    def __init__(self, profile: str = "default"):
+        self.mongo_client = MongoDBConfig.get_client(profile)
+        self._collections = {}
+
+    def collection(self, interval: str):
+        collection = self._collections.get(interval)
+        if collection is None:
+            collection = get_interval_collection(self.mongo_client, interval)
+            ensure_bar_indexes(collection)
+            self._collections[interval] = collection
+        return collection
+
+    def write(self, writes: list):
+        by_interval = {}
+        for w in writes:
+            by_interval.setdefault(w.interval, []).append(
+                UpdateOne(bar_key(w.symbol, w.interval, w.ts_ms), w.update, upsert=True)
+            )
+        for interval, ops in by_interval.items():
+            self.collection(interval).bulk_write(ops, ordered=False)
+        return len(writes)
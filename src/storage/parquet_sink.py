@@ -0,0 +1,134 @@
+import glob
+import os
+import sys
+import threading
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from src.configs.config_schema import (
+    F_INDICATORS,
+    F_SOURCE,
+    F_UPDATED,
+    F_VERSION,
+    OHLCV_FIELDS,
+)
+from src.storage.base import SUPPORTED_OPERATORS, BarSink, plain_value
+
+KEYS = ("s", "i", "t")
+VALUE_FIELDS = OHLCV_FIELDS + (F_UPDATED, F_INDICATORS, F_VERSION, F_SOURCE)
+COLUMNS = KEYS + VALUE_FIELDS
+
+# Values are stored in a column per update operator, so read_bars can replay the
+# operator: "$set" -> "<field>", the others -> "<field><suffix>"
+OPERATOR_SUFFIXES = {"$set": "", "$setOnInsert": "__ins", "$max": "__max", "$min": "__min"}
+PART_COLUMNS = KEYS + tuple(f + suffix for suffix in OPERATOR_SUFFIXES.values() for f in VALUE_FIELDS)
+
+
+class ParquetSink(BarSink):
+    """
+    Append-only Parquet log: writes are buffered and every flush adds one part file
+    <dir>/<interval>/part-<ns>.parquet. Files are never rewritten; each value keeps the
+    operator that wrote it and read_bars replays them per (s, i, t): the last $set wins,
+    $setOnInsert only counts on the bar's first write, $max/$min fold as extremes.
+    """
+
+    name = "parquet"
+
+    def __init__(self, directory: str, flush_rows: int = 1000, flush_seconds: float = 300):
+        try:
+            import pyarrow  # noqa: F401
+            import pyarrow.parquet  # noqa: F401
+        except ImportError as e:
+            raise ImportError("ParquetSink requires pyarrow (pip install pyarrow)") from e
+        self.directory = directory
+        self.flush_rows = flush_rows
+        self.flush_seconds = flush_seconds
+        self._buffers = {}
+        self._oldest = None
+        self._lock = threading.Lock()
+
+    def write(self, writes: list):
+        with self._lock:
+            for w in writes:
+                unsupported = set(w.update) - set(SUPPORTED_OPERATORS)
+                if unsupported:
+                    raise ValueError(f"ParquetSink does not support {sorted(unsupported)}")
+                row = {"s": w.symbol, "i": w.interval, "t": int(w.ts_ms)}
+                for op, suffix in OPERATOR_SUFFIXES.items():
+                    for field, value in w.update.get(op, {}).items():
+                        if field in VALUE_FIELDS:
+                            row[field + suffix] = plain_value(value)
+                self._buffers.setdefault(w.interval, []).append(row)
+            if self._oldest is None:
+                self._oldest = time.monotonic()
+            buffered = sum(len(rows) for rows in self._buffers.values())
+            due = time.monotonic() - self._oldest >= self.flush_seconds
+            if buffered >= self.flush_rows or due:
+                self._flush_locked()
+        return len(writes)
+
+    def _flush_locked(self):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        for interval, rows in self._buffers.items():
+            if not rows:
+                continue
+            directory = os.path.join(self.directory, interval)
+            os.makedirs(directory, exist_ok=True)
+            table = pa.Table.from_pylist([{c: r.get(c) for c in PART_COLUMNS} for r in rows])
+            # time_ns names keep the parts in write order
+            path = os.path.join(directory, f"part-{time.time_ns()}.parquet")
+            pq.write_table(table, path, compression="zstd")
+        self._buffers = {}
+        self._oldest = None
+
+    def flush(self):
+        with self._lock:
+            self._flush_locked()
+
+
+def compact_parts(frame):
+    """
+    Fold append-only rows (in write order) into one row per (s, i, t), as Mongo would
+    have applied the same updates. A field is expected to be written by $set/$setOnInsert
+    plus at most one of $max/$min, which is how every writer uses them.
+    """
+    import numpy as np
+    import pandas as pd
+
+    frame = frame.reset_index(drop=True)
+    by = [frame[k] for k in KEYS]
+    position = frame.groupby(by, sort=False).cumcount()
+    out = {}
+    for field in VALUE_FIELDS:
+        empty = pd.Series(np.nan, index=frame.index, dtype=object)
+        set_values = frame[field] if field in frame else empty
+        inserted = frame[field + "__ins"] if field + "__ins" in frame else empty
+        # Last $set, else the $setOnInsert of the write that created the bar
+        value = set_values.groupby(by).last()
+        value = value.combine_first(inserted.where(position == 0).groupby(by).first())
+        # $max/$min only fold what was written after the last $set
+        last_set = position.where(set_values.notna()).groupby(by).transform("max").fillna(-1)
+        after_set = position > last_set
+        for suffix, fold in (("__max", np.fmax), ("__min", np.fmin)):
+            if field + suffix in frame:
+                extreme = frame[field + suffix].where(after_set).astype(float)
+                extreme = getattr(extreme.groupby(by), suffix[2:])()
+                value = pd.Series(fold(value.astype(float), extreme), index=value.index)
+        out[field] = value
+    compacted = pd.DataFrame(out).reset_index()
+    compacted.columns = list(COLUMNS)
+    return compacted.sort_values(list(KEYS), ignore_index=True)
+
+
+def read_bars(directory: str, interval: str):
+    """Compact the append-only parts of one interval into a frame, one row per (s, i, t)"""
+    import pandas as pd
+
+    paths = sorted(glob.glob(os.path.join(directory, interval, "part-*.parquet")))
+    if not paths:
+        return pd.DataFrame(columns=list(COLUMNS))
+    # Parts written before the operator columns existed only hold $set columns
+    return compact_parts(pd.concat([pd.read_parquet(p) for p in paths], ignore_index=True))
@@ -0,0 +1,135 @@
+import json
+import os
+import sqlite3
+import sys
+import threading
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from src.configs.config_schema import (
+    F_INDICATORS,
+    F_SOURCE,
+    F_UPDATED,
+    F_VERSION,
+    OHLCV_FIELDS,
+)
+from src.storage.base import SUPPORTED_OPERATORS, BarSink, plain_value
+
+# v2 field -> column; (s, i, t) is the primary key, t in epoch ms
+COLUMNS = OHLCV_FIELDS + (F_UPDATED, F_INDICATORS, F_VERSION, F_SOURCE)
+
+CREATE_TABLE = """
+CREATE TABLE IF NOT EXISTS bars (
+    s TEXT NOT NULL,
+    i TEXT NOT NULL,
+    t INTEGER NOT NULL,
+    o REAL, h REAL, l REAL, c REAL, v REAL,
+    u INTEGER,
+    ind TEXT,
+    _v INTEGER,
+    src TEXT,
+    PRIMARY KEY (s, i, t)
+) WITHOUT ROWID
+"""
+
+
+class SQLiteSink(BarSink):
+    """
+    Embedded bar store: WAL journal, synchronous=NORMAL and one transaction per batch,
+    so a batch costs one fsync instead of one per row.
+    """
+
+    name = "sqlite"
+
+    def __init__(self, path: str):
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self.path = path
+        # Writes may come from pipeline worker threads; the lock serializes them
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(CREATE_TABLE)
+        # Files created before the src column existed
+        existing = {row[1] for row in self.conn.execute("PRAGMA table_info(bars)")}
+        if F_SOURCE not in existing:
+            self.conn.execute(f"ALTER TABLE bars ADD COLUMN {F_SOURCE} TEXT")
+        self._lock = threading.Lock()
+        self._statements = {}
+
+    def _statement(self, set_cols: tuple, max_cols: tuple, min_cols: tuple, insert_cols: tuple):
+        key = (set_cols, max_cols, min_cols, insert_cols)
+        sql = self._statements.get(key)
+        if sql is None:
+            cols = ("s", "i", "t") + set_cols + max_cols + min_cols + insert_cols
+            placeholders = ", ".join("?" for _ in cols)
+            # $max/$min keep the stored value unless the new one is beyond it (NULL counts as absent)
+            assignments = [f"{c} = excluded.{c}" for c in set_cols]
+            assignments += [
+                f"{c} = CASE WHEN bars.{c} IS NULL OR excluded.{c} > bars.{c} "
+                f"THEN excluded.{c} ELSE bars.{c} END"
+                for c in max_cols
+            ]
+            assignments += [
+                f"{c} = CASE WHEN bars.{c} IS NULL OR excluded.{c} < bars.{c} "
+                f"THEN excluded.{c} ELSE bars.{c} END"
+                for c in min_cols
+            ]
+            if assignments:
+                conflict = f"DO UPDATE SET {', '.join(assignments)}"
+            else:
+                conflict = "DO NOTHING"
+            sql = (
+                f"INSERT INTO bars ({', '.join(cols)}) VALUES ({placeholders}) "
+                f"ON CONFLICT (s, i, t) {conflict}"
+            )
+            self._statements[key] = sql
+        return sql
+
+    @staticmethod
+    def _column_value(col: str, value):
+        if col == F_INDICATORS and value is not None:
+            return json.dumps(value)
+        return plain_value(value)
+
+    def write(self, writes: list):
+        groups = {}
+        for w in writes:
+            unsupported = set(w.update) - set(SUPPORTED_OPERATORS)
+            if unsupported:
+                raise ValueError(f"SQLiteSink does not support {sorted(unsupported)}")
+            set_fields = w.update.get("$set", {})
+            max_fields = w.update.get("$max", {})
+            min_fields = w.update.get("$min", {})
+            insert_fields = w.update.get("$setOnInsert", {})
+            set_cols = tuple(c for c in COLUMNS if c in set_fields)
+            max_cols = tuple(c for c in COLUMNS if c in max_fields and c not in set_fields)
+            min_cols = tuple(
+                c for c in COLUMNS if c in min_fields and c not in set_fields and c not in max_fields
+            )
+            taken = set(set_cols + max_cols + min_cols)
+            insert_cols = tuple(c for c in COLUMNS if c in insert_fields and c not in taken)
+            row = [w.symbol, w.interval, int(w.ts_ms)]
+            for cols, fields in (
+                (set_cols, set_fields),
+                (max_cols, max_fields),
+                (min_cols, min_fields),
+                (insert_cols, insert_fields),
+            ):
+                row += [self._column_value(c, fields[c]) for c in cols]
+            groups.setdefault((set_cols, max_cols, min_cols, insert_cols), []).append(row)
+
+        with self._lock:
+            self.conn.execute("BEGIN")
+            try:
+                for cols, rows in groups.items():
+                    self.conn.executemany(self._statement(*cols), rows)
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+        return len(writes)
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
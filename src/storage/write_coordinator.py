@@ -0,0 +1,225 @@
+import os
+import sys
+import threading
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from src.configs.config_interval import INTERVAL_MS
+from src.configs.config_schema import F_CLOSE, F_HIGH, F_LOW, F_OPEN, F_VOLUME
+from src.configs.config_variable import WRITE_COORDINATOR_CONFIG
+from src.log.logger_setup import LoggerSetup
+from src.metrics.stage_stats import StageStats
+from src.storage.base import BarSink, BarWrite, merge_updates
+from src.storage.factory import build_sink
+
+# A non-owner's $set on an owned field may only fill it in (or widen high/low)
+_DOWNGRADE = {F_OPEN: "$setOnInsert", F_HIGH: "$max", F_LOW: "$min"}
+
+# Price fields still moving while the candle is open (its open is already final)
+_OPEN_CANDLE_FIELDS = (F_HIGH, F_LOW, F_CLOSE, F_VOLUME)
+
+def resolve_conflicts(update: dict):
+    """
+    One operator per field (Mongo rejects a path in two operators): the update's operators
+    are replayed in order, with the same per-field rules as merge_updates
+    """
+    return merge_updates({}, update)
+
+
+class WriteCoordinator:
+    """
+    Single writer for bar mutations of every producer in the process.
+
+    Producers submit BarWrite tagged with their source ("realtime", "historical").
+    Pending mutations are partitioned by candle key (s, i, t) and merged there:
+    each contested field has an owner (WRITE_COORDINATOR_CONFIG["field_owners"]), and
+    a non-owner's $set on it is downgraded so it can only fill in a missing value or
+    widen high/low. Flushes send one merged op per candle, one at a time, so competing
+    producers never overwrite each other and nothing reads before writing.
+
+    Writes accumulate until batch_size candles are pending or flush_interval_seconds
+    pass (background flusher thread), so repeated polls of the same candle cost one op.
+    Callers that need to know when a write is stored pass on_commit to submit().
+    """
+
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    # Singleton instance
+    def __new__(cls):
+        with cls._instance_lock:
+            if cls._instance is None:
+                cls._instance = super().__new__(cls)
+                cls._instance._init_coordinator()
+        return cls._instance
+
+    def _init_coordinator(self):
+        self.logger = LoggerSetup.logger_setup("WriteCoordinator")
+        config = WRITE_COORDINATOR_CONFIG
+        self.sink = build_sink(mongo_profile=config.get("mongo_profile", "realtime"))
+        self.batch_size = config.get("batch_size", 500)
+        self.flush_interval = config.get("flush_interval_seconds", 1.0)
+        self.field_owners = config.get("field_owners", {})
+        self.open_candle_owner = config.get("open_candle_owner", "realtime")
+        self._pending = {}
+        # on_commit callbacks of the pending writes, run after the flush that stores them
+        self._callbacks = []
+        self._lock = threading.Lock()
+        # Flushes are serialized so batches reach the sink in submit order
+        self._flush_lock = threading.Lock()
+        self.submitted = 0
+        self.written = 0
+        self.flushes = 0
+        # Write stage of the live path: flush latency per batch, submit -> commit per callback
+        self.started_at = time.perf_counter()
+        self.write_stats = StageStats(sample_size=config.get("latency_samples", 10000))
+        self.commit_stats = StageStats(sample_size=config.get("latency_samples", 10000))
+        self.thread = None
+        self._thread_lock = threading.Lock()
+        self._stop_event = threading.Event()
+
+    def _owned_update(self, write: BarWrite, source: str, now_ms: int):
+        owners = self.field_owners.get(write.interval)
+        if not owners:
+            return write.update
+        # While the candle is open its price fields belong to the live feed
+        is_open = write.ts_ms + INTERVAL_MS.get(write.interval, 0) > now_ms
+        update = {}
+        for op, fields in write.update.items():
+            for field, value in fields.items():
+                owner = owners.get(field)
+                if is_open and field in _OPEN_CANDLE_FIELDS:
+                    owner = self.open_candle_owner
+                target = op
+                if op == "$set" and owner is not None and owner != source:
+                    target = _DOWNGRADE.get(field, "$setOnInsert")
+                update.setdefault(target, {})[field] = value
+        return update
+
+    def submit(self, writes: list, source: str, on_commit=None):
+        """
+        Queue mutations from `source`; they are stored by the next flush (batch_size pending
+        candles or flush_interval_seconds). on_commit() runs once they are stored.
+        """
+        if self.thread is None or not self.thread.is_alive():
+            self.start()
+        now_ms = int(time.time() * 1000)
+        with self._lock:
+            for w in writes:
+                key = (w.symbol, w.interval, w.ts_ms)
+                update = self._owned_update(w, source, now_ms)
+                previous = self._pending.get(key)
+                if previous is not None:
+                    update = merge_updates(previous.update, update)
+                self._pending[key] = BarWrite(w.symbol, w.interval, w.ts_ms, update)
+            if on_commit is not None:
+                self._callbacks.append((on_commit, time.perf_counter()))
+            self.submitted += len(writes)
+            full = len(self._pending) >= self.batch_size
+        if full:
+            self.flush()
+
+    def flush(self):
+        """Write every pending candle as one merged op; returns the number of ops sent"""
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, {}
+                callbacks, self._callbacks = self._callbacks, []
+            if not pending:
+                return 0
+            writes = [w._replace(update=resolve_conflicts(w.update)) for w in pending.values()]
+            started = time.perf_counter()
+            try:
+                self.sink.write(writes)
+            except Exception:
+                self.write_stats.errors += 1
+                # Put the batch back in front of newer mutations so nothing is lost
+                with self._lock:
+                    for key, write in pending.items():
+                        newer = self._pending.get(key)
+                        if newer is not None:
+                            write = write._replace(update=merge_updates(write.update, newer.update))
+                        self._pending[key] = write
+                    self._callbacks[:0] = callbacks
+                raise
+            committed = time.perf_counter()
+            self.write_stats.record(committed - started, len(writes))
+            self.written += len(writes)
+            self.flushes += 1
+        for callback, submitted_at in callbacks:
+            self.commit_stats.record(committed - submitted_at)
+            try:
+                callback()
+            except Exception as e:
+                self.logger.error(f"on_commit callback failed: {e}")
+        return len(writes)
+
+    def write(self, writes: list, source: str):
+        """Queue mutations; stored within flush_interval_seconds (call flush() to wait for it)"""
+        self.submit(writes, source)
+        return len(writes)
+
+    def _run_loop(self):
+        while not self._stop_event.wait(self.flush_interval):
+            try:
+                self.flush()
+            except Exception as e:
+                # The batch stays pending and goes out with the next flush
+                self.logger.error(f"Write coordinator flush failed: {e}")
+
+    def start(self):
+        with self._thread_lock:
+            if self.thread is not None and self.thread.is_alive():
+                return True
+            self._stop_event.clear()
+            self.thread = threading.Thread(target=self._run_loop, name="write-coordinator", daemon=True)
+            self.thread.start()
+        return True
+
+    def stop(self):
+        self._stop_event.set()
+        if self.thread is not None and self.thread.is_alive():
+            self.thread.join(timeout=self.flush_interval + 5)
+        self.flush()
+
+    def for_source(self, source: str):
+        return _SourceSink(self, source)
+
+    def stats(self):
+        uptime = time.perf_counter() - self.started_at
+        return {
+            "submitted": self.submitted,
+            "written": self.written,
+            "flushes": self.flushes,
+            # Queue depth: candles and on_commit callbacks waiting for the next flush
+            "pending": len(self._pending),
+            "pending_callbacks": len(self._callbacks),
+            "write": self.write_stats.as_dict(uptime),
+            "submit_to_commit": self.commit_stats.as_dict(uptime),
+            "flusher_alive": self.thread is not None and self.thread.is_alive(),
+        }
+
+
+class _SourceSink(BarSink):
+    """BarSink view that tags writes with their producer; the coordinator's sink stays shared"""
+
+    name = "coordinated"
+
+    def __init__(self, coordinator: WriteCoordinator, source: str):
+        self.coordinator = coordinator
+        self.source = source
+
+    def write(self, writes: list):
+        return self.coordinator.write(writes, self.source)
+
+    def submit(self, writes: list, on_commit=None):
+        self.coordinator.submit(writes, self.source, on_commit)
+        return len(writes)
+
+    def flush(self):
+        self.coordinator.flush()
+
+    def close(self):
+        # Other producers still write through the shared sink
+        self.coordinator.flush()
@@ -0,0 +1,204 @@
+import bisect
+from collections import deque, namedtuple
+
+Alert = namedtuple("Alert", ["rule", "ts_ms", "value", "message"])
+
+MINUTE_MS = 60 * 1000
+DAY_MS = 24 * 60 * MINUTE_MS
+
+
+class _WindowExtremes:
+    """Rolling min/max over a time window with monotonic deques (amortized O(1) per tick)"""
+
+    __slots__ = ("window_ms", "_max", "_min")
+
+    def __init__(self, window_ms: int):
+        self.window_ms = window_ms
+        self._max = deque()
+        self._min = deque()
+
+    def push(self, ts_ms: int, high: float, low: float):
+        while self._max and self._max[-1][1] <= high:
+            self._max.pop()
+        self._max.append((ts_ms, high))
+        while self._min and self._min[-1][1] >= low:
+            self._min.pop()
+        self._min.append((ts_ms, low))
+
+    def evict(self, now_ms: int):
+        cutoff = now_ms - self.window_ms
+        while self._max and self._max[0][0] < cutoff:
+            self._max.popleft()
+        while self._min and self._min[0][0] < cutoff:
+            self._min.popleft()
+
+    def max(self):
+        return self._max[0][1] if self._max else None
+
+    def min(self):
+        return self._min[0][1] if self._min else None
+
+
+class AlertRulesEngine:
+    """
+    Evaluates alert rules against in-memory rolling state on every tick.
+
+    Rule types (dicts from ALERT_RULES_CONFIG["rules"]):
+      threshold: {"level": 60.0, "direction": "up" | "down" | "both"}
+      move:      {"pct": 0.5, "window_minutes": 15}
+      new_high / new_low: {"days": 30}
+    Every rule has a "name" and an optional "cooldown_seconds".
+    """
+
+    def __init__(self, rules: list):
+        self.rules = {rule["name"]: rule for rule in rules}
+        self._last_fired = {}
+        self._prev_value = None
+
+        # Threshold levels kept sorted so a tick finds crossed levels with bisect
+        thresholds = sorted(
+            (r for r in rules if r.get("type") == "threshold"), key=lambda r: r["level"]
+        )
+        self._levels = [r["level"] for r in thresholds]
+        self._level_rules = thresholds
+
+        # Move / new-extreme rules sharing a window share one rolling state.
+        # Move rules of a window are sorted by pct so a tick bisects the ones it exceeded.
+        self._move_windows = {}
+        self._move_index = {}
+        self._extreme_windows = {}
+        self._high_rules = {}
+        self._low_rules = {}
+        for rule in rules:
+            rule_type = rule.get("type")
+            if rule_type == "move":
+                window_ms = int(rule["window_minutes"] * MINUTE_MS)
+                self._move_windows.setdefault(window_ms, _WindowExtremes(window_ms))
+                self._move_index.setdefault(window_ms, []).append(rule)
+            elif rule_type in ("new_high", "new_low"):
+                window_ms = int(rule["days"] * DAY_MS)
+                self._extreme_windows.setdefault(window_ms, _WindowExtremes(window_ms))
+                target = self._high_rules if rule_type == "new_high" else self._low_rules
+                target.setdefault(window_ms, []).append(rule)
+        for window_ms, window_rules in self._move_index.items():
+            window_rules.sort(key=lambda r: r["pct"])
+            self._move_index[window_ms] = ([r["pct"] for r in window_rules], window_rules)
+
+    def warm_up(self, bars):
+        """Seed rolling state from (ts_ms, high, low, close) tuples, oldest first; never fires"""
+        for ts_ms, high, low, close in bars:
+            for window in self._extreme_windows.values():
+                window.push(ts_ms, high, low)
+            for window in self._move_windows.values():
+                window.push(ts_ms, close, close)
+            self._prev_value = close
+
+    def _cooled_down(self, rule: dict, now_ms: int):
+        last = self._last_fired.get(rule["name"])
+        cooldown_ms = rule.get("cooldown_seconds", 0) * 1000
+        return last is None or now_ms - last >= cooldown_ms
+
+    def _fire(self, alerts: list, rule: dict, ts_ms: int, value: float, message: str):
+        if self._cooled_down(rule, ts_ms):
+            self._last_fired[rule["name"]] = ts_ms
+            alerts.append(Alert(rule["name"], ts_ms, value, message))
+
+    def _threshold_alerts(self, alerts: list, ts_ms: int, value: float):
+        prev = self._prev_value
+        if prev is None or value == prev:
+            return
+        if value > prev:
+            # Levels in (prev, value] were crossed upwards
+            direction = "up"
+            lo = bisect.bisect_right(self._levels, prev)
+            hi = bisect.bisect_right(self._levels, value)
+        else:
+            # Levels in [value, prev) were crossed downwards
+            direction = "down"
+            lo = bisect.bisect_left(self._levels, value)
+            hi = bisect.bisect_left(self._levels, prev)
+        for rule in self._level_rules[lo:hi]:
+            if rule.get("direction", "both") in ("both", direction):
+                self._fire(
+                    alerts, rule, ts_ms, value,
+                    f"{rule['name']}: crossed {direction} {rule['level']} (now {value:.4f})",
+                )
+
+    def proximity_pct(self, value: float, now_ms: int = None):
+        """
+        Smallest distance, in % of value, before some rule would fire on a tick at `value`;
+        rules still cooling down at now_ms are skipped. None if nothing can fire. Read-only.
+        """
+        if value is None or not value:
+            return None
+        value = float(value)
+        armed = lambda rules: any(now_ms is None or self._cooled_down(r, now_ms) for r in rules)
+        distances = []
+        if self._levels:
+            i = bisect.bisect_left(self._levels, value)
+            for j in range(max(0, i - 1), min(len(self._levels), i + 1)):
+                if armed([self._level_rules[j]]):
+                    distances.append(abs(self._levels[j] - value) / value * 100)
+        for window_ms, (pcts, window_rules) in self._move_index.items():
+            window = self._move_windows[window_ms]
+            low, high = window.min(), window.max()
+            if low is None or high is None or not armed(window_rules):
+                continue
+            up = (value - low) / low * 100 if low else 0.0
+            down = (high - value) / high * 100 if high else 0.0
+            distances.append(max(0.0, pcts[0] - max(up, down)))
+        for window_ms, window in self._extreme_windows.items():
+            if armed(self._high_rules.get(window_ms, [])) and window.max() is not None:
+                distances.append(max(0.0, (window.max() - value) / value * 100))
+            if armed(self._low_rules.get(window_ms, [])) and window.min() is not None:
+                distances.append(max(0.0, (value - window.min()) / value * 100))
+        return min(distances) if distances else None
+
+    def evaluate(self, ts_ms: int, value: float):
+        """Evaluate every rule for one tick; returns the list of alerts that fired"""
+        alerts = []
+        if value is None:
+            return alerts
+        value = float(value)
+
+        if self._levels:
+            self._threshold_alerts(alerts, ts_ms, value)
+
+        for window in self._move_windows.values():
+            window.push(ts_ms, value, value)
+            window.evict(ts_ms)
+        for window in self._extreme_windows.values():
+            window.evict(ts_ms)
+
+        for window_ms, (pcts, window_rules) in self._move_index.items():
+            window = self._move_windows[window_ms]
+            low, high = window.min(), window.max()
+            up = (value - low) / low * 100 if low else 0.0
+            down = (high - value) / high * 100 if high else 0.0
+            change = up if up >= down else -down
+            for rule in window_rules[: bisect.bisect_right(pcts, abs(change))]:
+                self._fire(
+                    alerts, rule, ts_ms, value,
+                    f"{rule['name']}: moved {change:+.2f}% in {rule['window_minutes']}m (now {value:.4f})",
+                )
+
+        for window_ms, window in self._extreme_windows.items():
+            previous_high, previous_low = window.max(), window.min()
+            if previous_high is not None and value > previous_high:
+                for rule in self._high_rules.get(window_ms, []):
+                    self._fire(
+                        alerts, rule, ts_ms, value,
+                        f"{rule['name']}: new {rule['days']}-day high {value:.4f} (prev {previous_high:.4f})",
+                    )
+            if previous_low is not None and value < previous_low:
+                for rule in self._low_rules.get(window_ms, []):
+                    self._fire(
+                        alerts, rule, ts_ms, value,
+                        f"{rule['name']}: new {rule['days']}-day low {value:.4f} (prev {previous_low:.4f})",
+                    )
+
+        # Extremes are compared against the window before this tick, then updated
+        for window in self._extreme_windows.values():
+            window.push(ts_ms, value, value)
+        self._prev_value = value
+        return alerts
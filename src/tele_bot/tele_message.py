@@ -7,25 +7,62 @@ from datetime import datetime, timedelta
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
 
+from src.cache.recent_bars import RecentBars
 from src.configs.config_mongo import MongoDBConfig
+from src.configs.config_schema import (
+    F_CLOSE,
+    F_HIGH,
+    F_INTERVAL,
+    F_LOW,
+    F_SYMBOL,
+    F_TIME,
+    F_UPDATED,
+    date_to_ms,
+    doc_ms,
+)
 from src.configs.config_variable import (
+    ALERT_RULES_CONFIG,
     DATA_CRAWL_CONFIG,
     TELEGRAM_CONFIG,
     EXTRACT_CONFIG,
+    FRESHNESS_CONFIG,
+    REALTIME_CADENCE_CONFIG,
 )
 from src.log.logger_setup import LoggerSetup
+from src.metrics.freshness import FreshnessTracker
+from src.tele_bot.alert_rules import AlertRulesEngine
 
 
 class TelegramMonitor:
-    def __init__(self):
+    """
+    Data-absence and freshness SLO alerts plus per-tick alert rules. One per process:
+    every extractor and the supervisor share the same instance (and alert cooldowns).
+    Checks run after each realtime write and, so a stalled extractor is noticed too, as a
+    supervised crawl scheduler job (check_step) every check_interval seconds.
+    """
+
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    # Singleton instance
+    def __new__(cls):
+        with cls._instance_lock:
+            if cls._instance is None:
+                cls._instance = super().__new__(cls)
+                cls._instance._init_monitor()
+        return cls._instance
+
+    def _init_monitor(self):
         self.logger = LoggerSetup.logger_setup("Telegram Monitor")
 
         mongo_config = MongoDBConfig()
-        self.mongo_client = mongo_config.get_client()
+        self.mongo_client = mongo_config.get_client("monitor")
         self.collection = self.mongo_client.get_database(
             DATA_CRAWL_CONFIG.get("db")
         ).get_collection(DATA_CRAWL_CONFIG.get("collection"))
 
+        self.symbol = DATA_CRAWL_CONFIG.get("symbol", "BTC.D")
+
         self.bot_token = TELEGRAM_CONFIG.get("bot_token")
         self.chat_id = TELEGRAM_CONFIG.get("chat_id")
         self.check_interval = TELEGRAM_CONFIG.get("check_interval", 30)
@@ -34,11 +71,65 @@ class TelegramMonitor:
         self.running = False
         self.last_alert_time = None
         self.alert_cooldown = 300
+        # Đã gửi alert mất dữ liệu, chờ gửi thông báo phục hồi
+        self.data_was_missing = False
+
+        # Freshness SLO: p95 of bar close -> commit per symbol, not only "is data arriving"
+        self.freshness = FreshnessTracker()
+        self.slo_seconds = FRESHNESS_CONFIG.get("slo_seconds", 45)
+        self.slo_percentile = FRESHNESS_CONFIG.get("slo_percentile", 95)
+        self.slo_min_samples = FRESHNESS_CONFIG.get("min_samples", 20)
+        self.slo_cooldown = FRESHNESS_CONFIG.get("alert_cooldown_seconds", 900)
+        # symbol -> time of the last breach alert, while the symbol is in breach
+        self.slo_breached = {}
+
+        # Rule-based alerts evaluated per tick against in-memory state
+        self.rules_engine = None
+        if ALERT_RULES_CONFIG.get("enabled") and ALERT_RULES_CONFIG.get("rules"):
+            self.rules_engine = AlertRulesEngine(ALERT_RULES_CONFIG["rules"])
+            self._warm_up_rules()
 
         self.logger.info(
             f"Telegram Monitor initialized with check interval: {self.check_interval}s"
         )
 
+    def _warm_up_rules(self):
+        """Seed rolling windows once from daily candles; per-tick evaluation never queries Mongo"""
+        try:
+            days = ALERT_RULES_CONFIG.get("warmup_days", 30)
+            docs = self.collection.find(
+                {
+                    F_SYMBOL: self.symbol,
+                    F_INTERVAL: "1d",
+                    F_TIME: {"$gte": datetime.utcnow() - timedelta(days=days)},
+                },
+                {"_id": 0, F_TIME: 1, F_HIGH: 1, F_LOW: 1, F_CLOSE: 1},
+            ).sort(F_TIME, 1)
+            bars = [
+                (doc_ms(d), d[F_HIGH], d[F_LOW], d.get(F_CLOSE))
+                for d in docs
+                if d.get(F_HIGH) is not None and d.get(F_LOW) is not None
+            ]
+            self.rules_engine.warm_up(bars)
+            self.logger.info(f"Alert rules warmed up with {len(bars)} daily candles")
+        except Exception as e:
+            self.logger.error(f"Failed to warm up alert rules: {str(e)}")
+
+    def evaluate_tick(self, ts_ms: int, value: float):
+        """Gọi từ realtime extractor với mỗi tick mới"""
+        if self.rules_engine is None:
+            return []
+        try:
+            alerts = self.rules_engine.evaluate(ts_ms, value)
+        except Exception as e:
+            self.logger.error(f"Error evaluating alert rules: {str(e)}")
+            return []
+        for alert in alerts:
+            self.logger.info(f"Alert rule fired: {alert.message}")
+            if self.bot_token and self.chat_id:
+                self.send_telegram_message(f"<b>BTC Dominance Alert</b>\n\n{alert.message}")
+        return alerts
+
     def send_telegram_message(self, message):
         try:
             url = f"https://api.telegram.org/bot{self.bot_token}/sendMessage"
@@ -75,63 +166,38 @@ class TelegramMonitor:
     def check_recent_data(self):
         try:
             current_time = datetime.utcnow()
-            # Determine expected max age based on realtime poll cadence + data timeout
-            realtime_poll = EXTRACT_CONFIG.get("realtime_poll_seconds", 24 * 60 * 60)
+            # Expected max age: slowest realtime poll cadence (flat market) + data timeout
+            realtime_poll = EXTRACT_CONFIG.get("realtime_poll_seconds", 30)
+            if REALTIME_CADENCE_CONFIG.get("enabled", False):
+                realtime_poll = max(realtime_poll, REALTIME_CADENCE_CONFIG.get("flat_seconds", 60))
             expected_max_age = int(realtime_poll) + int(self.data_timeout)
             cutoff_time = current_time - timedelta(seconds=expected_max_age)
-            cutoff_ts_ms = int(cutoff_time.timestamp() * 1000)
+            cutoff_ts_ms = date_to_ms(cutoff_time)
 
-            # Try fast path: count by timestamp_ms if present
-            try:
-                recent_count = self.collection.count_documents(
-                    {"timestamp_ms": {"$gte": cutoff_ts_ms}}
+            # Fastest path: the in-memory recent window filled by the realtime extractor
+            latest_bar = RecentBars(self.symbol).latest()
+            if latest_bar is not None and latest_bar.timestamp_ms >= cutoff_ts_ms:
+                self.logger.debug(
+                    f"Latest in-memory bar ts={latest_bar.timestamp_ms} is within {expected_max_age}s"
                 )
-                if recent_count > 0:
-                    self.logger.debug(
-                        f"Found {recent_count} records by timestamp_ms in last {expected_max_age}s (realtime poll {realtime_poll}s + timeout {self.data_timeout}s)"
-                    )
-                    return True
-            except Exception:
-                # ignore and fallback
-                pass
-
-            # Fallback: get the latest document and inspect its time fields
-            latest = (
-                self.collection.find_one(sort=[("timestamp_ms", -1)])
-                or self.collection.find_one(sort=[("datetime", -1)])
-                or self.collection.find_one(sort=[("_id", -1)])
-            )
+                return True
 
+            # Latest candle via the (s, i, t) index; realtime updates stamp "u" on it
+            latest = self.collection.find_one(
+                {F_SYMBOL: self.symbol, F_INTERVAL: "1d"},
+                {"_id": 0, F_TIME: 1, F_UPDATED: 1},
+                sort=[(F_TIME, -1)],
+            )
             if not latest:
                 self.logger.debug("No documents found in collection at all")
                 return False
 
-            # If timestamp_ms exists, compare directly
-            if "timestamp_ms" in latest:
-                ts = int(latest["timestamp_ms"])
-                delta = (int(datetime.utcnow().timestamp() * 1000) - ts) / 1000.0
-                self.logger.debug(f"Latest timestamp_ms: {ts} ({delta:.1f}s ago)")
-                return ts >= cutoff_ts_ms
-
-            # If datetime string exists, try parse (common format)
-            if "datetime" in latest and isinstance(latest["datetime"], str):
-                try:
-                    dt = datetime.strptime(latest["datetime"], "%Y-%m-%d %H:%M:%S")
-                except Exception:
-                    try:
-                        dt = datetime.fromisoformat(latest["datetime"])
-                    except Exception:
-                        self.logger.debug(
-                            "Latest document has datetime but cannot parse"
-                        )
-                        return False
-                delta = (datetime.utcnow() - dt).total_seconds()
-                self.logger.debug(f"Latest datetime field: {dt} ({delta:.1f}s ago)")
-                return delta <= expected_max_age
-
-            # As last resort, treat as no recent data
-            self.logger.debug("Latest document has no recognizable timestamp field")
-            return False
+            last_seen = max(latest[F_TIME], latest.get(F_UPDATED) or latest[F_TIME])
+            delta = (current_time - last_seen).total_seconds()
+            self.logger.debug(
+                f"Latest candle update {last_seen} ({delta:.1f}s ago, realtime poll {realtime_poll}s + timeout {self.data_timeout}s)"
+            )
+            return last_seen >= cutoff_time
 
         except Exception as e:
             self.logger.error(f"Error checking recent data: {str(e)}")
@@ -171,19 +237,50 @@ System has recovered successfully!
         """
         return message.strip()
 
-    def monitor_loop(self):
-        self.logger.info("Starting data monitoring...")
-        data_was_missing = False
+    def format_freshness_alert(self, symbol: str, value: float, samples: int):
+        stats = self.freshness.percentiles(symbol)
+        upstream = stats.get("upstream_to_fetch", {}).get(f"p{self.slo_percentile}_s")
+        commit = stats.get("fetch_to_commit", {}).get(f"p{self.slo_percentile}_s")
+        message = f"""
+<b>Data Freshness SLO Breach</b>
 
-        while self.running:
-            try:
-                # Chỉ kiểm tra dữ liệu khi được trigger từ realtime extractor
-                # Không tự động kiểm tra liên tục nữa
-                time.sleep(self.check_interval)
+Symbol: {symbol}
+p{self.slo_percentile} bar close -> commit: {value:.1f}s (SLO {self.slo_seconds}s, {samples} bars)
+"""
+        if upstream is not None and commit is not None:
+            message += f"close -> fetch p{self.slo_percentile}: {upstream:.1f}s, fetch -> commit p{self.slo_percentile}: {commit:.1f}s\n"
+        return message.strip()
 
-            except Exception as e:
-                self.logger.error(f"Error in monitor loop: {str(e)}")
-                time.sleep(self.check_interval)
+    def check_freshness_slo(self):
+        """Alert per symbol whose rolling freshness percentile is over the SLO; returns the breaches"""
+        try:
+            breaches = self.freshness.breaches(self.slo_seconds, self.slo_percentile, self.slo_min_samples)
+            now = time.time()
+            breached = set()
+            for symbol, value, samples in breaches:
+                breached.add(symbol)
+                self.logger.warning(
+                    f"Freshness SLO breach for {symbol}: p{self.slo_percentile}={value:.1f}s > {self.slo_seconds}s"
+                )
+                last_alert = self.slo_breached.get(symbol)
+                if last_alert is not None and now - last_alert < self.slo_cooldown:
+                    continue
+                self.slo_breached[symbol] = now
+                if self.bot_token and self.chat_id:
+                    self.send_telegram_message(self.format_freshness_alert(symbol, value, samples))
+
+            for symbol in [s for s in self.slo_breached if s not in breached]:
+                del self.slo_breached[symbol]
+                self.logger.info(f"Freshness of {symbol} back within SLO")
+                if self.bot_token and self.chat_id:
+                    self.send_telegram_message(
+                        f"<b>Data Freshness Recovered</b>\n\nSymbol: {symbol}\n"
+                        f"p{self.slo_percentile} bar close -> commit back under {self.slo_seconds}s"
+                    )
+            return breaches
+        except Exception as e:
+            self.logger.error(f"Error checking freshness SLO: {str(e)}")
+            return []
 
     def check_data_after_realtime_extract(self):
         """
@@ -192,15 +289,15 @@ System has recovered successfully!
         """
         try:
             self.logger.info("Checking data after realtime extraction...")
+            self.check_freshness_slo()
             has_recent_data = self.check_recent_data()
-            data_was_missing = False  # Reset trạng thái
 
             if not has_recent_data:
                 if self.should_send_alert():
                     alert_message = self.format_alert_message()
                     if self.send_telegram_message(alert_message):
                         self.last_alert_time = time.time()
-                    data_was_missing = True
+                        self.data_was_missing = True
 
                 self.logger.warning(
                     f"No recent data found in last {self.data_timeout} seconds after realtime extraction"
@@ -208,10 +305,10 @@ System has recovered successfully!
                 return False
 
             else:
-                if data_was_missing:
+                if self.data_was_missing:
                     recovery_message = self.format_recovery_message()
                     self.send_telegram_message(recovery_message)
-                    data_was_missing = False
+                    self.data_was_missing = False
                     self.logger.info("Data flow recovered after realtime extraction")
 
                 self.logger.info("Data check successful after realtime extraction")
@@ -221,16 +318,18 @@ System has recovered successfully!
             self.logger.error(f"Error checking data after realtime extraction: {str(e)}")
             return False
 
+    def check_step(self):
+        """One scheduled data-absence + freshness check; returns the seconds until the next one"""
+        self.check_data_after_realtime_extract()
+        return self.check_interval
+
     def start(self):
         if not self.bot_token or not self.chat_id:
             self.logger.error("Telegram bot token or chat ID not configured")
             return False
 
+        # Không có thread riêng: supervisor chạy check_step như một job trên worker pool
         self.running = True
-        self.monitor_thread = threading.Thread(target=self.monitor_loop)
-        self.monitor_thread.daemon = True
-        self.monitor_thread.start()
-
         self.logger.info("Telegram monitor started")
         return True
 
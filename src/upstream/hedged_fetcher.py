@@ -0,0 +1,277 @@
+import os
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from src.configs.config_variable import SOURCE_CONFIG
+from src.log.logger_setup import LoggerSetup
+from src.upstream.sources import BarSource, build_source
+
+BASIS_MAX_SKEW_MS = 5 * 60 * 1000
+
+
+def _valid(future):
+    """A finished fetch is usable when it returned at least one bar with a close"""
+    if future.exception() is not None:
+        return False
+    bars = future.result()
+    return bool(bars) and bars[-1].close is not None
+
+
+class HedgedFetcher:
+    """
+    Realtime bar fetch hedged across a primary and a secondary source.
+
+    The primary gets every request. If it has not answered within its own recent
+    p<hedge_percentile> latency (or fails fast, e.g. circuit open), the same request goes
+    to the secondary and the first valid answer wins; each bar keeps the name of the
+    source that supplied it in Bar.src. Secondary values are scaled by the last
+    primary/secondary ratio seen within a few minutes (the sources define dominance over
+    different coin sets), refreshed whenever both answer.
+    """
+
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    # Singleton instance
+    def __new__(cls):
+        with cls._instance_lock:
+            if cls._instance is None:
+                cls._instance = super().__new__(cls)
+                cls._instance._init_fetcher()
+        return cls._instance
+
+    def _init_fetcher(self, primary: BarSource = None, secondary: BarSource = None, config: dict = None):
+        self.logger = LoggerSetup.logger_setup("HedgedFetcher")
+        config = config or SOURCE_CONFIG
+        self.enabled = config.get("hedge_enabled", True)
+        self.primary = primary or build_source(config.get("primary", "tradingview"))
+        secondary_name = config.get("secondary")
+        self.secondary = secondary or (build_source(secondary_name) if secondary_name else None)
+        self.percentile = config.get("hedge_percentile", 95)
+        self.min_samples = config.get("min_samples", 20)
+        self.default_delay = config.get("default_hedge_delay_seconds", 3.0)
+        self.min_delay = config.get("min_hedge_delay_seconds", 0.5)
+        self.hedge_max_bars = config.get("hedge_max_bars", 2)
+        self.basis_probe_every = config.get("basis_probe_every", 20)
+        self._executor = ThreadPoolExecutor(
+            max_workers=config.get("max_workers", 4), thread_name_prefix="bar-source"
+        )
+        self._latencies = deque(maxlen=config.get("latency_window", 200))
+        self._lock = threading.Lock()
+        # symbol -> primary close / secondary close (see _update_basis)
+        self._basis = {}
+        self._polls = 0
+        self.requests = 0
+        self.hedged = 0
+        self.wins = {}
+
+    def _timed_primary(self, symbol, exchange, interval, n_bars):
+        started = time.perf_counter()
+        bars = self.primary.get_bars(symbol, exchange=exchange, interval=interval, n_bars=n_bars)
+        if bars:
+            # Late answers count too, otherwise a slow primary would lower its own p95
+            with self._lock:
+                self._latencies.append(time.perf_counter() - started)
+        return bars
+
+    def hedge_delay(self):
+        """Seconds to wait for the primary before asking the secondary"""
+        with self._lock:
+            samples = list(self._latencies)
+        if len(samples) < self.min_samples:
+            return self.default_delay
+        return max(self.min_delay, float(np.percentile(samples, self.percentile)))
+
+    def _can_hedge(self, symbol, n_bars):
+        return (
+            self.enabled
+            and self.secondary is not None
+            and n_bars <= self.hedge_max_bars
+            and self.secondary.supports(symbol, n_bars)
+        )
+
+    def _update_basis(self, symbol, primary_bars, secondary_bars):
+        if not primary_bars or not secondary_bars:
+            return
+        reference = secondary_bars[-1]
+        # The /global snapshot can lag a minute or two; dominance barely moves in that time
+        bar = min(primary_bars, key=lambda b: abs(b.ts_ms - reference.ts_ms))
+        if abs(bar.ts_ms - reference.ts_ms) <= BASIS_MAX_SKEW_MS and bar.close and reference.close:
+            with self._lock:
+                self._basis[symbol] = bar.close / reference.close
+
+    def _adjusted(self, symbol, bars):
+        basis = self._basis.get(symbol)
+        if basis is None:
+            self.logger.warning(f"No {self.secondary.name} basis for {symbol} yet, using raw values")
+            return bars
+
+        def scale(value):
+            return None if value is None else value * basis
+
+        return [
+            bar._replace(open=scale(bar.open), high=scale(bar.high), low=scale(bar.low), close=scale(bar.close))
+            for bar in bars
+        ]
+
+    def _won(self, source: BarSource):
+        with self._lock:
+            self.wins[source.name] = self.wins.get(source.name, 0) + 1
+
+    def _probe_basis(self, symbol, exchange, interval, n_bars, primary_bars):
+        def probe():
+            try:
+                self._update_basis(symbol, primary_bars, self.secondary.get_bars(symbol, exchange, interval, n_bars))
+            except Exception as e:
+                self.logger.debug(f"Basis probe on {self.secondary.name} failed: {e}")
+
+        self._executor.submit(probe)
+
+    def get_bars(self, symbol, exchange="CRYPTOCAP", interval=None, n_bars=1):
+        """
+        Same contract as TradingViewClient.get_bars (Bar list oldest first, or None/[]).
+        Raises the primary's error only when no source produced a valid answer.
+        """
+        with self._lock:
+            self.requests += 1
+        if not self._can_hedge(symbol, n_bars):
+            bars = self._timed_primary(symbol, exchange, interval, n_bars)
+            self._won(self.primary)
+            return bars
+
+        with self._lock:
+            self._polls += 1
+            probe_due = self.basis_probe_every and self._polls % self.basis_probe_every == 0
+        primary = self._executor.submit(self._timed_primary, symbol, exchange, interval, n_bars)
+        wait([primary], timeout=self.hedge_delay())
+        if primary.done() and _valid(primary):
+            bars = primary.result()
+            if probe_due or symbol not in self._basis:
+                self._probe_basis(symbol, exchange, interval, n_bars, bars)
+            self._won(self.primary)
+            return bars
+
+        # Primary slow (or already failed): race the secondary against it
+        with self._lock:
+            self.hedged += 1
+        secondary = self._executor.submit(self.secondary.get_bars, symbol, exchange, interval, n_bars)
+        pending = {secondary} if primary.done() else {primary, secondary}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            # Both in the same instant: the primary's full OHLCV is preferred
+            if primary in done and _valid(primary):
+                self._won(self.primary)
+                return primary.result()
+            if secondary in done and _valid(secondary):
+                secondary_bars = secondary.result()
+                # The primary's late answer still refreshes the basis
+                primary.add_done_callback(
+                    lambda f: _valid(f) and self._update_basis(symbol, f.result(), secondary_bars)
+                )
+                self._won(self.secondary)
+                self.logger.info(f"{symbol} served by {self.secondary.name} (primary slower than hedge delay)")
+                return self._adjusted(symbol, secondary_bars)
+
+        if secondary.exception() is not None:
+            self.logger.warning(f"Hedge to {self.secondary.name} failed: {secondary.exception()}")
+        if primary.exception() is not None:
+            raise primary.exception()
+        return primary.result()
+
+    def latency_percentiles(self):
+        with self._lock:
+            samples = list(self._latencies)
+        if not samples:
+            return {}
+        p50, p95, p99 = (float(p) * 1000 for p in np.percentile(samples, [50, 95, 99]))
+        return {"p50_ms": p50, "p95_ms": p95, "p99_ms": p99}
+
+    def stats(self):
+        return {
+            "requests": self.requests,
+            "hedged": self.hedged,
+            "wins": dict(self.wins),
+            "hedge_delay_s": self.hedge_delay(),
+            "primary_latency": self.latency_percentiles(),
+            "basis": dict(self._basis),
+        }
+
+
+def simulate(polls: int = 200, slow_ratio: float = 0.08, slow_seconds: float = 1.5, seed: int = 3):
+    """
+    Hedged vs primary-only fetch latency against local stand-ins: the primary parses a
+    TradingView-style websocket payload after a heavy-tailed delay, the secondary is a
+    real HTTP server on localhost serving a /global document.
+    """
+    import json
+    import random
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    from src.upstream.sources import GlobalMarketCapSource
+    from src.upstream.tv_bars import _sample_payload, parse_bars
+
+    class GlobalHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            body = json.dumps(
+                {"data": {"market_cap_percentage": {"btc": 57.1}, "updated_at": int(time.time())}}
+            ).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    rng = random.Random(seed)
+
+    class StandInPrimary(BarSource):
+        name = "tradingview"
+
+        def get_bars(self, symbol, exchange="CRYPTOCAP", interval=None, n_bars=1):
+            slow = rng.random() < slow_ratio
+            time.sleep(slow_seconds if slow else rng.uniform(0.02, 0.08))
+            now_s = int(time.time()) // 60 * 60
+            return [bar._replace(src=self.name) for bar in parse_bars(_sample_payload(1, now_s))]
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), GlobalHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/api/v3/global"
+    secondary = GlobalMarketCapSource({"url": url, "timeout_seconds": 2, "symbols": {"BTC.D": "btc"}})
+
+    results = {}
+    try:
+        for name, hedge in (("primary_only", False), ("hedged", True)):
+            fetcher = object.__new__(HedgedFetcher)
+            fetcher._init_fetcher(
+                primary=StandInPrimary(),
+                secondary=secondary,
+                config=dict(SOURCE_CONFIG, hedge_enabled=hedge, min_samples=10, min_hedge_delay_seconds=0.05),
+            )
+            latencies = []
+            for _ in range(polls):
+                started = time.perf_counter()
+                fetcher.get_bars("BTC.D", n_bars=1)
+                latencies.append(time.perf_counter() - started)
+            p50, p95, p99 = np.percentile(latencies, [50, 95, 99]) * 1000
+            results[name] = {"p50_ms": p50, "p95_ms": p95, "p99_ms": p99, **fetcher.stats()}
+            fetcher._executor.shutdown(wait=True)
+    finally:
+        server.shutdown()
+    return results
+
+
+if __name__ == "__main__":
+    for name, r in simulate().items():
+        print(
+            f"{name:>12}: p50 {r['p50_ms']:7.1f} ms  p95 {r['p95_ms']:7.1f} ms  p99 {r['p99_ms']:7.1f} ms  "
+            f"hedged {r['hedged']}  wins {r['wins']}"
+        )
@@ -0,0 +1,82 @@
+import os
+import sys
+
+import requests
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from src.configs.config_variable import SOURCE_CONFIG
+from src.log.logger_setup import LoggerSetup
+from src.upstream.tradingview_client import TradingViewClient
+from src.upstream.tv_bars import Bar
+
+MINUTE_MS = 60 * 1000
+
+
+class BarSource:
+    """Upstream that returns Bar lists (oldest first, tagged with `name`) or None/[]"""
+
+    name = "base"
+
+    def supports(self, symbol: str, n_bars: int):
+        return True
+
+    def get_bars(self, symbol, exchange="CRYPTOCAP", interval=None, n_bars=1):
+        raise NotImplementedError
+
+
+class TradingViewSource(BarSource):
+    """tvDatafeed websocket through the shared TradingViewClient (rate limit + breaker)"""
+
+    name = "tradingview"
+
+    def __init__(self, client: TradingViewClient = None):
+        self.client = client or TradingViewClient()
+
+    def get_bars(self, symbol, exchange="CRYPTOCAP", interval=None, n_bars=1):
+        bars = self.client.get_bars(symbol=symbol, exchange=exchange, interval=interval, n_bars=n_bars)
+        return [bar._replace(src=self.name) for bar in bars] if bars else bars
+
+
+class GlobalMarketCapSource(BarSource):
+    """
+    HTTP global-market-cap endpoint (CoinGecko /global layout). It only knows the current
+    dominance, so it answers with a single bar for the running minute (o = h = l = c, no volume).
+    """
+
+    name = "global_mcap"
+
+    def __init__(self, config: dict = None, session: requests.Session = None):
+        self.logger = LoggerSetup.logger_setup("GlobalMarketCapSource")
+        config = config or SOURCE_CONFIG.get("global_mcap", {})
+        self.url = config.get("url")
+        self.timeout = config.get("timeout_seconds", 5)
+        self.symbols = config.get("symbols", {})
+        self.session = session or requests.Session()
+
+    def supports(self, symbol: str, n_bars: int):
+        return symbol in self.symbols
+
+    def get_bars(self, symbol, exchange="CRYPTOCAP", interval=None, n_bars=1):
+        key = self.symbols.get(symbol)
+        if key is None:
+            return []
+        response = self.session.get(self.url, timeout=self.timeout)
+        response.raise_for_status()
+        data = response.json().get("data", {})
+        value = data.get("market_cap_percentage", {}).get(key)
+        updated_at = data.get("updated_at")
+        if value is None or updated_at is None:
+            self.logger.warning(f"No {key} dominance in {self.url} response")
+            return []
+        ts_ms = int(updated_at) * 1000
+        value = float(value)
+        return [Bar(ts_ms - ts_ms % MINUTE_MS, value, value, value, value, None, self.name)]
+
+
+def build_source(name: str):
+    if name == TradingViewSource.name:
+        return TradingViewSource()
+    if name == GlobalMarketCapSource.name:
+        return GlobalMarketCapSource()
+    raise ValueError(f"Unknown bar source: {name}")
@@ -0,0 +1,144 @@
+import os
+import sys
+import threading
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from src.configs.config_variable import UPSTREAM_CONFIG
+from src.log.logger_setup import LoggerSetup
+from src.upstream.rate_limiter import (
+    CircuitBreaker,
+    CircuitOpenError,
+    TokenBucket,
+    backoff_delay,
+)
+from src.upstream.tv_bars import lean_tvdatafeed_class
+
+
+class TradingViewClient:
+    """
+    Process-wide gateway for every TradingView (tvDatafeed) call.
+    All extractors share one session, one token bucket and one circuit breaker,
+    so concurrent jobs spend the same request budget.
+    """
+
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    # Singleton instance
+    def __new__(cls):
+        with cls._instance_lock:
+            if cls._instance is None:
+                cls._instance = super().__new__(cls)
+                cls._instance._init_client()
+        return cls._instance
+
+    def _init_client(self):
+        self.logger = LoggerSetup.logger_setup("TradingViewClient")
+        self.max_retries = UPSTREAM_CONFIG.get("max_retries", 5)
+        self.max_empty_retries = UPSTREAM_CONFIG.get("max_empty_retries", 1)
+        self.realtime_max_bars = UPSTREAM_CONFIG.get("realtime_max_bars", 2)
+        self.backoff_base = UPSTREAM_CONFIG.get("backoff_base_seconds", 1)
+        self.backoff_max = UPSTREAM_CONFIG.get("backoff_max_seconds", 60)
+        self.acquire_timeout = UPSTREAM_CONFIG.get("acquire_timeout_seconds", 300)
+        self.limiter = TokenBucket(
+            rate_per_second=UPSTREAM_CONFIG.get("rate_per_second", 0.5),
+            capacity=UPSTREAM_CONFIG.get("burst", 5),
+        )
+        self.breaker = CircuitBreaker(
+            failure_threshold=UPSTREAM_CONFIG.get("breaker_failure_threshold", 5),
+            reset_timeout=UPSTREAM_CONFIG.get("breaker_reset_seconds", 120),
+        )
+        self._tv = None
+        # tvDatafeed keeps a single websocket per instance, so calls are serialized
+        self._session_lock = threading.Lock()
+
+    def _get_session(self):
+        if self._tv is None:
+            # Same websocket session; the subclass can also parse payloads into Bar tuples
+            self._tv = lean_tvdatafeed_class()()
+        return self._tv
+
+    def _reset_session(self):
+        self._tv = None
+
+    def _call(self, lean=False, **kwargs):
+        with self._session_lock:
+            tv = self._get_session()
+            tv.lean = lean
+            try:
+                return tv.get_hist(**kwargs)
+            except Exception:
+                self._reset_session()
+                raise
+            finally:
+                tv.lean = False
+
+    def get_hist(self, symbol, exchange="CRYPTOCAP", interval=None, n_bars=10, **kwargs):
+        """
+        Rate-limited, circuit-broken tv.get_hist with exponential backoff + jitter.
+        Returns the DataFrame, or None when every attempt came back empty/failed.
+        Failures are retried up to max_retries, empty answers only max_empty_retries times
+        (none for a realtime-sized request), since every attempt spends a token.
+        Raises CircuitOpenError when the breaker is open.
+        """
+        return self._fetch(False, symbol, exchange, interval, n_bars, **kwargs)
+
+    def get_bars(self, symbol, exchange="CRYPTOCAP", interval=None, n_bars=1, **kwargs):
+        """
+        Same as get_hist, but the payload is parsed straight into a list of Bar
+        (oldest first) without building a DataFrame; used on the realtime hot path.
+        """
+        return self._fetch(True, symbol, exchange, interval, n_bars, **kwargs)
+
+    def _fetch(self, lean, symbol, exchange, interval, n_bars, **kwargs):
+        if interval is None:
+            from tvDatafeed import Interval
+
+            interval = Interval.in_daily
+
+        # A realtime poll with nothing new (quiet minute) is a normal answer, not worth a token
+        empty_retries = 0 if n_bars <= self.realtime_max_bars else self.max_empty_retries
+        empties = 0
+        for attempt in range(self.max_retries):
+            if not self.breaker.allow():
+                raise CircuitOpenError(
+                    f"TradingView circuit open, retry in {self.breaker.seconds_until_retry():.0f}s"
+                )
+            if not self.limiter.acquire(timeout=self.acquire_timeout):
+                raise TimeoutError("Timed out waiting for TradingView rate limit budget")
+
+            try:
+                df = self._call(
+                    lean=lean,
+                    symbol=symbol,
+                    exchange=exchange,
+                    interval=interval,
+                    n_bars=n_bars,
+                    **kwargs,
+                )
+            except Exception as e:
+                self.logger.warning(
+                    f"Fetch {exchange}:{symbol} failed (attempt {attempt + 1}/{self.max_retries}): {e}"
+                )
+                # Only transport errors trip the breaker shared by every symbol
+                self.breaker.record_failure()
+            else:
+                # The session answered: an empty result is this symbol's problem (e.g. a
+                # misspelled ticker), not an upstream outage
+                self.breaker.record_success()
+                if df is not None and len(df) > 0:
+                    return df
+                empties += 1
+                if empties > empty_retries:
+                    self.logger.debug(f"Empty response for {exchange}:{symbol} (n_bars={n_bars})")
+                    return None
+                self.logger.warning(
+                    f"Empty response for {exchange}:{symbol} (attempt {attempt + 1}/{self.max_retries})"
+                )
+
+            if attempt + 1 < self.max_retries:
+                time.sleep(backoff_delay(attempt, self.backoff_base, self.backoff_max))
+
+        return None
@@ -0,0 +1,190 @@
+import math
+import os
+import re
+import sys
+import time
+import tracemalloc
+from typing import NamedTuple, Optional
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+
+class Bar(NamedTuple):
+    """
+    One OHLCV bar as it travels the realtime path; ts_ms is the bar open time (epoch ms),
+    src the upstream source that supplied it (None when unknown, e.g. replayed rows),
+    fetched_ms when the fetch returning it completed (epoch ms, for freshness metrics)
+    """
+
+    ts_ms: int
+    open: Optional[float]
+    high: Optional[float]
+    low: Optional[float]
+    close: Optional[float]
+    volume: Optional[float]
+    src: Optional[str] = None
+    fetched_ms: Optional[int] = None
+
+
+# TradingView timescale_update payload: "s":[{"i":0,"v":[ts,o,h,l,c,v]},...]
+_SERIES_RE = re.compile(r'"s":\[(.+?)\}\]')
+_VALUES_RE = re.compile(r'"v":\[([^\]]*)\]')
+
+
+def _number(text: str):
+    try:
+        value = float(text)
+    except ValueError:
+        return None
+    return None if math.isnan(value) else value
+
+
+def parse_bars(raw_data: str):
+    """Bars of a raw tvDatafeed payload, oldest first; no DataFrame is built"""
+    series = _SERIES_RE.search(raw_data)
+    if series is None:
+        return []
+    bars = []
+    for values in _VALUES_RE.findall(series.group(1)):
+        fields = values.split(",")
+        if len(fields) < 5:
+            continue
+        # Missing volume (some CRYPTOCAP series) -> None
+        volume = _number(fields[5]) if len(fields) > 5 else None
+        bars.append(
+            Bar(
+                int(float(fields[0]) * 1000),
+                _number(fields[1]),
+                _number(fields[2]),
+                _number(fields[3]),
+                _number(fields[4]),
+                volume,
+            )
+        )
+    return bars
+
+
+def bars_to_arrays(bars: list):
+    """(ts int64, (N, 5) OHLCV float64) of a Bar list; missing values are NaN"""
+    if not bars:
+        return np.empty(0, dtype=np.int64), np.empty((0, 5))
+    # ts_ms already is epoch ms from the payload: no per-row datetime conversion
+    table = np.array([bar[:6] for bar in bars], dtype=np.float64)
+    return table[:, 0].astype(np.int64), table[:, 1:]
+
+
+def row_to_bar(ts_ms: int, row):
+    """Bar from a pandas row / dict with open..volume (or Open..Volume) keys; NaN -> None"""
+
+    def value(name):
+        v = row.get(name, row.get(name.capitalize()))
+        return None if v is None or v != v else float(v)
+
+    return Bar(int(ts_ms), value("open"), value("high"), value("low"), value("close"), value("volume"))
+
+
+def tv_interval(interval: str):
+    """tvDatafeed Interval of one of our interval names ("1m", "1h", "1d")"""
+    from tvDatafeed import Interval
+
+    return {"1m": Interval.in_1_minute, "1h": Interval.in_1_hour, "1d": Interval.in_daily}[interval]
+
+
+def lean_tvdatafeed_class():
+    """
+    TvDatafeed subclass whose parser can return a list of Bar instead of a DataFrame.
+    tvDatafeed calls the private self.__create_df, so overriding the mangled name is enough;
+    `lean` is switched per call (the client serializes calls on one session).
+    """
+    from tvDatafeed import TvDatafeed
+
+    class LeanTvDatafeed(TvDatafeed):
+        lean = False
+
+        def _TvDatafeed__create_df(self, raw_data, symbol):
+            if self.lean:
+                return parse_bars(raw_data)
+            return TvDatafeed._TvDatafeed__create_df(raw_data, symbol)
+
+    return LeanTvDatafeed
+
+
+def _sample_payload(n_bars: int, start_s: int = 1_757_000_000):
+    parts = []
+    for i in range(n_bars):
+        close = 58.0 + (i % 7) * 0.001
+        parts.append(
+            f'{{"i":{i},"v":[{start_s + i * 60}.0,{close},{close + 0.002},{close - 0.002},{close},49668177865.04491]}}'
+        )
+    return (
+        '~m~512~m~{"m":"timescale_update","p":["cs_bench",{"sds_1":{"node":"bench","s":['
+        + ",".join(parts)
+        + '],"ns":{"d":"","indexes":[]},"t":"s1","lbs":{"bar_close_time":0}}}]}'
+    )
+
+
+def _legacy_tick(raw_data: str):
+    # Old realtime path: tvDatafeed-style DataFrame, iloc[-1], then the 11-field dict
+    from datetime import datetime
+
+    import pandas as pd
+
+    out = _SERIES_RE.search(raw_data).group(1)
+    data = []
+    for xi in out.split(',{"'):
+        xi = re.split(r"\[|:|,|\]", xi)
+        data.append([datetime.fromtimestamp(float(xi[4]))] + [float(x) for x in xi[5:10]])
+    df = pd.DataFrame(data, columns=["datetime", "open", "high", "low", "close", "volume"]).set_index("datetime")
+    df.insert(0, "symbol", value="BTC.D")
+    dt = df.index[-1].to_pydatetime()
+    row = df.iloc[-1]
+    ts_ms = int(dt.timestamp() * 1000)
+    out = {"last_update": datetime.utcnow(), "bar_timestamp_ms": ts_ms, "today_timestamp_ms": ts_ms - ts_ms % 86400000}
+    for name in ("open", "high", "low", "close", "volume"):
+        v = row.get(name, row.get(name.capitalize(), None))
+        out[f"current_{name}"] = float(v) if pd.notnull(v) else None
+    return out
+
+
+def _lean_tick(raw_data: str):
+    return parse_bars(raw_data)[-1]
+
+
+def benchmark(ticks: int = 2000, n_bars: int = 2):
+    """Per-tick CPU time and allocated bytes of the DataFrame path vs the Bar path"""
+    raw = _sample_payload(n_bars)
+    results = {}
+    for name, fn in (("dataframe", _legacy_tick), ("bar", _lean_tick)):
+        fn(raw)  # warm imports / regex caches
+        started = time.process_time()
+        for _ in range(ticks):
+            fn(raw)
+        cpu_us = (time.process_time() - started) / ticks * 1e6
+
+        tracemalloc.start()
+        kept = [fn(raw) for _ in range(100)]
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        del kept
+        results[name] = {"cpu_us_per_tick": cpu_us, "retained_bytes_per_tick": current / 100, "peak_bytes": peak}
+    return results
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark the lean Bar parser against the DataFrame path")
+    parser.add_argument("--ticks", type=int, default=2000)
+    parser.add_argument("--bars", type=int, default=2, help="bars per payload (1-2 steady state)")
+    args = parser.parse_args()
+
+    results = benchmark(args.ticks, args.bars)
+    for name, r in results.items():
+        print(
+            f"{name:>9}: {r['cpu_us_per_tick']:8.1f} us/tick CPU, "
+            f"{r['retained_bytes_per_tick']:8.0f} B retained/tick, peak {r['peak_bytes'] / 1024:.0f} KB"
+        )
+    speedup = results["dataframe"]["cpu_us_per_tick"] / max(results["bar"]["cpu_us_per_tick"], 1e-9)
+    print(f"bar path is {speedup:.0f}x faster per tick")
@@ -1,8 +1,14 @@
-from tvDatafeed import TvDatafeed, Interval
+import os
+import sys
+
+from tvDatafeed import Interval
 import pandas as pd
-import time
 
-tv = TvDatafeed()
+sys.path.append(os.path.abspath(os.path.dirname(__file__)))
+from src.upstream.tradingview_client import TradingViewClient
+
+# Dùng chung session + rate limit với crawler
+tv = TradingViewClient()
 
 
 def get_full_history(
@@ -34,8 +40,7 @@ def get_full_history(
         if len(df) < 5000:
             print("Tới mốc dữ liệu cũ nhất rồi.")
             break
-
-        time.sleep(1)  # tránh bị block
+        # Không cần sleep: TradingViewClient đã giới hạn tốc độ request
 
     all_data = all_data[~all_data.index.duplicated()]
     all_data.sort_index(inplace=True)
@@ -48,9 +53,10 @@ def get_full_history(
     return all_data
 
 
-# Chạy thử: lấy toàn bộ BTC Dominance (BTC.D) khung 1 phút
-df = get_full_history("BTC.D", "CRYPTOCAP", Interval.in_1_minute)
+if __name__ == "__main__":
+    # Chạy thử: lấy toàn bộ BTC Dominance (BTC.D) khung 1 phút
+    df = get_full_history("BTC.D", "CRYPTOCAP", Interval.in_1_minute)
 
-print(df.head())
-print(df.tail())
-print("Tổng số dòng:", len(df))
+    print(df.head())
+    print(df.tail())
+    print("Tổng số dòng:", len(df))
@@ -0,0 +1,105 @@
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.extract.extract_dominance_realtime import ExtractBTCDominanceRealtime
+from src.tele_bot.alert_rules import DAY_MS, MINUTE_MS, AlertRulesEngine
+from src.upstream.tv_bars import Bar
+
+T0 = 1_757_000_040_000
+
+
+def names(alerts):
+    return [alert.rule for alert in alerts]
+
+
+def test_threshold_fires_on_crossing_in_its_direction():
+    engine = AlertRulesEngine(
+        [
+            {"name": "up 60", "type": "threshold", "level": 60.0, "direction": "up"},
+            {"name": "both 61", "type": "threshold", "level": 61.0},
+            {"name": "down 59", "type": "threshold", "level": 59.0, "direction": "down"},
+        ]
+    )
+    assert engine.evaluate(T0, 59.5) == []
+    # One tick jumping over two levels fires both, a level equal to the new value counts
+    assert names(engine.evaluate(T0 + MINUTE_MS, 61.0)) == ["up 60", "both 61"]
+    assert engine.evaluate(T0 + 2 * MINUTE_MS, 61.5) == []
+    assert names(engine.evaluate(T0 + 3 * MINUTE_MS, 58.0)) == ["down 59", "both 61"]
+
+
+def test_cooldown_suppresses_repeats():
+    engine = AlertRulesEngine(
+        [{"name": "60", "type": "threshold", "level": 60.0, "cooldown_seconds": 600}]
+    )
+    engine.evaluate(T0, 59.0)
+    assert names(engine.evaluate(T0 + MINUTE_MS, 61.0)) == ["60"]
+    assert engine.evaluate(T0 + 2 * MINUTE_MS, 59.0) == []
+    assert names(engine.evaluate(T0 + 11 * MINUTE_MS, 61.0)) == ["60"]
+
+
+def test_move_rules_compare_against_the_window_extremes():
+    engine = AlertRulesEngine(
+        [
+            {"name": "0.5% in 15m", "type": "move", "pct": 0.5, "window_minutes": 15},
+            {"name": "2% in 15m", "type": "move", "pct": 2.0, "window_minutes": 15},
+        ]
+    )
+    assert engine.evaluate(T0, 50.0) == []
+    alerts = engine.evaluate(T0 + MINUTE_MS, 50.5)
+    assert names(alerts) == ["0.5% in 15m"]
+    assert "+1.00%" in alerts[0].message
+    # The 50.0 low has left the 15 minute window, so the same price is no move
+    engine = AlertRulesEngine([{"name": "move", "type": "move", "pct": 0.5, "window_minutes": 15}])
+    engine.evaluate(T0, 50.0)
+    assert engine.evaluate(T0 + 16 * MINUTE_MS, 50.5) == []
+
+
+def test_new_extremes_are_against_the_warmed_up_window():
+    engine = AlertRulesEngine(
+        [
+            {"name": "high", "type": "new_high", "days": 30},
+            {"name": "low", "type": "new_low", "days": 30},
+        ]
+    )
+    engine.warm_up([(T0 + i * DAY_MS, 60.0 + i, 50.0 - i, 55.0) for i in range(3)])
+    now = T0 + 3 * DAY_MS
+    assert engine.evaluate(now, 62.0) == []
+    assert names(engine.evaluate(now + MINUTE_MS, 62.5)) == ["high"]
+    assert names(engine.evaluate(now + 2 * MINUTE_MS, 47.0)) == ["low"]
+    # 31 days later the old extremes have expired
+    assert engine.evaluate(now + 31 * DAY_MS, 55.0) == []
+
+
+def test_proximity_is_the_nearest_armed_rule():
+    engine = AlertRulesEngine(
+        [{"name": "60", "type": "threshold", "level": 60.0, "cooldown_seconds": 600}]
+    )
+    assert round(engine.proximity_pct(59.4), 6) == round(0.6 / 59.4 * 100, 6)
+    engine.evaluate(T0, 59.0)
+    engine.evaluate(T0 + MINUTE_MS, 60.5)
+    assert engine.proximity_pct(60.4, T0 + 2 * MINUTE_MS) is None
+    assert engine.proximity_pct(None) is None
+
+
+def bars(*minutes):
+    return [Bar(T0 + m * MINUTE_MS, 1.0, 1.0, 1.0, 1.0, 0.0) for m in minutes]
+
+
+def catchup_flags(last_committed_ms, batch):
+    extractor = object.__new__(ExtractBTCDominanceRealtime)
+    extractor.last_committed_ms = last_committed_ms
+    cutoff = extractor._catchup_cutoff_ms(batch)
+    return [bar.ts_ms < cutoff for bar in batch]
+
+
+def test_steady_state_bars_are_live():
+    # Open minute plus the one that just closed: both drive the alert rules
+    assert catchup_flags(T0 + 9 * MINUTE_MS, bars(9, 10)) == [False, False]
+    assert catchup_flags(T0 + 10 * MINUTE_MS, bars(10)) == [False]
+    assert catchup_flags(None, bars(10)) == [False]
+
+
+def test_bars_missed_during_an_outage_are_catchup():
+    assert catchup_flags(T0, bars(0, 1, 2, 3, 4)) == [True, True, True, False, False]
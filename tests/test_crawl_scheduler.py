@@ -0,0 +1,66 @@
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.configs.config_symbols import crawl_symbols
+from src.configs.config_variable import EXTRACT_CONFIG
+from src.extract.crawl_scheduler import CrawlScheduler
+
+
+def scheduler(symbols, rate_per_second=0.5, share=0.8, stagger=0.5):
+    sched = CrawlScheduler(
+        specs=crawl_symbols({"symbols": symbols}),
+        config={"realtime_budget_share": share, "start_stagger_seconds": stagger},
+    )
+    sched.rate_per_second = rate_per_second
+    return sched
+
+
+def test_realtime_polls_share_the_token_budget():
+    sched = scheduler(["BTC.D", "ETH.D", {"symbol": "TOTAL", "realtime": False}, "USDT.D"])
+    sched._plan_realtime_budget()
+    # 3 realtime symbols on 0.4 tokens/s: each one at most every 7.5s
+    assert sched.realtime_min_interval == pytest.approx(7.5)
+    assert sched.stagger == pytest.approx(2.5)
+
+
+def test_budget_keeps_a_longer_configured_stagger():
+    sched = scheduler(["BTC.D"], rate_per_second=10, stagger=1.0)
+    sched._plan_realtime_budget()
+    assert sched.realtime_min_interval == pytest.approx(0.125)
+    assert sched.stagger == 1.0
+
+
+def test_no_realtime_symbols_no_spacing():
+    sched = scheduler([{"symbol": "TOTAL", "realtime": False}])
+    sched._plan_realtime_budget()
+    assert sched.realtime_min_interval == 0.0
+
+
+class FakeHistorical:
+    def __init__(self):
+        self.calls = []
+
+    def get_all_historical_data(self):
+        self.calls.append("all")
+
+    def get_recent_historical_data(self, days):
+        self.calls.append(("recent", days))
+
+    def run_daily_once(self):
+        self.calls.append("daily")
+
+    def seconds_until_next_run(self):
+        return 60.0
+
+
+@pytest.mark.parametrize("days,first", [("all", "all"), (30, ("recent", 30))])
+def test_historical_job_loads_history_once(monkeypatch, days, first):
+    monkeypatch.setitem(EXTRACT_CONFIG, "historical_days", days)
+    extractor = FakeHistorical()
+    step = scheduler(["BTC.D"])._historical_step(extractor)
+    assert [step(), step(), step()] == [60.0, 60.0, 60.0]
+    assert extractor.calls == [first, "daily", "daily"]
@@ -0,0 +1,123 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.configs.config_symbols import crawl_symbols, interval_specs
+from src.jobs.gap_repair import count_bars, expand_spans, find_missing_spans, plan_fetch_window
+from src.upstream.tv_bars import Bar, bars_to_arrays
+
+STEP = 60000
+T0 = 1_757_000_040_000
+
+
+def minutes(*offsets):
+    return np.array([T0 + k * STEP for k in offsets], dtype=np.int64)
+
+
+def test_no_gaps():
+    ts = minutes(*range(10))
+    spans = find_missing_spans(ts, T0, T0 + 9 * STEP, STEP)
+    assert spans.shape == (0, 2)
+    assert count_bars(spans, STEP) == 0
+
+
+def test_inner_leading_and_trailing_gaps_are_merged_spans():
+    ts = minutes(2, 3, 4, 7, 8, 12)
+    spans = find_missing_spans(ts, T0, T0 + 14 * STEP, STEP)
+    assert spans.tolist() == [
+        [T0, T0 + STEP],
+        [T0 + 5 * STEP, T0 + 6 * STEP],
+        [T0 + 9 * STEP, T0 + 11 * STEP],
+        [T0 + 13 * STEP, T0 + 14 * STEP],
+    ]
+    assert count_bars(spans, STEP) == 9
+    assert expand_spans(spans, STEP).tolist() == minutes(0, 1, 5, 6, 9, 10, 11, 13, 14).tolist()
+
+
+def test_empty_series_is_one_span():
+    spans = find_missing_spans(np.empty(0, dtype=np.int64), T0, T0 + 59 * STEP, STEP)
+    assert spans.tolist() == [[T0, T0 + 59 * STEP]]
+
+
+def test_unsorted_duplicates_and_out_of_range_timestamps():
+    ts = minutes(5, 1, 1, 0, 3, -10, 40)
+    spans = find_missing_spans(ts, T0, T0 + 5 * STEP, STEP)
+    assert spans.tolist() == [[T0 + 2 * STEP, T0 + 2 * STEP], [T0 + 4 * STEP, T0 + 4 * STEP]]
+
+
+def test_range_bounds_snap_to_the_cadence():
+    # start rounds up, end rounds down to whole minutes
+    spans = find_missing_spans(minutes(1), T0 - 1, T0 + 2 * STEP + 1, STEP)
+    assert spans.tolist() == [[T0, T0], [T0 + 2 * STEP, T0 + 2 * STEP]]
+
+
+def test_year_of_minutes_audits_quickly():
+    import time
+
+    n = 365 * 24 * 60
+    ts = T0 + np.arange(n, dtype=np.int64) * STEP
+    ts = np.delete(ts, np.s_[1000:1500])
+    started = time.perf_counter()
+    spans = find_missing_spans(ts, T0, T0 + (n - 1) * STEP, STEP)
+    assert time.perf_counter() - started < 1.0
+    assert count_bars(spans, STEP) == 500
+
+
+def test_fetch_window_reaches_the_oldest_reachable_span():
+    spans = np.array([[T0 + 2 * STEP, T0 + 3 * STEP], [T0 + 8 * STEP, T0 + 8 * STEP]], dtype=np.int64)
+    now = T0 + 10 * STEP + 5
+    n_bars, reachable, unreachable = plan_fetch_window(spans, STEP, now, max_bars=100)
+    assert n_bars == 9
+    assert reachable.tolist() == spans.tolist()
+    assert len(unreachable) == 0
+
+
+def test_fetch_window_splits_spans_beyond_the_upstream_limit():
+    spans = np.array([[T0, T0 + 5 * STEP], [T0 + 8 * STEP, T0 + 8 * STEP]], dtype=np.int64)
+    now = T0 + 10 * STEP
+    n_bars, reachable, unreachable = plan_fetch_window(spans, STEP, now, max_bars=7)
+    # Only the last 7 minutes (T0+4 .. T0+10) can be fetched
+    assert n_bars == 7
+    assert reachable.tolist() == [[T0 + 4 * STEP, T0 + 5 * STEP], [T0 + 8 * STEP, T0 + 8 * STEP]]
+    assert unreachable.tolist() == [[T0, T0 + 3 * STEP]]
+
+
+def test_fetch_window_nothing_reachable():
+    spans = np.array([[T0, T0 + STEP]], dtype=np.int64)
+    n_bars, reachable, unreachable = plan_fetch_window(spans, STEP, T0 + 100 * STEP, max_bars=10)
+    assert n_bars == 0
+    assert len(reachable) == 0
+    assert unreachable.tolist() == [[T0, T0 + STEP]]
+
+
+def test_fetched_bars_become_arrays_without_datetime_conversion():
+    bars = [Bar(T0, 1.0, 2.0, 0.5, 1.5, None, src="tradingview"), Bar(T0 + STEP, 1.5, 2.5, 1.0, 2.0, 7.0)]
+    ts, values = bars_to_arrays(bars)
+    assert ts.dtype == np.int64
+    assert ts.tolist() == [T0, T0 + STEP]
+    assert values[1].tolist() == [1.5, 2.5, 1.0, 2.0, 7.0]
+    assert np.isnan(values[0, 4])
+    ts, values = bars_to_arrays([])
+    assert ts.shape == (0,) and values.shape == (0, 5)
+
+
+@pytest.mark.parametrize(
+    "interval,expected",
+    [("1m", ["BTC.D", "ETH.D"]), ("1d", ["BTC.D", "TOTAL"]), ("1h", ["USDT.D"])],
+)
+def test_repair_covers_every_crawled_series(interval, expected):
+    specs = crawl_symbols(
+        {
+            "symbols": [
+                {"symbol": "BTC.D"},
+                {"symbol": "ETH.D", "historical": False},
+                {"symbol": "TOTAL", "realtime": False},
+                {"symbol": "USDT.D", "realtime": False, "interval": "1h"},
+            ]
+        }
+    )
+    assert [spec.symbol for spec in interval_specs(specs, interval)] == expected
@@ -0,0 +1,280 @@
+import base64
+import hashlib
+import json
+import os
+import re
+import socket
+import struct
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.configs.config_variable import SOURCE_CONFIG
+from src.upstream.hedged_fetcher import HedgedFetcher
+from src.upstream.sources import BarSource, GlobalMarketCapSource, TradingViewSource
+from src.upstream.tv_bars import _sample_payload, parse_bars
+
+# _sample_payload closes start at 58.0; the HTTP stand-in reports 57.1
+PRIMARY_CLOSE = 58.0
+SECONDARY_VALUE = 57.1
+
+
+@pytest.fixture
+def global_url():
+    """Local /global endpoint in the CoinGecko layout"""
+
+    class GlobalHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            body = json.dumps(
+                {"data": {"market_cap_percentage": {"btc": SECONDARY_VALUE}, "updated_at": int(time.time())}}
+            ).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), GlobalHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/api/v3/global"
+    server.shutdown()
+
+
+@pytest.fixture
+def secondary(global_url):
+    return GlobalMarketCapSource({"url": global_url, "timeout_seconds": 2, "symbols": {"BTC.D": "btc"}})
+
+
+class StandInPrimary(BarSource):
+    """Parses a TradingView-style payload after `delay` seconds, or raises `error`"""
+
+    name = "tradingview"
+
+    def __init__(self, delay: float = 0.0, error: Exception = None):
+        self.delay = delay
+        self.error = error
+
+    def get_bars(self, symbol, exchange="CRYPTOCAP", interval=None, n_bars=1):
+        time.sleep(self.delay)
+        if self.error is not None:
+            raise self.error
+        now_s = int(time.time()) // 60 * 60
+        return [bar._replace(src=self.name) for bar in parse_bars(_sample_payload(1, now_s))]
+
+
+def make_fetcher(primary, secondary, **config):
+    fetcher = object.__new__(HedgedFetcher)
+    fetcher._init_fetcher(
+        primary=primary,
+        secondary=secondary,
+        config={**SOURCE_CONFIG, "default_hedge_delay_seconds": 0.2, "min_hedge_delay_seconds": 0.05, **config},
+    )
+    return fetcher
+
+
+def wait_for_basis(fetcher, symbol="BTC.D", timeout=5.0):
+    deadline = time.time() + timeout
+    while symbol not in fetcher._basis and time.time() < deadline:
+        time.sleep(0.01)
+    return fetcher._basis.get(symbol)
+
+
+def test_global_source_returns_one_flat_bar(secondary):
+    bars = secondary.get_bars("BTC.D")
+    assert len(bars) == 1
+    bar = bars[0]
+    assert bar.src == "global_mcap"
+    assert bar.open == bar.high == bar.low == bar.close == SECONDARY_VALUE
+    assert bar.volume is None
+    assert bar.ts_ms % 60000 == 0
+    assert secondary.get_bars("TOTAL") == []
+
+
+def test_fast_primary_is_not_hedged(secondary):
+    fetcher = make_fetcher(StandInPrimary(delay=0.01), secondary)
+    bars = fetcher.get_bars("BTC.D")
+    assert bars[-1].src == "tradingview"
+    assert fetcher.hedged == 0
+    # The first answer also probes the secondary for the basis
+    assert wait_for_basis(fetcher) == pytest.approx(PRIMARY_CLOSE / SECONDARY_VALUE)
+
+
+def test_slow_primary_hedges_and_scales_the_secondary(secondary):
+    primary = StandInPrimary(delay=0.01)
+    fetcher = make_fetcher(primary, secondary)
+    fetcher.get_bars("BTC.D")
+    assert wait_for_basis(fetcher) is not None
+
+    primary.delay = 1.0
+    started = time.perf_counter()
+    bars = fetcher.get_bars("BTC.D")
+    elapsed = time.perf_counter() - started
+
+    assert fetcher.hedged == 1
+    assert fetcher.wins == {"tradingview": 1, "global_mcap": 1}
+    assert elapsed < primary.delay
+    bar = bars[-1]
+    assert bar.src == "global_mcap"
+    # Secondary values are moved onto the primary's scale
+    assert bar.close == pytest.approx(PRIMARY_CLOSE)
+    assert bar.open == bar.high == bar.low == bar.close
+    fetcher._executor.shutdown(wait=True)
+
+
+def test_failing_primary_falls_back_without_waiting(secondary):
+    fetcher = make_fetcher(StandInPrimary(error=ConnectionError("down")), secondary, default_hedge_delay_seconds=2.0)
+    started = time.perf_counter()
+    bars = fetcher.get_bars("BTC.D")
+    assert time.perf_counter() - started < 1.0
+    assert bars[-1].src == "global_mcap"
+    # No basis yet: the raw secondary value is served
+    assert bars[-1].close == SECONDARY_VALUE
+
+
+def test_catch_up_fetches_stay_on_the_primary(secondary):
+    fetcher = make_fetcher(StandInPrimary(delay=0.3), secondary, hedge_max_bars=2)
+    bars = fetcher.get_bars("BTC.D", n_bars=10)
+    assert bars[-1].src == "tradingview"
+    assert fetcher.hedged == 0
+
+
+# ---- TradingView websocket stand-in ----
+
+WS_GUID = b"258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+
+def _read_frame(reader):
+    """One client frame (masked) as text; None on close / EOF"""
+    header = reader.read(2)
+    if len(header) < 2:
+        return None
+    opcode = header[0] & 0x0F
+    length = header[1] & 0x7F
+    if length == 126:
+        length = struct.unpack(">H", reader.read(2))[0]
+    elif length == 127:
+        length = struct.unpack(">Q", reader.read(8))[0]
+    mask = reader.read(4) if header[1] & 0x80 else b"\0\0\0\0"
+    payload = bytes(b ^ mask[i % 4] for i, b in enumerate(reader.read(length)))
+    if opcode == 0x8:
+        return None
+    return payload.decode("utf-8", "replace")
+
+
+def _send_frame(conn, text: str):
+    data = text.encode()
+    if len(data) < 126:
+        header = struct.pack(">BB", 0x81, len(data))
+    elif len(data) < 1 << 16:
+        header = struct.pack(">BBH", 0x81, 126, len(data))
+    else:
+        header = struct.pack(">BBQ", 0x81, 127, len(data))
+    conn.sendall(header + data)
+
+
+class TvWebsocketStandIn:
+    """
+    Local RFC 6455 server speaking enough of TradingView's "~m~<len>~m~<json>" framing for
+    tvDatafeed.get_hist: once the client creates its series it answers (after `delay`)
+    with a timescale_update of two minute bars and series_completed.
+    """
+
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.sock.bind(("127.0.0.1", 0))
+        self.sock.listen(8)
+        self.url = f"ws://127.0.0.1:{self.sock.getsockname()[1]}/socket.io/websocket"
+        self.sessions = 0
+        threading.Thread(target=self._serve, daemon=True).start()
+
+    def _serve(self):
+        while True:
+            try:
+                conn, _ = self.sock.accept()
+            except OSError:
+                return
+            threading.Thread(target=self._handle, args=(conn,), daemon=True).start()
+
+    def _handle(self, conn):
+        with conn:
+            request = b""
+            while b"\r\n\r\n" not in request:
+                chunk = conn.recv(4096)
+                if not chunk:
+                    return
+                request += chunk
+            key = re.search(rb"Sec-WebSocket-Key:\s*(\S+)", request, re.IGNORECASE).group(1)
+            accept = base64.b64encode(hashlib.sha1(key + WS_GUID).digest())
+            conn.sendall(
+                b"HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+                b"Sec-WebSocket-Accept: " + accept + b"\r\n\r\n"
+            )
+            self.sessions += 1
+            reader = conn.makefile("rb")
+            while True:
+                message = _read_frame(reader)
+                if message is None:
+                    return
+                if "create_series" in message:
+                    time.sleep(self.delay)
+                    now_s = int(time.time()) // 60 * 60
+                    _send_frame(conn, _sample_payload(2, now_s - 60))
+                    _send_frame(conn, '~m~56~m~{"m":"series_completed","p":["cs_test","s1","s1"]}')
+
+    def close(self):
+        self.sock.close()
+
+
+@pytest.fixture
+def tv_client(monkeypatch):
+    """A TradingViewClient (not the process singleton) whose websocket goes to the stand-in"""
+    pytest.importorskip("tvDatafeed")
+    websocket = pytest.importorskip("websocket")
+    import tvDatafeed.main as tv_main
+
+    from src.upstream.tradingview_client import TradingViewClient
+
+    server = TvWebsocketStandIn()
+    monkeypatch.setattr(
+        tv_main, "create_connection", lambda url, **kwargs: websocket.create_connection(server.url, **kwargs)
+    )
+    client = object.__new__(TradingViewClient)
+    client._init_client()
+    client.server = server
+    yield client
+    server.close()
+
+
+def test_lean_tvdatafeed_parses_websocket_bars(tv_client):
+    from tvDatafeed import Interval
+
+    bars = tv_client.get_bars("BTC.D", exchange="CRYPTOCAP", interval=Interval.in_1_minute, n_bars=2)
+    assert tv_client.server.sessions == 1
+    assert len(bars) == 2
+    assert bars[0].ts_ms + 60000 == bars[1].ts_ms
+    assert bars[0].close == PRIMARY_CLOSE
+
+
+def test_websocket_primary_hedged_to_http_secondary(tv_client, secondary):
+    from tvDatafeed import Interval
+
+    fetcher = make_fetcher(TradingViewSource(tv_client), secondary)
+    bars = fetcher.get_bars("BTC.D", interval=Interval.in_1_minute, n_bars=1)
+    assert bars[-1].src == "tradingview"
+    assert wait_for_basis(fetcher) is not None
+
+    tv_client.server.delay = 1.5
+    bars = fetcher.get_bars("BTC.D", interval=Interval.in_1_minute, n_bars=1)
+    assert fetcher.hedged == 1
+    assert bars[-1].src == "global_mcap"
+    assert bars[-1].close == pytest.approx(fetcher._basis["BTC.D"] * SECONDARY_VALUE)
+    fetcher._executor.shutdown(wait=True)
@@ -0,0 +1,89 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.configs.config_variable import INDICATOR_CONFIG
+from src.indicators.backfill import compute_indicators, indicators_equal, max_abs_difference, stream_indicators
+from src.indicators.streaming import StreamingIndicators
+
+TOLERANCE = 1e-9
+
+CONFIG = {"sma": [5, 20, 50], "ema": [12, 26], "rsi": [14], "bollinger": [(20, 2.0), (10, 1.5)]}
+
+
+def random_walk(n, seed=7, start=55.0):
+    rng = np.random.default_rng(seed)
+    return start + np.cumsum(rng.normal(0, 0.05, n))
+
+
+@pytest.mark.parametrize("config", [CONFIG, INDICATOR_CONFIG])
+def test_streaming_matches_vectorized(config):
+    closes = random_walk(5000)
+    diffs = max_abs_difference(stream_indicators(closes, config), compute_indicators(closes, config))
+    assert diffs
+    assert max(diffs.values()) < TOLERANCE, diffs
+
+
+def test_flat_and_monotonic_stretches():
+    # RSI edge cases: no losses (100), no change at all (50)
+    closes = np.concatenate([np.full(40, 60.0), np.linspace(60.0, 62.0, 40), random_walk(200, seed=1, start=62.0)])
+    diffs = max_abs_difference(stream_indicators(closes, CONFIG), compute_indicators(closes, CONFIG))
+    assert max(diffs.values()) < TOLERANCE, diffs
+
+
+def test_large_level_keeps_precision():
+    # Market caps (~1e12) must not lose the Bollinger std to cancellation
+    closes = 1.2e12 + np.cumsum(np.random.default_rng(3).normal(0, 1e9, 3000))
+    streamed = stream_indicators(closes, CONFIG)
+    expected = compute_indicators(closes, CONFIG)
+    for name, values in expected.items():
+        mask = ~np.isnan(values)
+        np.testing.assert_array_equal(np.isnan(streamed[name]), ~mask)
+        np.testing.assert_allclose(streamed[name][mask], values[mask], rtol=1e-9)
+
+
+def test_warmup_is_nan_until_window_filled():
+    closes = random_walk(30)
+    streamed = stream_indicators(closes, CONFIG)
+    assert np.isnan(streamed["sma_20"][:19]).all() and not np.isnan(streamed["sma_20"][19:]).any()
+    assert np.isnan(streamed["sma_50"]).all()
+
+
+def test_revising_the_last_bar_matches_a_single_push():
+    closes = random_walk(300, seed=11)
+    engine = StreamingIndicators(CONFIG)
+    for i, close in enumerate(closes):
+        # The realtime poll sees each minute a few times before it closes
+        engine.update(i, close + 0.3)
+        engine.update(i, close - 0.1)
+        last = engine.update(i, close)
+    expected = compute_indicators(closes, CONFIG)
+    for name, values in expected.items():
+        assert abs(last[name] - values[-1]) < TOLERANCE, name
+
+
+def test_out_of_order_bar_is_ignored():
+    engine = StreamingIndicators(CONFIG)
+    for i, close in enumerate(random_walk(100)):
+        engine.update(i, close)
+    before = engine.values()
+    assert engine.update(50, 1000.0) == before
+
+
+def test_backfill_skips_bars_whose_indicators_are_unchanged():
+    engine = StreamingIndicators(CONFIG)
+    for i, close in enumerate(random_walk(60)):
+        computed = engine.update(i, close)
+    assert indicators_equal(dict(computed), computed, TOLERANCE)
+    drifted = {k: (v + 1e-6 if v is not None else None) for k, v in computed.items()}
+    assert not indicators_equal(drifted, computed, TOLERANCE)
+    # Warm-up Nones must line up, a missing or partial "ind" is rewritten
+    warming = StreamingIndicators(CONFIG).update(0, 55.0)
+    assert indicators_equal(dict(warming), warming, TOLERANCE)
+    assert not indicators_equal({k: 0.0 for k in warming}, warming, TOLERANCE)
+    assert not indicators_equal(None, computed, TOLERANCE)
+    assert not indicators_equal({"sma_5": computed["sma_5"]}, computed, TOLERANCE)
@@ -0,0 +1,86 @@
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.storage.base import merge_updates
+from src.storage.write_coordinator import resolve_conflicts
+
+
+def replay(existing, updates):
+    """
+    Reference: updates applied one after the other to one bar (existing=None: a new bar);
+    $setOnInsert only fills a field of a new bar that no earlier write gave a value
+    """
+    doc = dict(existing or {})
+    for update in updates:
+        for op, fields in update.items():
+            for field, value in fields.items():
+                current = doc.get(field)
+                if op == "$set":
+                    doc[field] = value
+                elif op == "$setOnInsert":
+                    if existing is None and field not in doc:
+                        doc[field] = value
+                elif current is None:
+                    doc[field] = value
+                elif value is not None:
+                    doc[field] = max(current, value) if op == "$max" else min(current, value)
+    return doc
+
+
+def one_operator_per_field(update):
+    fields = [field for values in update.values() for field in values]
+    return len(fields) == len(set(fields))
+
+
+def test_same_operator_folds():
+    merged = merge_updates(
+        {"$set": {"c": 1.0}, "$max": {"h": 2.0}, "$min": {"l": 1.0}, "$setOnInsert": {"o": 1.5}},
+        {"$set": {"c": 1.2}, "$max": {"h": 1.9}, "$min": {"l": 0.9}, "$setOnInsert": {"o": 9.9}},
+    )
+    assert merged == {"$set": {"c": 1.2}, "$max": {"h": 2.0}, "$min": {"l": 0.9}, "$setOnInsert": {"o": 1.5}}
+
+
+def test_set_then_max_is_a_set_of_the_max():
+    assert merge_updates({"$set": {"h": 2.0}}, {"$max": {"h": 2.5}}) == {"$set": {"h": 2.5}}
+    assert merge_updates({"$set": {"h": 2.0}}, {"$max": {"h": 1.5}}) == {"$set": {"h": 2.0}}
+    assert merge_updates({"$set": {"l": 2.0}}, {"$min": {"l": 1.5}}) == {"$set": {"l": 1.5}}
+    assert merge_updates({"$set": {"o": 2.0}}, {"$setOnInsert": {"o": 1.0}}) == {"$set": {"o": 2.0}}
+
+
+def test_later_set_replaces_earlier_operators():
+    assert merge_updates({"$max": {"h": 9.0}}, {"$set": {"h": 2.0}}) == {"$set": {"h": 2.0}}
+    assert merge_updates({"$setOnInsert": {"o": 1.0}}, {"$set": {"o": 2.0}}) == {"$set": {"o": 2.0}}
+
+
+def test_missing_values_do_not_win_max_or_min():
+    assert merge_updates({"$max": {"h": 2.0}}, {"$max": {"h": None}}) == {"$max": {"h": 2.0}}
+    assert merge_updates({"$set": {"l": None}}, {"$min": {"l": 1.0}}) == {"$set": {"l": 1.0}}
+
+
+@pytest.mark.parametrize("existing", [None, {"o": 1.0, "h": 3.0, "l": 0.5, "c": 2.0}, {"o": 1.0, "h": 1.1, "l": 0.9}])
+@pytest.mark.parametrize(
+    "first,second",
+    [
+        ({"$set": {"h": 2.0, "c": 1.8}}, {"$max": {"h": 2.4}, "$set": {"c": 1.9}}),
+        ({"$max": {"h": 2.4}, "$min": {"l": 0.7}}, {"$set": {"h": 2.0, "l": 0.8}}),
+        ({"$set": {"l": 0.8}}, {"$min": {"l": 0.6}, "$setOnInsert": {"o": 1.2}}),
+        ({"$setOnInsert": {"o": 1.2, "h": 2.0}}, {"$set": {"h": 2.2}, "$setOnInsert": {"o": 1.3}}),
+    ],
+)
+def test_merged_update_equals_applying_both_in_order(existing, first, second):
+    merged = merge_updates(first, second)
+    assert one_operator_per_field(merged)
+    assert replay(existing, [merged]) == replay(existing, [first, second])
+
+
+def test_resolve_conflicts_replays_operators_in_order():
+    update = {"$set": {"h": 2.0, "c": 1.0}, "$max": {"h": 2.5}, "$setOnInsert": {"c": 0.5, "o": 0.9}}
+    resolved = resolve_conflicts(update)
+    assert resolved == {"$set": {"h": 2.5, "c": 1.0}, "$setOnInsert": {"o": 0.9}}
+    assert one_operator_per_field(resolved)
+    # Already conflict-free updates are left as they are
+    assert resolve_conflicts({"$set": {"c": 1.0}, "$max": {"h": 2.0}}) == {"$set": {"c": 1.0}, "$max": {"h": 2.0}}
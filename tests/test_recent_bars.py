@@ -0,0 +1,80 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.cache.recent_bars import RecentBars
+from src.log.logger_setup import LoggerSetup
+from src.tele_bot.tele_message import TelegramMonitor
+
+T0 = 1_757_000_040_000
+STEP = 60000
+
+
+@pytest.fixture
+def bars(request):
+    # One store per test: instances are process-wide per symbol
+    store = RecentBars(f"TEST.{request.node.name}")
+    store._init_store(4)
+    return store
+
+
+def test_symbol_is_required():
+    with pytest.raises(TypeError):
+        RecentBars()
+    with pytest.raises(ValueError):
+        RecentBars("")
+    assert RecentBars("A.D") is RecentBars("A.D")
+    assert RecentBars("A.D") is not RecentBars("B.D")
+
+
+def test_same_timestamp_revises_the_latest_bar(bars):
+    assert bars.append(T0, 1, 2, 0.5, 1.5, 10)
+    assert bars.append(T0 + STEP, 1.5, 2, 1, 1.8, 3)
+    # The open minute is polled again: same ts, new values, no new slot
+    assert not bars.append(T0 + STEP, 1.5, 2.4, 1, 2.2, 7)
+    assert len(bars) == 2
+    latest = bars.latest()
+    assert latest.timestamp_ms == T0 + STEP
+    assert (latest.high, latest.close, latest.volume) == (2.4, 2.2, 7.0)
+    assert bars.window()["close"].tolist() == [1.5, 2.2]
+
+
+def test_older_bars_are_ignored(bars):
+    bars.append(T0 + STEP, 1, 1, 1, 1, 1)
+    assert not bars.append(T0, 9, 9, 9, 9, 9)
+    assert bars.window()["timestamp_ms"].tolist() == [T0 + STEP]
+
+
+def test_revision_after_wraparound_updates_both_copies(bars):
+    for k in range(6):
+        bars.append(T0 + k * STEP, k, k, k, k, k)
+    bars.append(T0 + 5 * STEP, 5, 9, 5, 8, None)
+    window = bars.window()
+    assert window["timestamp_ms"].tolist() == [T0 + k * STEP for k in range(2, 6)]
+    assert window["close"].tolist() == [2.0, 3.0, 4.0, 8.0]
+    assert np.isnan(window["volume"][-1])
+    assert bars.since(T0 + 4 * STEP)["close"].tolist() == [4.0, 8.0]
+
+
+def test_recovery_message_follows_a_missing_data_alert():
+    monitor = object.__new__(TelegramMonitor)
+    monitor.logger = LoggerSetup.logger_setup("Telegram Monitor")
+    monitor.data_timeout = 60
+    monitor.data_was_missing = False
+    sent = []
+    monitor.check_freshness_slo = lambda: []
+    monitor.should_send_alert = lambda: True
+    monitor.format_alert_message = lambda: "missing"
+    monitor.format_recovery_message = lambda: "recovered"
+    monitor.send_telegram_message = lambda message: sent.append(message) or True
+
+    monitor.check_recent_data = lambda: False
+    assert not monitor.check_data_after_realtime_extract()
+    monitor.check_recent_data = lambda: True
+    assert monitor.check_data_after_realtime_extract()
+    assert monitor.check_data_after_realtime_extract()
+    assert sent == ["missing", "recovered"]
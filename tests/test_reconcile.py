@@ -0,0 +1,88 @@
+import os
+import sys
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.configs.config_variable import QUALITY_CONFIG
+from src.jobs.reconcile import ReconcileJob, diff_bars, quantize, row_hashes
+from src.log.logger_setup import LoggerSetup
+from src.quality.validator import BarValidator
+
+DAY = 86_400_000
+T0 = 1_756_944_000_000
+
+
+def rows(*closes):
+    return np.array([[c, c + 0.5, c - 0.5, c, 1e9] for c in closes], dtype=np.float64)
+
+
+def test_quantize_normalizes_noise_negative_zero_and_nan():
+    values = np.array([[1.000000000001, -0.0, np.nan, -np.nan, 2.0]])
+    q = quantize(values, 8)
+    assert q[0, 0] == 1.0
+    assert not np.signbit(q[0, 1])
+    assert row_hashes(q).tolist() == row_hashes(quantize(np.array([[1.0, 0.0, np.nan, np.nan, 2.0]]), 8)).tolist()
+
+
+def test_row_hashes_see_every_column():
+    base = rows(58.0)
+    hashes = {int(row_hashes(base)[0])}
+    for k in range(5):
+        changed = base.copy()
+        changed[0, k] += 0.01
+        hashes.add(int(row_hashes(changed)[0]))
+    assert len(hashes) == 6
+
+
+def test_diff_finds_revised_and_added_rows():
+    stored_ts = T0 + np.array([0, 1, 2, 4], dtype=np.int64) * DAY
+    stored = quantize(rows(1.0, 2.0, 3.0, 5.0), 8)
+    fetched_ts = T0 + np.arange(6, dtype=np.int64) * DAY
+    fetched = quantize(rows(1.0, 2.5, 3.0, 4.0, 5.0, 6.0), 8)
+    revised, stored_pos, added = diff_bars(stored_ts, stored, fetched_ts, fetched)
+    assert revised.tolist() == [1]
+    assert stored_pos.tolist() == [1]
+    assert added.tolist() == [3, 5]
+
+
+class FakeSink:
+    def __init__(self):
+        self.submitted = []
+
+    def submit(self, writes, on_commit=None):
+        self.submitted.extend(writes)
+        on_commit()
+
+
+class FakeRevisions:
+    def __init__(self):
+        self.docs = []
+
+    def insert_many(self, docs, ordered=True):
+        self.docs.extend(docs)
+
+
+def test_reconcile_writes_the_raw_upstream_values():
+    job = object.__new__(ReconcileJob)
+    job.logger = LoggerSetup.logger_setup("ReconcileJob")
+    job.symbol, job.interval, job.step_ms, job.decimals = "BTC.D", "1d", DAY, 8
+    job.validator = BarValidator(QUALITY_CONFIG, "BTC.D")
+    job.sink, job.revisions = FakeSink(), FakeRevisions()
+
+    ts = T0 + np.arange(3, dtype=np.int64) * DAY
+    fetched = rows(58.0, 58.123456789123, 58.2)
+    fetched[0, 3] += 1e-12  # float noise only: not a revision
+    stored = rows(58.0, 58.1, 58.2)[:2]
+    job._fetch = lambda: (ts, fetched)
+    job.load_stored = lambda start, end: (ts[:2], stored)
+
+    summary = job.reconcile(now_ms=int(ts[-1]) + DAY)
+    assert (summary["revised"], summary["added"], summary["rejected"]) == (1, 1, 0)
+    assert [w.ts_ms for w in job.sink.submitted] == [int(ts[1]), int(ts[2])]
+    assert job.sink.submitted[0].update["$set"]["c"] == 58.123456789123
+    revised, added = job.revisions.docs
+    assert revised["kind"] == "revised" and added["kind"] == "added"
+    assert revised["old"]["c"] == 58.1 and revised["new"]["c"] == 58.123456789123
+    assert revised["fields"] == ["o", "h", "l", "c"]
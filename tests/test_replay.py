@@ -0,0 +1,41 @@
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.extract.replay_source import ReplayClock, parse_speed, run_replay
+from src.upstream.tv_bars import Bar
+
+T0 = 1_757_000_040_000
+
+
+def write_csv(path, n):
+    lines = ["datetime,open,high,low,close,volume"]
+    for k in range(n):
+        minute = f"2025-09-04 {15 + k // 60:02d}:{k % 60:02d}:00"
+        lines.append(f"{minute},58.0,58.1,57.9,{58.0 + k * 0.001:.3f},1000")
+    path.write_text("\n".join(lines) + "\n")
+    return str(path)
+
+
+def test_clock_stamps_fetch_at_close_and_adds_real_latency():
+    clock = ReplayClock()
+    bar = Bar(T0, 1.0, 1.0, 1.0, 1.0, 0.0)
+    fetched = clock.fetched_ms(bar)
+    assert fetched == T0 + 60000
+    assert clock.committed_ms(fetched, 10.0, 10.25) == fetched + 250
+    assert clock.committed_ms(fetched - 60000, 10.0, 10.5) == fetched - 60000 + 500
+    # The clock never runs backwards
+    assert clock.now_ms == fetched + 250
+
+
+def test_replay_reports_freshness_of_the_replayed_symbol(tmp_path):
+    csv_path = write_csv(tmp_path / "bars.csv", 40)
+    stats = run_replay(csv_path, parse_speed("max"), symbol="TEST.REPLAY", sink_name="sqlite")
+    assert stats["fetch"]["count"] == 40
+    freshness = stats["freshness"]
+    assert set(freshness) == {"upstream_to_fetch", "fetch_to_commit", "end_to_end"}
+    assert freshness["end_to_end"]["count"] == 40
+    assert freshness["upstream_to_fetch"]["p99_s"] == 0.0
+    assert 0.0 <= freshness["end_to_end"]["p50_s"] < 45
+    assert stats["slo_breaches"] == 0
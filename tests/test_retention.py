@@ -0,0 +1,150 @@
+import os
+import sys
+from datetime import datetime
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.configs.config_schema import F_TIME, F_VOLUME, date_to_ms, ms_to_date
+from src.configs.config_symbols import crawl_symbols
+from src.jobs.retention import (
+    DAY_MS,
+    RetentionJob,
+    build_downsample_pipeline,
+    delete_in_batches,
+    retention_cutoff_ms,
+    retention_symbols,
+    seconds_until_next_run,
+)
+from src.log.logger_setup import LoggerSetup
+
+NOW_MS = date_to_ms(datetime(2026, 3, 10, 15, 42))
+
+
+class ListCursor(list):
+    def sort(self, key, direction):
+        return ListCursor(sorted(self, key=lambda d: d[key], reverse=direction < 0))
+
+    def limit(self, n):
+        return ListCursor(self[:n])
+
+
+class DeleteResult:
+    def __init__(self, deleted_count):
+        self.deleted_count = deleted_count
+
+
+class FakeCollection:
+    """Enough of a pymongo collection for delete_in_batches ($lt / $gt / $in on one key)"""
+
+    def __init__(self, docs):
+        self.docs = list(docs)
+        self.queries = []
+
+    @staticmethod
+    def _matches(doc, query):
+        for field, cond in query.items():
+            value = doc.get(field)
+            if not isinstance(cond, dict):
+                if value != cond:
+                    return False
+                continue
+            if "$lt" in cond and not value < cond["$lt"]:
+                return False
+            if "$gt" in cond and not value > cond["$gt"]:
+                return False
+            if "$in" in cond and value not in cond["$in"]:
+                return False
+        return True
+
+    def find(self, query, projection=None):
+        self.queries.append(query)
+        return ListCursor(d for d in self.docs if self._matches(d, query))
+
+    def delete_many(self, query):
+        keep = [d for d in self.docs if not self._matches(d, query)]
+        deleted = len(self.docs) - len(keep)
+        self.docs = keep
+        return DeleteResult(deleted)
+
+
+def test_cutoff_is_aligned_to_whole_days():
+    cutoff = retention_cutoff_ms(30, NOW_MS)
+    assert cutoff % DAY_MS == 0
+    assert ms_to_date(cutoff) == datetime(2026, 2, 8)
+    # Fractional days still land on a day boundary, never after now - keep_days
+    assert retention_cutoff_ms(0.5, NOW_MS) == date_to_ms(datetime(2026, 3, 10))
+    assert retention_cutoff_ms(1.5, NOW_MS) <= NOW_MS - 1.5 * DAY_MS
+
+
+def test_downsample_pipeline_sums_volume_and_rolls_up_ohlc():
+    pipeline = build_downsample_pipeline("ETH.D", "1m", 0, DAY_MS, "1h", "raw_1h", overwrite=True)
+    match, sort, group, project, merge = pipeline
+    assert match["$match"]["s"] == "ETH.D"
+    assert match["$match"]["i"] == "1m"
+    assert match["$match"][F_TIME] == {"$gte": ms_to_date(0), "$lt": ms_to_date(DAY_MS)}
+    assert sort == {"$sort": {F_TIME: 1}}
+    accumulators = group["$group"]
+    assert accumulators["o"] == {"$first": "$o"}
+    assert accumulators["h"] == {"$max": "$h"}
+    assert accumulators["l"] == {"$min": "$l"}
+    assert accumulators["c"] == {"$last": "$c"}
+    assert accumulators[F_VOLUME] == {"$sum": "$v"}
+    assert project["$project"]["i"] == {"$literal": "1h"}
+    assert merge["$merge"]["into"] == "raw_1h"
+    assert merge["$merge"]["whenMatched"] == "merge"
+
+
+def test_daily_downsample_only_fills_holes():
+    pipeline = build_downsample_pipeline("BTC.D", "1m", 0, DAY_MS, "1d", "raw", overwrite=False)
+    assert pipeline[-1]["$merge"]["whenMatched"] == "keepExisting"
+
+
+def test_retention_covers_crawled_and_derived_symbols():
+    specs = crawl_symbols({"symbols": ["BTC.D", {"symbol": "ETH.D", "historical": False}]})
+    assert retention_symbols(specs, {"enabled": False, "series": {"X": "A"}}) == ["BTC.D", "ETH.D"]
+    derived = {"enabled": True, "series": {"ETH.D": "ETH / TOTAL * 100", "OTHERS.D": "x"}}
+    assert retention_symbols(specs, derived) == ["BTC.D", "ETH.D", "OTHERS.D"]
+
+
+def test_batched_delete_resumes_after_the_last_key():
+    docs = [{"_id": i, "t": 1000 + i} for i in range(25)]
+    collection = FakeCollection(docs)
+    deleted = delete_in_batches(collection, {"t": {"$lt": 1020}}, 6, 0, key="t")
+    assert deleted == 20
+    assert [d["t"] for d in collection.docs] == [1020, 1021, 1022, 1023, 1024]
+    # Each batch starts after the previous one's last key instead of rescanning the range
+    assert [q["t"] for q in collection.queries] == [
+        {"$lt": 1020},
+        {"$lt": 1020, "$gt": 1005},
+        {"$lt": 1020, "$gt": 1011},
+        {"$lt": 1020, "$gt": 1017},
+    ]
+
+
+def test_ttl_is_refused_together_with_downsampling():
+    job = object.__new__(RetentionJob)
+    job.logger = LoggerSetup.logger_setup("RetentionJob")
+    job.symbols = ["BTC.D", "ETH.D"]
+    calls = []
+    job.ensure_ttl_index = lambda *args: calls.append(("ttl",) + args)
+    job.downsample = lambda *args: calls.append(("downsample",) + args)
+    job.prune = lambda *args: calls.append(("prune",) + args) or 1
+
+    policy = {"keep_days": 30, "downsample_to": ["1h"], "ttl_field": "t"}
+    assert job.apply_policy("1m", policy, NOW_MS) == 2
+    cutoff = retention_cutoff_ms(30, NOW_MS)
+    assert calls == [
+        ("downsample", "BTC.D", "1m", "1h", cutoff),
+        ("prune", "BTC.D", "1m", cutoff),
+        ("downsample", "ETH.D", "1m", "1h", cutoff),
+        ("prune", "ETH.D", "1m", cutoff),
+    ]
+
+    calls.clear()
+    assert job.apply_policy("1h", {"keep_days": 10, "downsample_to": [], "ttl_field": "t"}, NOW_MS) == 0
+    assert calls == [("ttl", "1h", "t", 10)]
+
+
+def test_daily_run_time():
+    assert seconds_until_next_run(datetime(2026, 3, 10, 2, 0), {"run_hour_utc": 3}) == 3600
+    assert seconds_until_next_run(datetime(2026, 3, 10, 3, 0), {"run_hour_utc": 3}) == 24 * 3600
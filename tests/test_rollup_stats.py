@@ -0,0 +1,138 @@
+import math
+import os
+import sys
+import threading
+from datetime import datetime
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.configs.config_schema import F_TIME, date_to_ms, ms_to_date
+from src.configs.config_symbols import crawl_symbols
+from src.jobs.rollup_stats import (
+    F_LAST_BAR,
+    RollupStatsUpdater,
+    fold_ops,
+    next_period_start,
+    period_start,
+    rollup_symbols,
+    seconds_until_next_run,
+)
+from src.log.logger_setup import LoggerSetup
+
+STEP = 60000
+# Wednesday 2026-03-11 23:58 UTC
+T0 = date_to_ms(datetime(2026, 3, 11, 23, 58))
+
+
+def bar_doc(ts, close, symbol="BTC.D"):
+    return {"s": symbol, "i": "1m", F_TIME: ms_to_date(ts), "o": close - 1, "h": close + 1, "l": close - 2, "c": close}
+
+
+def make_updater(states=None, periods=("day",), loaded=None):
+    """Updater without Mongo: state preset, loads answered from `loaded`"""
+    updater = object.__new__(RollupStatsUpdater)
+    updater.logger = LoggerSetup.logger_setup("RollupStatsUpdater")
+    updater.source_interval = "1m"
+    updater.periods = list(periods)
+    updater.flush_batch = 300
+    updater._state = dict(states or {})
+    updater._folds = {}
+    updater._pending_bars = 0
+    updater._unloaded = {}
+    updater._lock = threading.Lock()
+    updater._wake = threading.Event()
+    updater.folded = 0
+    updater.skipped = 0
+    updater._load_state = lambda symbol: dict((loaded or {})[symbol])
+    return updater
+
+
+def empty_state():
+    return {"bar": None, "last_ts": None, "last_close": None}
+
+
+def test_period_bounds():
+    assert period_start(T0, "day") == date_to_ms(datetime(2026, 3, 11))
+    assert next_period_start(T0, "day") == date_to_ms(datetime(2026, 3, 12))
+    # Weeks start on Monday
+    assert period_start(T0, "week") == date_to_ms(datetime(2026, 3, 9))
+    assert next_period_start(T0, "week") == date_to_ms(datetime(2026, 3, 16))
+    assert period_start(T0, "month") == date_to_ms(datetime(2026, 3, 1))
+    december = date_to_ms(datetime(2026, 12, 31, 12))
+    assert next_period_start(december, "month") == date_to_ms(datetime(2027, 1, 1))
+
+
+def test_bars_of_a_period_fold_into_one_guarded_update():
+    updater = make_updater({"BTC.D": empty_state()}, periods=("day", "week"))
+    for k, close in enumerate([10.0, 11.0, 12.0, 13.0, 14.0]):
+        updater.observe(bar_doc(T0 + k * STEP, close))
+    # The last bar is still revisable; the 4 before it span two days but one week
+    assert updater.folded == 4
+    ops = {(op._filter["p"], op._filter[F_TIME]): op for op in fold_ops(updater._folds)}
+    assert len(ops) == 3
+
+    first_day = ops[("day", ms_to_date(date_to_ms(datetime(2026, 3, 11))))]
+    assert first_day._filter[F_LAST_BAR] == {"$not": {"$gte": ms_to_date(T0)}}
+    assert first_day._doc["$inc"] == {"n": 2, "sc": 21.0, "nr": 1, "sr2": math.log(11 / 10) ** 2}
+    assert first_day._doc["$setOnInsert"]["o"] == 9.0
+    assert first_day._doc["$set"] == {"c": 11.0}
+    assert first_day._doc["$max"] == {F_LAST_BAR: ms_to_date(T0 + STEP), "h": 12.0}
+    assert first_day._doc["$min"] == {"l": 8.0}
+
+    next_day = ops[("day", ms_to_date(date_to_ms(datetime(2026, 3, 12))))]
+    # The first return of the new day still comes from the previous day's close
+    assert next_day._filter[F_LAST_BAR] == {"$not": {"$gte": ms_to_date(T0 + 2 * STEP)}}
+    assert next_day._doc["$inc"]["nr"] == 2
+
+    week = ops[("week", ms_to_date(date_to_ms(datetime(2026, 3, 9))))]
+    assert week._doc["$inc"]["n"] == 4
+    assert week._doc["$set"] == {"c": 13.0}
+    assert week._upsert
+
+
+def test_revisions_of_folded_bars_are_ignored():
+    state = {"bar": None, "last_ts": T0, "last_close": 10.0}
+    updater = make_updater({"BTC.D": state})
+    updater.observe(bar_doc(T0, 99.0))
+    updater.observe(bar_doc(T0 + STEP, 11.0))
+    # Revision of the pending bar replaces it
+    updater.observe(bar_doc(T0 + STEP, 12.0))
+    assert updater.folded == 0
+    updater.observe(bar_doc(T0 + 2 * STEP, 13.0))
+    assert updater.folded == 1
+    (op,) = fold_ops(updater._folds)
+    assert op._doc["$inc"] == {"n": 1, "sc": 12.0, "nr": 1, "sr2": math.log(12 / 10) ** 2}
+
+
+def test_unknown_symbols_wait_for_their_state():
+    loaded = {"ETH.D": {"bar": None, "last_ts": T0 + STEP, "last_close": 5.0}}
+    updater = make_updater(loaded=loaded)
+    for k, close in enumerate([4.0, 5.0, 6.0, 7.0]):
+        updater.observe(bar_doc(T0 + k * STEP, close, "ETH.D"))
+    # No lookup on the publishing thread: the bars wait for the updater
+    assert "ETH.D" not in updater._state
+    assert updater._wake.is_set()
+    updater._load_unloaded()
+    # Bars already folded before the restart are not counted again
+    assert updater.folded == 1
+    assert updater._state["ETH.D"]["bar"][0] == T0 + 3 * STEP
+    (op,) = fold_ops(updater._folds)
+    assert op._doc["$inc"]["n"] == 1
+    assert op._doc["$inc"]["sr2"] == math.log(6 / 5) ** 2
+
+
+def test_rollup_covers_crawled_and_derived_symbols():
+    specs = crawl_symbols(
+        {"symbols": ["BTC.D", {"symbol": "ETH.D", "historical": False}, {"symbol": "TOTAL", "realtime": False}]}
+    )
+    config = {"source_interval": "1m"}
+    assert rollup_symbols(specs, config, {"enabled": False}) == ["BTC.D", "ETH.D"]
+    derived = {"enabled": True, "interval": "1m", "series": {"ETH.D": "x", "OTHERS.D": "y"}}
+    assert rollup_symbols(specs, config, derived) == ["BTC.D", "ETH.D", "OTHERS.D"]
+    assert rollup_symbols(specs, config, dict(derived, interval="1h")) == ["BTC.D", "ETH.D"]
+
+
+def test_daily_rebuild_time():
+    assert seconds_until_next_run(datetime(2026, 3, 10, 8, 0), {"rebuild_hour_utc": 9}) == 3600
+    assert seconds_until_next_run(datetime(2026, 3, 10, 9, 0), {"rebuild_hour_utc": 9}) == 24 * 3600
+
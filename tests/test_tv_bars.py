@@ -0,0 +1,39 @@
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.upstream.tv_bars import _legacy_tick, _sample_payload, parse_bars
+
+
+@pytest.mark.parametrize("n_bars", [1, 2, 10])
+def test_parsed_bars_match_the_dataframe_path(n_bars):
+    raw = _sample_payload(n_bars)
+    bars = parse_bars(raw)
+    assert len(bars) == n_bars
+    assert [b.ts_ms for b in bars] == sorted(b.ts_ms for b in bars)
+    legacy = _legacy_tick(raw)
+    bar = bars[-1]
+    assert bar.ts_ms == legacy["bar_timestamp_ms"]
+    assert bar.ts_ms - bar.ts_ms % 86400000 == legacy["today_timestamp_ms"]
+    for name in ("open", "high", "low", "close", "volume"):
+        assert getattr(bar, name) == legacy[f"current_{name}"]
+
+
+def test_lean_parser_hooks_the_pinned_tvdatafeed():
+    tv = pytest.importorskip("tvDatafeed")
+    # LeanTvDatafeed overrides this private, name-mangled method
+    assert callable(getattr(tv.TvDatafeed, "_TvDatafeed__create_df", None))
+
+    from src.upstream.tv_bars import lean_tvdatafeed_class
+
+    lean_cls = lean_tvdatafeed_class()
+    client = object.__new__(lean_cls)
+    client.lean = True
+    raw = _sample_payload(3)
+    assert client._TvDatafeed__create_df(raw, "CRYPTOCAP:BTC.D") == parse_bars(raw)
+    client.lean = False
+    df = client._TvDatafeed__create_df(raw, "CRYPTOCAP:BTC.D")
+    assert df["close"].tolist() == [bar.close for bar in parse_bars(raw)]
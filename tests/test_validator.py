@@ -0,0 +1,86 @@
+import os
+import sys
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.configs.config_symbols import quality_bounds
+from src.configs.config_variable import DATA_CRAWL_CONFIG, QUALITY_CONFIG
+from src.quality.validator import BarValidator, reasons_of
+
+T0 = 1_757_000_040_000
+STEP = 60000
+
+
+def check(validator, price, volume=1e9):
+    codes = validator.validate([T0], [price], [price], [price], [price], [volume])
+    return reasons_of(int(codes[0]))
+
+
+def test_dominance_series_are_percentages():
+    validator = BarValidator(QUALITY_CONFIG, "ETH.D")
+    assert check(validator, 13.2) == []
+    assert check(validator, 100.5) == ["out_of_range"]
+    assert check(validator, 0.0) == ["out_of_range"]
+    assert check(validator, 13.2, volume=0) == ["zero_volume"]
+
+
+def test_market_caps_are_only_bounded_below():
+    validator = BarValidator(QUALITY_CONFIG, "TOTAL")
+    assert quality_bounds("TOTAL") == (0.0, None, False)
+    assert check(validator, 3.9e12) == []
+    assert check(validator, 3.9e12, volume=0) == []
+    assert check(validator, -1.0) == ["out_of_range"]
+
+
+def test_symbol_entry_overrides_the_defaults(monkeypatch):
+    monkeypatch.setitem(
+        DATA_CRAWL_CONFIG,
+        "symbols",
+        [{"symbol": "TOTAL2", "min_value": 1e11, "max_value": 5e12, "reject_zero_volume": True}],
+    )
+    validator = BarValidator(QUALITY_CONFIG, "TOTAL2")
+    assert check(validator, 1.2e12) == []
+    assert check(validator, 5e10) == ["out_of_range"]
+    assert check(validator, 6e12) == ["out_of_range"]
+    assert check(validator, 1.2e12, volume=0) == ["zero_volume"]
+    # Other symbols keep their own bounds
+    assert check(BarValidator(QUALITY_CONFIG, "BTC.D"), 101.0) == ["out_of_range"]
+
+
+def test_structural_checks_and_monotonic_time():
+    validator = BarValidator(QUALITY_CONFIG, "BTC.D")
+    ts = [T0, T0 + STEP, T0 + STEP, T0 + 3 * STEP]
+    o = [58.0, 58.0, 58.0, 58.0]
+    h = [58.1, 57.0, 58.1, 58.1]
+    l = [57.9, 57.5, 57.9, 57.9]
+    c = [58.0, 57.2, 58.0, np.nan]
+    codes = validator.validate(ts, o, h, l, c, [1e9] * 4)
+    assert [reasons_of(int(code)) for code in codes] == [
+        [],
+        ["high_below_low", "open_close_outside_high_low"],
+        ["non_monotonic_time"],
+        ["nan"],
+    ]
+
+
+def test_live_revision_of_the_latest_bar_is_allowed():
+    validator = BarValidator(QUALITY_CONFIG, "BTC.D")
+    codes = validator.validate(
+        [T0], [58.0], [58.1], [57.9], [58.0], [1e9], history_close=[58.0], history_ts=T0, allow_revision=True
+    )
+    assert codes.tolist() == [0]
+    codes = validator.validate([T0], [58.0], [58.1], [57.9], [58.0], [1e9], history_close=[58.0], history_ts=T0)
+    assert reasons_of(int(codes[0])) == ["non_monotonic_time"]
+
+
+def test_spike_is_flagged_once_and_its_revert_is_not():
+    validator = BarValidator(QUALITY_CONFIG, "BTC.D")
+    rng = np.random.default_rng(3)
+    c = 58.0 * np.exp(np.cumsum(rng.normal(0, 1e-4, 80)))
+    c[60] *= 1.1
+    ts = T0 + np.arange(80, dtype=np.int64) * STEP
+    codes = validator.validate(ts, c, c, c, c, np.full(80, 1e9))
+    assert np.flatnonzero(codes).tolist() == [60]
+    assert reasons_of(int(codes[60])) == ["spike"]